@@ -6,6 +6,7 @@ import plotly.express as px
 from datetime import datetime, timedelta
 import sqlite3
 from translations import t
+from rollups import get_daily_rollups, summarize_rollups
 
 class LiveAnalyticsDashboard:
     def __init__(self, db_connection):
@@ -51,58 +52,49 @@ class LiveAnalyticsDashboard:
             self.show_channel_analytics(start_date, end_date, current_lang)
     
     def get_live_metrics(self, start_date, end_date):
-        """Get live metrics from database"""
-        cursor = self.db.cursor()
-        
-        # Total requests
-        cursor.execute('''
-            SELECT COUNT(*) as total_requests,
-                   SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed_requests,
-                   SUM(CASE WHEN status = 'Pending' THEN 1 ELSE 0 END) as pending_requests,
-                   AVG(CASE WHEN actual_completion IS NOT NULL 
-                       THEN julianday(actual_completion) - julianday(created_at) 
-                       ELSE NULL END) as avg_resolution_days
-            FROM service_requests 
-            WHERE created_at BETWEEN ? AND ?
-        ''', (start_date, end_date))
-        
-        request_metrics = cursor.fetchone()
-        
-        # User metrics
-        cursor.execute('''
-            SELECT COUNT(*) as total_users,
-                   COUNT(DISTINCT CASE WHEN DATE(last_login) = DATE('now') THEN user_id END) as active_today,
-                   AVG(CASE WHEN sr.user_id IS NOT NULL 
-                       THEN (SELECT COUNT(*) FROM service_requests sr2 WHERE sr2.user_id = u.id) 
-                       ELSE 0 END) as avg_requests_per_user
-            FROM users u
-            LEFT JOIN service_requests sr ON u.id = sr.user_id
-            WHERE u.created_at BETWEEN ? AND ?
-        ''', (start_date, end_date))
-        
-        user_metrics = cursor.fetchone()
-        
-        # Payment metrics
-        cursor.execute('''
-            SELECT SUM(amount) as total_revenue,
-                   COUNT(*) as total_payments,
-                   AVG(amount) as avg_payment_amount
-            FROM payments 
-            WHERE created_at BETWEEN ? AND ? AND status = 'Completed'
-        ''', (start_date, end_date))
+        """Get live metrics from the trigger-maintained daily rollups.
         
-        payment_metrics = cursor.fetchone()
+        User figures keep their own definitions, which the rollups cannot
+        answer: users registered in the range, the average number of
+        requests those users have filed, and users who logged in today.
+        """
+        summary = summarize_rollups(self.db, start_date, end_date)
+        cursor = self.db.cursor()
         
-        # Satisfaction metrics
         cursor.execute('''
-            SELECT AVG(feedback_rating) as avg_satisfaction,
-                   COUNT(feedback_rating) as feedback_count
-            FROM service_requests 
-            WHERE feedback_rating IS NOT NULL 
-            AND created_at BETWEEN ? AND ?
+            SELECT COUNT(*), COALESCE(SUM(s.total_requests), 0)
+            FROM users u LEFT JOIN user_stats s ON s.user_id = u.id
+            WHERE u.created_day BETWEEN ? AND ?
         ''', (start_date, end_date))
-        
-        satisfaction_metrics = cursor.fetchone()
+        total_users, users_requests = cursor.fetchone()
+        
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        cursor.execute("SELECT COUNT(*) FROM users WHERE last_login >= ?", (today,))
+        active_today = cursor.fetchone()[0]
+        
+        request_metrics = (
+            summary['total_requests'],
+            summary['completed_requests'],
+            summary['pending_requests'],
+            summary['avg_resolution_days']
+        )
+        
+        user_metrics = (
+            total_users,
+            active_today,
+            users_requests / total_users if total_users else 0
+        )
+        
+        payment_metrics = (
+            summary['payment_amount'],
+            summary['payment_count'],
+            summary['avg_payment_amount']
+        )
+        
+        satisfaction_metrics = (
+            summary['avg_rating'],
+            summary['rating_count']
+        )
         
         return {
             'requests': request_metrics,
@@ -149,15 +141,7 @@ class LiveAnalyticsDashboard:
         st.subheader(t('citizen_demographics', current_lang))
         
         # Language preference from actual data
-        cursor.execute('''
-            SELECT language, COUNT(*) as user_count
-            FROM users 
-            WHERE created_at BETWEEN ? AND ?
-            GROUP BY language
-            ORDER BY user_count DESC
-        ''', (start_date, end_date))
-        
-        lang_data = cursor.fetchall()
+        lang_data = self.get_language_usage(start_date, end_date)
         
         if lang_data:
             df_lang = pd.DataFrame(lang_data, columns=['language', 'users'])
@@ -180,7 +164,7 @@ class LiveAnalyticsDashboard:
                 SELECT u.id, COUNT(sr.id) as request_count
                 FROM users u
                 LEFT JOIN service_requests sr ON u.id = sr.user_id
-                WHERE u.created_at BETWEEN ? AND ?
+                WHERE u.created_day BETWEEN ? AND ?
                 GROUP BY u.id
             ) user_stats
             GROUP BY user_category
@@ -194,10 +178,21 @@ class LiveAnalyticsDashboard:
                         title=t('user_engagement', current_lang))
             st.plotly_chart(fig, use_container_width=True)
     
-    def show_department_analytics(self, start_date, end_date, current_lang='en'):
-        """Show department performance from actual data"""
+    def get_language_usage(self, start_date, end_date):
+        """(language, users) for users registered in the range, most used first"""
+        cursor = self.db.cursor()
+        cursor.execute('''
+            SELECT language, COUNT(*) as user_count
+            FROM users 
+            WHERE created_day BETWEEN ? AND ?
+            GROUP BY language
+            ORDER BY user_count DESC
+        ''', (start_date, end_date))
+        return cursor.fetchall()
+    
+    def get_department_performance(self, start_date, end_date):
+        """Per-department totals, resolution days, satisfaction and backlog"""
         cursor = self.db.cursor()
-        
         cursor.execute('''
             SELECT 
                 department,
@@ -208,12 +203,15 @@ class LiveAnalyticsDashboard:
                 AVG(feedback_rating) * 20 as satisfaction_percentage,
                 SUM(CASE WHEN status = 'Pending' THEN 1 ELSE 0 END) as backlog_count
             FROM service_requests 
-            WHERE created_at BETWEEN ? AND ?
+            WHERE created_day BETWEEN ? AND ?
             GROUP BY department
             ORDER BY total_requests DESC
         ''', (start_date, end_date))
-        
-        dept_data = cursor.fetchall()
+        return cursor.fetchall()
+    
+    def show_department_analytics(self, start_date, end_date, current_lang='en'):
+        """Show department performance from actual data"""
+        dept_data = self.get_department_performance(start_date, end_date)
         
         if dept_data:
             df = pd.DataFrame(dept_data, columns=[
@@ -238,17 +236,9 @@ class LiveAnalyticsDashboard:
     
     def get_time_series_data(self):
         """Get actual time series data from database"""
-        cursor = self.db.cursor()
-        
-        cursor.execute('''
-            SELECT DATE(created_at) as date, COUNT(*) as requests
-            FROM service_requests 
-            WHERE created_at >= DATE('now', '-30 days')
-            GROUP BY DATE(created_at)
-            ORDER BY date
-        ''')
-        
-        data = cursor.fetchall()
+        start_date = datetime.now().date() - timedelta(days=30)
+        data = [(row['metric_date'], row['total_requests'])
+                for row in get_daily_rollups(self.db, start_date)]
         
         if data:
             return pd.DataFrame(data, columns=['date', 'requests'])
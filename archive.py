@@ -0,0 +1,201 @@
+# archive.py
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+# Closed requests move to a separate SQLite file ATTACHed as this schema, so
+# the hot tables in the main database stay small and their indexes stay in
+# the page cache. Archived rows keep their ids and timestamps, so keyset
+# pagination over hot + archive unions stays consistent.
+ARCHIVE_SCHEMA = 'archive'
+ARCHIVED_TABLES = ['service_requests', 'request_status_history', 'documents', 'notifications']
+CLOSED_STATUSES = ('Completed', 'Rejected')
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 180
+DEFAULT_ARCHIVE_BATCH_SIZE = 500
+
+# Indexes on the archive copies, for "include archived" history queries
+ARCHIVE_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_requests_user_created ON service_requests (user_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_requests_request ON service_requests (request_id)',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_history_request_created ON request_status_history (request_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_documents_user_uploaded ON documents (user_id, uploaded_at)',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_documents_request ON documents (request_id)',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archive_notifications_user_created ON notifications (user_id, created_at)',
+]
+
+# Archive files already prepared by this process (absolute path -> True)
+_prepared = {}
+_prepare_lock = threading.Lock()
+
+
+def default_archive_path(db_name):
+    """suvidha_live.db -> suvidha_live_archive.db"""
+    root, ext = os.path.splitext(db_name)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def is_archive_attached(conn):
+    """Whether this connection has the archive database attached"""
+    return any(row[1] == ARCHIVE_SCHEMA for row in conn.execute('PRAGMA database_list').fetchall())
+
+
+def stored_columns(conn, schema, table):
+    """(name, declared type) of the stored columns of schema.table.
+
+    Generated columns (table_xinfo hidden = 2 or 3) are skipped; the archive
+    copies do not have them.
+    """
+    rows = conn.execute(f'PRAGMA {schema}.table_xinfo({table})').fetchall()
+    return [(row[1], row[2]) for row in rows if row[6] == 0]
+
+
+def _sync_archive_schema(cursor):
+    """Create the archive tables, or add columns the hot tables gained since"""
+    for table in ARCHIVED_TABLES:
+        columns = stored_columns(cursor, 'main', table)
+        existing = {name for name, declared in stored_columns(cursor, ARCHIVE_SCHEMA, table)}
+        if not existing:
+            definitions = ', '.join(
+                'id INTEGER PRIMARY KEY' if name == 'id' else f'{name} {declared}'
+                for name, declared in columns
+            )
+            cursor.execute(f'CREATE TABLE {ARCHIVE_SCHEMA}.{table} ({definitions}, archived_at TIMESTAMP)')
+        else:
+            for name, declared in columns:
+                if name not in existing:
+                    cursor.execute(f'ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN {name} {declared}')
+
+    for statement in ARCHIVE_INDEXES:
+        cursor.execute(statement)
+
+
+def ensure_archive(conn, path=None):
+    """Attach the archive database to a ConnectionManager and prepare its tables.
+
+    The tables are created or updated at most once per process per archive
+    file; later calls only make sure the file is attached.
+    """
+    path = path or default_archive_path(conn.db_name)
+    conn.attach(ARCHIVE_SCHEMA, path)
+
+    key = os.path.abspath(path)
+    if key not in _prepared:
+        with _prepare_lock:
+            if key not in _prepared:
+                with conn.transaction() as tx:
+                    _sync_archive_schema(tx.cursor())
+                _prepared[key] = True
+    return path
+
+
+def union_source(conn, table, alias=None):
+    """FROM-clause source for table that also covers its archived rows.
+
+    Returns the plain table when no archive is attached, so callers can
+    always write f"SELECT ... FROM {union_source(conn, table)} WHERE ...".
+    The source is named alias, or table when no alias is given.
+    """
+    alias = alias or table
+    if not is_archive_attached(conn):
+        return f'{table} AS {alias}'
+    columns = ', '.join(name for name, declared in stored_columns(conn, 'main', table))
+    return f'''(
+        SELECT {columns} FROM main.{table}
+        UNION ALL
+        SELECT {columns} FROM {ARCHIVE_SCHEMA}.{table}
+    ) AS {alias}'''
+
+
+def _move_rows(cursor, table, where, params, archived_at):
+    """Copy rows matching where into the archive, then delete them from main"""
+    columns = ', '.join(name for name, declared in stored_columns(cursor, 'main', table))
+    # OR REPLACE keeps a re-run after an interrupted batch idempotent
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.{table} ({columns}, archived_at)
+        SELECT {columns}, ? FROM main.{table} WHERE {where}
+    ''', [archived_at] + list(params))
+    cursor.execute(f'DELETE FROM main.{table} WHERE {where}', params)
+    return cursor.rowcount
+
+
+def archive_closed_requests(conn, older_than_days=DEFAULT_ARCHIVE_AFTER_DAYS,
+                            batch_size=DEFAULT_ARCHIVE_BATCH_SIZE, now=None):
+    """Move closed requests and their history, documents and notifications to the archive.
+
+    Requests that are Completed or Rejected and were last updated more than
+    older_than_days ago move in batches of batch_size, each batch in its own
+    transaction, together with their status history and document metadata.
+    Read notifications older than the same cutoff move as well. Uploaded
+    files stay where they are. Daily rollups are not touched, so dashboards
+    keep counting archived work.
+
+    With the main database in WAL mode a batch commits to each file
+    separately; if the process dies in between, the rows may briefly exist
+    in both, and the next run finishes the move.
+
+    Returns counts of the rows moved per table plus the number of batches.
+    """
+    ensure_archive(conn)
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=older_than_days)
+    stats = {table: 0 for table in ARCHIVED_TABLES}
+    stats['batches'] = 0
+
+    while True:
+        with conn.transaction() as tx:
+            cursor = tx.cursor()
+            cursor.execute('DROP TABLE IF EXISTS temp.archive_batch')
+            cursor.execute(f'''
+                CREATE TEMP TABLE archive_batch AS
+                SELECT id, request_id FROM main.service_requests
+                WHERE status IN ({', '.join('?' for status in CLOSED_STATUSES)})
+                AND updated_at < ?
+                ORDER BY updated_at
+                LIMIT ?
+            ''', (*CLOSED_STATUSES, cutoff, batch_size))
+            batch = cursor.execute('SELECT COUNT(*) FROM temp.archive_batch').fetchone()[0]
+
+            if batch:
+                by_request = 'request_id IN (SELECT request_id FROM temp.archive_batch)'
+                stats['request_status_history'] += _move_rows(cursor, 'request_status_history', by_request, (), now)
+                stats['documents'] += _move_rows(cursor, 'documents', by_request, (), now)
+                stats['service_requests'] += _move_rows(
+                    cursor, 'service_requests', 'id IN (SELECT id FROM temp.archive_batch)', (), now)
+                stats['batches'] += 1
+            cursor.execute('DROP TABLE temp.archive_batch')
+
+        if batch < batch_size:
+            break
+
+    while True:
+        with conn.transaction() as tx:
+            moved = _move_rows(tx.cursor(), 'notifications', '''
+                id IN (SELECT id FROM main.notifications
+                       WHERE is_read = TRUE AND created_at < ?
+                       ORDER BY created_at, id LIMIT ?)
+            ''', (cutoff, batch_size), now)
+        stats['notifications'] += moved
+        if moved < batch_size:
+            break
+
+    return stats
+
+
+if __name__ == "__main__":
+    # Usage: python archive.py [db_path] [older_than_days] [batch_size]
+    from connection_manager import ConnectionManager
+    from migrations import ensure_schema
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'suvidha_live.db'
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ARCHIVE_AFTER_DAYS
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_ARCHIVE_BATCH_SIZE
+
+    manager = ConnectionManager(db_path)
+    ensure_schema(manager)
+    started = datetime.now()
+    stats = archive_closed_requests(manager, days, batch_size)
+    print(f"Archived {stats['service_requests']} request(s), {stats['request_status_history']} history row(s), "
+          f"{stats['documents']} document(s) and {stats['notifications']} notification(s) "
+          f"in {stats['batches']} batch(es), {(datetime.now() - started).total_seconds():.2f}s")
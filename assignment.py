@@ -0,0 +1,366 @@
+# assignment.py
+import sys
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from id_generator import new_id
+from sla import SLA_TARGET_DAYS, DEFAULT_SLA_TARGET_DAYS
+
+# Automatic assignment of Pending requests to field staff. Each server
+# process runs one AssignmentEngine on a daemon thread. It keeps the
+# unassigned Pending requests in memory in one heap per (department, zone),
+# most urgent and then oldest first, and on every cycle hands the most
+# urgent request of any queue to the least-loaded online staff member who
+# covers it, until the queues or the staff run out:
+#
+# - Staff with a zone cover that zone of their department; staff without
+#   one cover all of it. Requests filed without a zone (all those from
+#   before zones were recorded) go to anyone in the department.
+# - Load is open requests over max_open_requests, read from the
+#   trigger-maintained field_staff.open_requests at the start of each
+#   cycle and kept in one heap per (department, zone) during it.
+# - Assignments are written ASSIGNMENT_BATCH_SIZE per transaction, each only
+#   if the request is still Pending and unassigned, so engines in other
+#   processes (or an admin) can never double-assign.
+# - submit() wakes the engine, so a request filed here is assigned within a
+#   cycle of its commit; requests filed by other processes are picked up
+#   within POLL_SECONDS. Older requests that become Pending and unassigned
+#   again (moved back from In Progress, or their staff member went
+#   offline) are found by updated_at on the next cycle. The queues are
+#   rebuilt from the database whenever the online roster changes and every
+#   RELOAD_SECONDS.
+# - Taking a member offline (set_staff_online) returns their Pending
+#   requests to the queue to be spread over the rest.
+# - Assignments whose batch failed to commit go back into the queues.
+
+logger = logging.getLogger(__name__)
+
+ZONES = ["Zone 1", "Zone 2", "Zone 3", "Zone 4"]
+ASSIGNED_BY = 'Auto-assignment'
+
+DEFAULT_MAX_OPEN_REQUESTS = 20
+ASSIGNMENT_BATCH_SIZE = 200
+POLL_SECONDS = 5
+RELOAD_SECONDS = 5 * 60
+# How far back each cycle looks for requeued requests before the previous
+# load, so a write committed late with an earlier updated_at is not missed
+REQUEUE_OVERLAP = timedelta(minutes=1)
+
+REQUEST_COLUMNS = 'id, request_id, user_id, department, zone, priority, priority_order, created_at'
+
+
+def add_field_staff(conn, staff_data):
+    """Register a field staff member and return their staff_id"""
+    staff_id = staff_data.get('staff_id') or new_id('STAFF')
+    with conn.transaction() as tx:
+        tx.execute('''
+            INSERT INTO field_staff
+            (staff_id, name, phone, department, zone, is_online, max_open_requests, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            staff_id,
+            staff_data.get('name'),
+            staff_data.get('phone'),
+            staff_data.get('department'),
+            staff_data.get('zone'),
+            staff_data.get('is_online', True),
+            staff_data.get('max_open_requests', DEFAULT_MAX_OPEN_REQUESTS),
+            datetime.now(),
+            datetime.now()
+        ))
+    return staff_id
+
+
+def get_field_staff(conn, department=None):
+    """Every field staff member (optionally of one department), by department and zone"""
+    sql = '''
+        SELECT staff_id, name, phone, department, zone, is_online, open_requests, max_open_requests
+        FROM field_staff
+    '''
+    if department:
+        return conn.execute(sql + ' WHERE department=? ORDER BY department, zone, name',
+                            (department,)).fetchall()
+    return conn.execute(sql + ' ORDER BY department, zone, name').fetchall()
+
+
+def set_staff_online(conn, staff_id, online, updated_by=ASSIGNED_BY):
+    """Take a staff member on or offline; returns how many requests went back to the queue.
+    
+    Going offline unassigns their Pending requests (In Progress work stays
+    with them). Engines notice the roster change and reassign on their next
+    cycle.
+    """
+    now = datetime.now()
+    with conn.transaction() as tx:
+        cursor = tx.cursor()
+        cursor.execute('UPDATE field_staff SET is_online=?, updated_at=? WHERE staff_id=?',
+                       (bool(online), now, staff_id))
+        if online:
+            return 0
+        cursor.execute('''
+            SELECT request_id FROM service_requests
+            WHERE assigned_to=? AND status='Pending'
+        ''', (staff_id,))
+        released = [request_id for (request_id,) in cursor.fetchall()]
+        cursor.executemany('''
+            UPDATE service_requests SET assigned_to=NULL, estimated_completion=NULL, updated_at=?
+            WHERE request_id=?
+        ''', [(now, request_id) for request_id in released])
+        cursor.executemany('''
+            INSERT INTO request_status_history
+            (request_id, status, comments, updated_by, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(request_id, 'Pending', 'Returned to the queue: staff member offline', updated_by, now)
+              for request_id in released])
+    return len(released)
+
+
+def estimated_completion(created_at, priority, today=None):
+    """The priority's SLA target from filing, but never before tomorrow"""
+    today = today or datetime.now().date()
+    filed = datetime.fromisoformat(str(created_at)).date()
+    target = filed + timedelta(days=SLA_TARGET_DAYS.get(priority, DEFAULT_SLA_TARGET_DAYS))
+    return max(target, today + timedelta(days=1))
+
+
+class AssignmentEngine:
+    """Assigns Pending requests to the least-loaded field staff on a daemon thread"""
+    
+    def __init__(self, conn, poll_seconds=POLL_SECONDS, reload_seconds=RELOAD_SECONDS,
+                 batch_size=ASSIGNMENT_BATCH_SIZE):
+        self.conn = conn
+        self.poll_seconds = poll_seconds
+        self.reload_seconds = reload_seconds
+        self.batch_size = batch_size
+        self.last_run = None
+        self.last_error = None
+        # (department, zone) -> heap of (priority_order, created_at, id, request_id, user_id, priority)
+        self._queues = {}
+        self._queued = set()  # request_ids in the queues
+        self._last_id = 0
+        self._loaded_at = None
+        self._roster = None
+        self._reloaded_at = 0
+        self._reload = True
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='assignment', daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+    
+    def submit(self, request_id=None):
+        """Wake the engine for a freshly committed request"""
+        self._wake.set()
+    
+    def rebalance(self):
+        """Rebuild the queues from the database on the next cycle, and run it now"""
+        self._reload = True
+        self._wake.set()
+    
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception('Assignment cycle failed')
+    
+    def queue_sizes(self):
+        """[(department, zone, queued, emergencies)] of the in-memory queues"""
+        with self._lock:
+            return [(department, zone, len(queue), sum(1 for entry in queue if entry[0] == 0))
+                    for (department, zone), queue in sorted(self._queues.items(), key=lambda item: (
+                        item[0][0], item[0][1] or '')) if queue]
+    
+    def run_once(self):
+        """One cycle: refresh staff and queues, assign, persist; returns its stats"""
+        with self._lock:
+            started = time.perf_counter()
+            staff, pools = self._load_staff()
+            roster = frozenset(staff)
+            if (self._reload or roster != self._roster
+                    or time.monotonic() - self._reloaded_at > self.reload_seconds):
+                self._load_requests(reload=True)
+                self._roster = roster
+            else:
+                self._load_requests()
+            
+            assignments = self._assign(staff, pools)
+            assigned = self._persist(assignments)
+            self.last_run = {
+                'at': datetime.now(),
+                'assigned': assigned,
+                # Taken by another engine or changed since they were queued
+                'skipped': len(assignments) - assigned,
+                'queued': sum(len(queue) for queue in self._queues.values()),
+                'staff_online': len(staff),
+                'ms': (time.perf_counter() - started) * 1000
+            }
+            return self.last_run
+    
+    def _load_staff(self):
+        """Online staff (staff_id -> [load, capacity, name, pool]) and their
+        load heaps per (department, zone)"""
+        staff = {}
+        pools = {}
+        for staff_id, name, department, zone, capacity, load in self.conn.execute('''
+            SELECT staff_id, name, department, zone, max_open_requests, open_requests
+            FROM field_staff WHERE is_online
+        '''):
+            capacity = max(capacity or 0, 1)
+            staff[staff_id] = [load, capacity, name, (department, zone)]
+            pools.setdefault((department, zone), []).append((load / capacity, load, staff_id))
+        for pool in pools.values():
+            heapq.heapify(pool)
+        return staff, pools
+    
+    def _queue(self, row):
+        row_id, request_id, user_id, department, zone, priority, priority_order, created_at = row
+        if request_id not in self._queued:
+            self._requeue(((department, zone),
+                           (priority_order, created_at, row_id, request_id, user_id, priority)))
+    
+    def _requeue(self, item):
+        key, entry = item
+        self._queued.add(entry[3])
+        heapq.heappush(self._queues.setdefault(key, []), entry)
+    
+    def _load_requests(self, reload=False):
+        """Queue unassigned Pending requests: all of them, or those filed or
+        put back since the last load"""
+        loaded_at = datetime.now()
+        if reload:
+            self._queues = {}
+            self._queued = set()
+            self._last_id = 0
+        elif self._loaded_at is not None:
+            for row in self.conn.execute(f'''
+                SELECT {REQUEST_COLUMNS} FROM service_requests
+                WHERE status = 'Pending' AND assigned_to IS NULL AND updated_at >= ?
+            ''', (self._loaded_at - REQUEUE_OVERLAP,)):
+                self._queue(row)
+        cursor = self.conn.execute(f'''
+            SELECT {REQUEST_COLUMNS} FROM service_requests
+            WHERE status = 'Pending' AND assigned_to IS NULL AND id > ?
+            ORDER BY id
+        ''', (self._last_id,))
+        for row in cursor:
+            self._queue(row)
+            self._last_id = row[0]
+        self._loaded_at = loaded_at
+        if reload:
+            self._reloaded_at = time.monotonic()
+            self._reload = False
+    
+    def _least_loaded(self, staff, pools, department, zone):
+        """The least-loaded member with room who covers (department, zone), or None"""
+        if zone is None:
+            candidates = [key for key in pools if key[0] == department]
+        else:
+            candidates = [(department, zone), (department, None)]
+        best = None
+        for key in candidates:
+            pool = pools.get(key)
+            # Entries left behind by an earlier assignment are dropped here
+            while pool and pool[0][1] != staff[pool[0][2]][0]:
+                heapq.heappop(pool)
+            if pool and (best is None or pool[0] < best):
+                best = pool[0]
+        if best is None or best[0] >= 1:
+            return None
+        return best[2]
+    
+    def _assign(self, staff, pools):
+        """Pick staff for as many queued requests as there is room for, most urgent first"""
+        assignments = []
+        heads = [(queue[0], key) for key, queue in self._queues.items() if queue]
+        heapq.heapify(heads)
+        while heads:
+            head, key = heapq.heappop(heads)
+            staff_id = self._least_loaded(staff, pools, *key)
+            if staff_id is None:
+                continue  # everyone covering this queue is full
+            queue = self._queues[key]
+            entry = heapq.heappop(queue)
+            priority_order, created_at, row_id, request_id, user_id, priority = entry
+            self._queued.discard(request_id)
+            member = staff[staff_id]
+            member[0] += 1
+            heapq.heappush(pools[member[3]], (member[0] / member[1], member[0], staff_id))
+            assignments.append((request_id, user_id, staff_id, member[2],
+                                estimated_completion(created_at, priority), (key, entry)))
+            if queue:
+                heapq.heappush(heads, (queue[0], key))
+        return assignments
+    
+    def _persist(self, assignments):
+        """Write assignments in batches; returns how many took"""
+        assigned = 0
+        for start in range(0, len(assignments), self.batch_size):
+            batch = assignments[start:start + self.batch_size]
+            try:
+                done = self._persist_batch(batch)
+            except Exception:
+                # Nothing from this batch on was written; keep it queued
+                for assignment in assignments[start:]:
+                    self._requeue(assignment[-1])
+                raise
+            assigned += len(done)
+        return assigned
+    
+    def _persist_batch(self, batch):
+        """Write one batch in a transaction; returns the assignments that took"""
+        now = datetime.now()
+        done = []
+        with self.conn.transaction() as tx:
+            cursor = tx.cursor()
+            for request_id, user_id, staff_id, name, estimate, item in batch:
+                cursor.execute('''
+                    UPDATE service_requests SET assigned_to=?, estimated_completion=?, updated_at=?
+                    WHERE request_id=? AND status='Pending' AND assigned_to IS NULL
+                ''', (staff_id, estimate, now, request_id))
+                if cursor.rowcount:
+                    done.append((request_id, user_id, name, estimate))
+            cursor.executemany('''
+                INSERT INTO request_status_history
+                (request_id, status, comments, updated_by, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(request_id, 'Pending', f'Assigned to {name}', ASSIGNED_BY, now)
+                  for request_id, user_id, name, estimate in done])
+            cursor.executemany('''
+                INSERT INTO notifications (user_id, notification_type, title, message, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(user_id, 'request_assigned', 'Request Assigned',
+                   f'Your service request {request_id} has been assigned to {name}. '
+                   f'Expected completion: {estimate:%d %b %Y}', now)
+                  for request_id, user_id, name, estimate in done if user_id is not None])
+        return done
+
+
+if __name__ == "__main__":
+    # Usage: python assignment.py [db_path] - run one assignment cycle
+    from connection_manager import ConnectionManager
+    from migrations import ensure_schema
+    
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'suvidha_live.db'
+    manager = ConnectionManager(db_path)
+    ensure_schema(manager)
+    print(AssignmentEngine(manager).run_once())
@@ -6,20 +6,30 @@ import numpy as np
 import pyotp
 import qrcode
 from datetime import datetime, timedelta
-import sqlite3
 import hashlib
 import json
 from twilio.rest import Client
 import os
+from connection_manager import ConnectionManager
+from resources import get_resource, check_connection
 
 class AdvancedAuthSystem:
     def __init__(self):
-        self.db = sqlite3.connect('suvidha_auth.db', check_same_thread=False)
-        self.init_auth_db()
-        self.twilio_client = Client(os.getenv('TWILIO_SID'), os.getenv('TWILIO_TOKEN'))
+        # The database and Twilio client are shared process-wide; the
+        # ConnectionManager gives each session thread its own connection
+        self.db = get_resource('auth_db', self.open_auth_db, check_connection,
+                               teardown=lambda conn: conn.close())
+        self.twilio_client = get_resource(
+            'auth_sms', lambda: Client(os.getenv('TWILIO_SID'), os.getenv('TWILIO_TOKEN')))
     
-    def init_auth_db(self):
-        cursor = self.db.cursor()
+    def open_auth_db(self):
+        """Open the auth database and create its tables"""
+        conn = ConnectionManager('suvidha_auth.db')
+        self.init_auth_db(conn)
+        return conn
+    
+    def init_auth_db(self, conn):
+        cursor = conn.cursor()
         # User profiles with biometric data
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -63,7 +73,7 @@ class AdvancedAuthSystem:
             )
         ''')
         
-        self.db.commit()
+        conn.commit()
     
     def multimodal_login(self):
         """Offers multiple login options"""
@@ -0,0 +1,454 @@
+# benchmark.py
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import datetime, timedelta
+from streamlit import config as streamlit_config, logger as streamlit_logger
+from database import ComprehensiveDatabase
+from analytics import LiveAnalyticsDashboard
+from synthetic_data import SCALES, SyntheticDataGenerator, parse_scale
+
+# Times every public query and write path of ComprehensiveDatabase and the
+# query side of the analytics dashboard against synthetic databases of each
+# scale. Results are JSON so two commits can be compared with
+# `python benchmark.py compare old.json new.json`.
+
+DEFAULT_ITERATIONS = 20
+DEFAULT_DATA_DIR = 'bench_data'
+SAMPLE_SIZE = 200
+SEARCH_TERMS = ['power', 'water leak', 'garbage', 'meter', 'gas', 'pipeline', 'connection']
+
+# Registered cases as (name, function). Each write case runs inside a
+# transaction that is rolled back, so benchmark databases do not drift between
+# runs; the timings therefore leave out the (WAL, synchronous=NORMAL) commit.
+READ_CASES = []
+WRITE_CASES = []
+
+
+def read_case(func):
+    READ_CASES.append((func.__name__, func))
+    return func
+
+
+def write_case(func):
+    WRITE_CASES.append((func.__name__, func))
+    return func
+
+
+class BenchmarkContext:
+    """Database, dashboard and random sample keys shared by the cases"""
+    
+    def __init__(self, db, seed=7):
+        self.db = db
+        self.analytics = LiveAnalyticsDashboard(db.conn)
+        self.rng = random.Random(seed)
+        self.today = datetime.now().date()
+        cursor = db.conn.cursor()
+        
+        # Random picks by rowid stay cheap at any table size
+        cursor.execute("SELECT MAX(id) FROM users")
+        max_user = cursor.fetchone()[0] or 1
+        user_ids = {self.rng.randint(1, max_user) for _ in range(SAMPLE_SIZE)}
+        cursor.execute(f'''
+            SELECT id, user_id, aadhaar FROM users
+            WHERE id IN ({', '.join('?' for _ in user_ids)})
+        ''', list(user_ids))
+        self.users = cursor.fetchall()
+        
+        cursor.execute("SELECT MAX(id) FROM service_requests")
+        max_request = cursor.fetchone()[0] or 1
+        request_ids = {self.rng.randint(1, max_request) for _ in range(SAMPLE_SIZE)}
+        cursor.execute(f'''
+            SELECT request_id FROM service_requests
+            WHERE id IN ({', '.join('?' for _ in request_ids)})
+        ''', list(request_ids))
+        self.requests = [row[0] for row in cursor.fetchall()]
+        
+        cursor.execute("SELECT payment_id FROM payments ORDER BY id DESC LIMIT ?", (SAMPLE_SIZE,))
+        self.payments = [row[0] for row in cursor.fetchall()]
+    
+    def user(self):
+        return self.rng.choice(self.users)
+    
+    def request_id(self):
+        return self.rng.choice(self.requests)
+
+
+@read_case
+def get_user_by_aadhaar(ctx):
+    ctx.db.get_user_by_aadhaar(ctx.user()[2])
+
+
+@read_case
+def get_user_by_id(ctx):
+    ctx.db.get_user_by_id(ctx.user()[1])
+
+
+@read_case
+def get_user_requests(ctx):
+    ctx.db.get_user_requests(ctx.user()[0])
+
+
+@read_case
+def get_user_requests_page(ctx):
+    ctx.db.get_user_requests_page(ctx.user()[0])
+
+
+@read_case
+def get_user_requests_second_page(ctx):
+    rows, next_cursor = ctx.db.get_user_requests_page(ctx.user()[0], page_size=5)
+    if next_cursor:
+        ctx.db.get_user_requests_page(ctx.user()[0], after=next_cursor, page_size=5)
+
+
+@read_case
+def get_request_by_id(ctx):
+    ctx.db.get_request_by_id(ctx.request_id())
+
+
+@read_case
+def get_request_by_id_with_archive(ctx):
+    ctx.db.get_request_by_id(ctx.request_id(), include_archived=True)
+
+
+@read_case
+def get_request_history(ctx):
+    ctx.db.get_request_history(ctx.request_id())
+
+
+@read_case
+def get_requests_history_page(ctx):
+    ctx.db.get_requests_history(ctx.rng.sample(ctx.requests, min(20, len(ctx.requests))))
+
+
+@read_case
+def search_requests_for_user(ctx):
+    ctx.db.search_requests(ctx.rng.choice(SEARCH_TERMS), user_id=ctx.user()[0])
+
+
+@read_case
+def search_requests_all(ctx):
+    ctx.db.search_requests(ctx.rng.choice(SEARCH_TERMS))
+
+
+@read_case
+def get_daily_metrics(ctx):
+    ctx.db.get_daily_metrics(ctx.today - timedelta(days=ctx.rng.randint(0, 30)))
+
+
+@read_case
+def get_daily_rollups_30_days(ctx):
+    ctx.db.get_daily_rollups(ctx.today - timedelta(days=30), ctx.today)
+
+
+@read_case
+def get_user_payments(ctx):
+    ctx.db.get_user_payments(ctx.user()[0])
+
+
+@read_case
+def get_user_payments_page(ctx):
+    ctx.db.get_user_payments_page(ctx.user()[0])
+
+
+@read_case
+def get_user_documents(ctx):
+    ctx.db.get_user_documents(ctx.user()[0])
+
+
+@read_case
+def get_user_documents_page(ctx):
+    ctx.db.get_user_documents_page(ctx.user()[0])
+
+
+@read_case
+def search_documents(ctx):
+    ctx.db.search_documents('proof', user_id=ctx.user()[0])
+
+
+@read_case
+def get_user_notifications(ctx):
+    ctx.db.get_user_notifications(ctx.user()[0])
+
+
+@read_case
+def get_user_notifications_unread(ctx):
+    ctx.db.get_user_notifications(ctx.user()[0], unread_only=True)
+
+
+@read_case
+def get_user_notifications_page(ctx):
+    ctx.db.get_user_notifications_page(ctx.user()[0])
+
+
+@read_case
+def get_all_departments(ctx):
+    ctx.db.get_all_departments()
+
+
+@read_case
+def analytics_get_live_metrics(ctx):
+    ctx.analytics.get_live_metrics(ctx.today - timedelta(days=30), ctx.today)
+
+
+@read_case
+def analytics_get_time_series_data(ctx):
+    ctx.analytics.get_time_series_data()
+
+
+@read_case
+def analytics_citizen_tab(ctx):
+    ctx.analytics.show_citizen_analytics(ctx.today - timedelta(days=30), ctx.today)
+
+
+@read_case
+def analytics_department_tab(ctx):
+    ctx.analytics.show_department_analytics(ctx.today - timedelta(days=30), ctx.today)
+
+
+@write_case
+def create_user(ctx):
+    ctx.db.create_user({
+        'aadhaar': f"{ctx.rng.randrange(10 ** 11, 6 * 10 ** 11)}",
+        'name': 'Benchmark User',
+        'phone': '9000000000'
+    })
+
+
+@write_case
+def create_service_request(ctx):
+    ctx.db.create_service_request({
+        'user_id': ctx.user()[0],
+        'department': '⚡ Electricity Department',
+        'service_type': 'Power Outage',
+        'description': 'Benchmark power outage request',
+        'user_name': 'Benchmark'
+    })
+
+
+@write_case
+def update_request_status(ctx):
+    ctx.db.update_request_status(ctx.request_id(), 'In Progress', 'Benchmark update', 'Benchmark')
+
+
+@write_case
+def update_request_status_bulk_1000(ctx):
+    ctx.db.update_request_status_bulk([ctx.request_id() for _ in range(1000)], 'Rejected',
+                                      'Benchmark bulk update', 'Benchmark')
+
+
+@write_case
+def create_payment(ctx):
+    ctx.db.create_payment({'user_id': ctx.user()[0], 'bill_type': 'Water', 'amount': 100.0})
+
+
+@write_case
+def update_payment_status(ctx):
+    ctx.db.update_payment_status(ctx.rng.choice(ctx.payments), 'Completed', 'TXNBENCH')
+
+
+@write_case
+def save_document(ctx):
+    ctx.db.save_document({
+        'user_id': ctx.user()[0],
+        'document_type': 'ID Proof',
+        'document_name': 'benchmark.pdf',
+        'file_path': 'uploads/benchmark.pdf',
+        'file_size': 1024
+    })
+
+
+@write_case
+def add_notification(ctx):
+    ctx.db.add_notification({
+        'user_id': ctx.user()[0],
+        'notification_type': 'benchmark',
+        'title': 'Benchmark',
+        'message': 'Benchmark notification'
+    })
+
+
+@write_case
+def mark_all_notifications_read(ctx):
+    ctx.db.mark_all_notifications_read(ctx.user()[0])
+
+
+@write_case
+def create_service_requests_bulk_1000(ctx):
+    user_id = ctx.user()[0]
+    ctx.db.create_service_requests_bulk({
+        'user_id': user_id,
+        'department': '💧 Water Department',
+        'service_type': 'Pipeline Leakage',
+        'description': 'Benchmark bulk request'
+    } for _ in range(1000))
+
+
+class _Rollback(Exception):
+    """Raised to undo a write case's transaction"""
+
+
+def _call(func, ctx, rollback):
+    """Milliseconds taken by one func(ctx) call"""
+    if not rollback:
+        started = time.perf_counter()
+        func(ctx)
+        return (time.perf_counter() - started) * 1000
+    try:
+        with ctx.db.conn.transaction():
+            started = time.perf_counter()
+            func(ctx)
+            elapsed = (time.perf_counter() - started) * 1000
+            raise _Rollback()
+    except _Rollback:
+        return elapsed
+
+
+def time_case(func, ctx, iterations, rollback=False):
+    """Run func once to warm up, then time iterations calls in milliseconds"""
+    _call(func, ctx, rollback)
+    timings = [_call(func, ctx, rollback) for _ in range(iterations)]
+    timings.sort()
+    return {
+        'iterations': iterations,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'max_ms': round(timings[-1], 3)
+    }
+
+
+def table_counts(db):
+    cursor = db.conn.cursor()
+    counts = {}
+    for table in ['users', 'service_requests', 'request_status_history', 'payments', 'documents', 'notifications']:
+        cursor.execute(f'SELECT COUNT(*) FROM {table}')
+        counts[table] = cursor.fetchone()[0]
+    return counts
+
+
+def prepare_database(scale, data_dir, fresh=False, seed=42):
+    """Open the synthetic database for a scale, generating it when missing"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'suvidha_{scale}.db')
+    if fresh:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        archive_path = path[:-3] + '_archive.db'
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+    
+    generated = None
+    exists = os.path.exists(path)
+    db = ComprehensiveDatabase(path)
+    if not exists:
+        print(f"[{scale}] generating synthetic data into {path}")
+        generator = SyntheticDataGenerator(db, seed=seed)
+        generated = generator.generate(parse_scale(scale), progress=lambda line: print(f"[{scale}] {line}"))
+    return db, generated
+
+
+def run_scale(scale, data_dir, iterations, fresh=False, include_writes=True):
+    db, generated = prepare_database(scale, data_dir, fresh)
+    ctx = BenchmarkContext(db)
+    cases = READ_CASES + (WRITE_CASES if include_writes else [])
+    results = {}
+    for name, func in cases:
+        # Bulk writes are slow; a few runs are enough
+        runs = max(3, iterations // 10) if name.endswith('_bulk_1000') else iterations
+        try:
+            results[name] = time_case(func, ctx, runs, rollback=(name, func) in WRITE_CASES)
+        except Exception as e:
+            # A broken path is reported, not allowed to end the whole run
+            results[name] = {'error': f'{type(e).__name__}: {e}'}
+            print(f"[{scale}] {name:36s} failed: {results[name]['error']}")
+            continue
+        print(f"[{scale}] {name:36s} median {results[name]['median_ms']:>9.3f} ms  "
+              f"p95 {results[name]['p95_ms']:>9.3f} ms")
+    return {
+        'rows': table_counts(db),
+        'generation': generated,
+        'cases': results
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales, data_dir=DEFAULT_DATA_DIR, iterations=DEFAULT_ITERATIONS, fresh=False, include_writes=True):
+    """Benchmark every scale and return the results document"""
+    # The analytics tabs render outside a Streamlit session. Load Streamlit's
+    # config first, since that resets its log level, then mute the warnings.
+    streamlit_config.get_option('logger.level')
+    streamlit_logger.set_log_level('error')
+    return {
+        'commit': git_commit(),
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'iterations': iterations,
+        'scales': {scale: run_scale(scale, data_dir, iterations, fresh, include_writes) for scale in scales}
+    }
+
+
+def compare(old, new, threshold=1.2):
+    """Rows of (scale, case, old median, new median, ratio, flag) for cases in both runs"""
+    rows = []
+    for scale, new_scale in new['scales'].items():
+        old_cases = old['scales'].get(scale, {}).get('cases', {})
+        for name, stats in new_scale['cases'].items():
+            if name not in old_cases or 'error' in stats or 'error' in old_cases[name]:
+                continue
+            before = old_cases[name]['median_ms']
+            after = stats['median_ms']
+            ratio = after / before if before else float('inf')
+            flag = 'SLOWER' if ratio > threshold else ('faster' if ratio < 1 / threshold else '')
+            rows.append((scale, name, before, after, ratio, flag))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the SUVIDHA database layer at scale")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    run_parser = commands.add_parser('run', help="run the benchmark suite")
+    run_parser.add_argument('--scales', nargs='+', default=['10k'], help=f"any of {', '.join(SCALES)}")
+    run_parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    run_parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where generated databases are kept")
+    run_parser.add_argument('--fresh', action='store_true', help="regenerate the databases first")
+    run_parser.add_argument('--reads-only', action='store_true', help="skip the write paths")
+    run_parser.add_argument('--output', help="results file (default: benchmark_<commit>.json)")
+    
+    compare_parser = commands.add_parser('compare', help="compare two results files")
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=1.2,
+                                help="flag cases whose median changed by more than this factor")
+    args = parser.parse_args()
+    
+    if args.command == 'run':
+        results = run(args.scales, args.data_dir, args.iterations, args.fresh, not args.reads_only)
+        output = args.output or f"benchmark_{results['commit'] or datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"Results written to {output}")
+    else:
+        with open(args.old, encoding='utf-8') as f:
+            old = json.load(f)
+        with open(args.new, encoding='utf-8') as f:
+            new = json.load(f)
+        for scale, name, before, after, ratio, flag in compare(old, new, args.threshold):
+            print(f"{scale:>5} {name:36s} {before:>9.3f} -> {after:>9.3f} ms  x{ratio:5.2f} {flag}")
@@ -0,0 +1,269 @@
+# connection_manager.py
+import sqlite3
+import threading
+import time
+import random
+from contextlib import contextmanager
+from datetime import date, datetime
+import query_stats
+
+# Connection tuning applied to every new connection
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_SYNCHRONOUS = 'NORMAL'
+
+# Retry settings for SQLITE_BUSY / SQLITE_LOCKED errors
+MAX_BUSY_RETRIES = 6
+BASE_BACKOFF_SECONDS = 0.02
+MAX_BACKOFF_SECONDS = 1.0
+
+# Timestamps are stored as local time in one canonical text format, so they
+# compare and sort correctly as strings and the generated created_day /
+# created_hour columns can slice them. The default adapter would write
+# isoformat() with microseconds, mixing formats with CURRENT_TIMESTAMP.
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+sqlite3.register_adapter(datetime, lambda value: value.strftime(TIMESTAMP_FORMAT))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+
+
+def is_busy_error(error):
+    """Check whether an OperationalError is a transient lock/busy error"""
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message or 'database table is locked' in message
+
+
+def retry_on_busy(func, *args, **kwargs):
+    """Call func, retrying with exponential backoff and jitter while the database is busy"""
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt >= MAX_BUSY_RETRIES:
+                raise
+            delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * (2 ** attempt))
+            time.sleep(delay * (0.5 + random.random() / 2))
+            attempt += 1
+
+
+class RetryingCursor(sqlite3.Cursor):
+    """Cursor that retries statements which fail with SQLITE_BUSY.
+
+    Statements are timed by query_stats while it is enabled; while disabled
+    the only cost is the recorder check.
+    """
+
+    def execute(self, sql, parameters=()):
+        recorder = query_stats.recorder
+        if recorder is None:
+            return retry_on_busy(super().execute, sql, parameters)
+        with recorder.measure(self, sql, parameters):
+            return retry_on_busy(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # Materialize generators so a retry replays the same rows
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        recorder = query_stats.recorder
+        if recorder is None:
+            return retry_on_busy(super().executemany, sql, seq_of_parameters)
+        with recorder.measure(self, sql, seq_of_parameters):
+            return retry_on_busy(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        recorder = query_stats.recorder
+        if recorder is None:
+            return retry_on_busy(super().executescript, sql_script)
+        with recorder.measure(self, sql_script):
+            return retry_on_busy(super().executescript, sql_script)
+
+
+class ManagedConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors and commits retry on SQLITE_BUSY"""
+
+    def cursor(self, factory=RetryingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        return retry_on_busy(super().commit)
+
+
+class ConnectionManager:
+    """Hands out one SQLite connection per thread for a database file.
+
+    The manager exposes the same cursor()/execute()/commit()/rollback() API as a
+    sqlite3 connection, so it can be passed anywhere a connection was used before.
+    Every call is routed to the calling thread's own connection, which is opened
+    lazily with WAL journaling, a busy timeout and the configured synchronous mode.
+    Connections belonging to threads that have exited are closed automatically.
+    Databases registered with attach() are ATTACHed to every connection.
+    """
+
+    def __init__(self, db_name, busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS,
+                 synchronous=DEFAULT_SYNCHRONOUS):
+        self.db_name = db_name
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}  # thread ident -> (thread, connection)
+        self._attachments = {}  # schema name -> database path
+        self._closed = False
+
+    def _open_connection(self):
+        """Open and configure a new connection for the current thread"""
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            factory=ManagedConnection
+        )
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        retry_on_busy(conn.execute, 'PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.attached = set()
+        self._attach_missing(conn)
+        return conn
+
+    def _attach_missing(self, conn):
+        """ATTACH any registered databases this connection does not have yet"""
+        for schema, path in list(self._attachments.items()):
+            if schema in conn.attached:
+                continue
+            retry_on_busy(conn.execute, f'ATTACH DATABASE ? AS {schema}', (path,))
+            retry_on_busy(conn.execute, f'PRAGMA {schema}.journal_mode=WAL')
+            conn.execute(f'PRAGMA {schema}.synchronous={self.synchronous}')
+            conn.attached.add(schema)
+
+    def _reap_dead_threads(self):
+        """Close connections owned by threads that are no longer alive"""
+        for ident, (thread, conn) in list(self._connections.items()):
+            if not thread.is_alive():
+                del self._connections[ident]
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+
+    @property
+    def connection(self):
+        """Get the calling thread's connection, opening it if needed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError('ConnectionManager has been closed')
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._lock:
+                self._reap_dead_threads()
+                thread = threading.current_thread()
+                self._connections[thread.ident] = (thread, conn)
+        elif len(conn.attached) != len(self._attachments):
+            self._attach_missing(conn)
+        return conn
+
+    def attach(self, schema, path):
+        """Attach the database at path as schema on every connection.
+
+        The calling thread's connection is attached immediately; other
+        threads attach on their next use. Must not be called mid-transaction.
+        """
+        with self._lock:
+            self._attachments[schema] = path
+        self._attach_missing(self.connection)
+
+    # sqlite3.Connection compatible API
+    def cursor(self):
+        return self.connection.cursor()
+
+    def execute(self, sql, parameters=()):
+        return self.connection.execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.connection.executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        # Inside transaction() the outermost block commits for everyone
+        if getattr(self._local, 'depth', 0):
+            return
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    @property
+    def in_transaction(self):
+        return self.connection.in_transaction
+
+    @property
+    def total_changes(self):
+        return self.connection.total_changes
+
+    @contextmanager
+    def transaction(self):
+        """Run a block in one write transaction on this thread's connection.
+
+        Nested transaction() blocks join the outer one, and commit() calls
+        made through the manager inside the block are deferred, so helpers
+        that commit on their own can be grouped into a single commit.
+        """
+        conn = self.connection
+        depth = getattr(self._local, 'depth', 0)
+        if depth:
+            self._local.depth = depth + 1
+            try:
+                yield conn
+            finally:
+                self._local.depth = depth
+            return
+
+        if conn.in_transaction:
+            conn.commit()
+        retry_on_busy(conn.execute, 'BEGIN IMMEDIATE')
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            self._local.depth = 0
+
+    @contextmanager
+    def snapshot(self):
+        """Run a block of reads against one consistent view of the database.
+
+        Opens a read transaction on this thread's connection. In WAL mode
+        writers carry on meanwhile, and the block keeps seeing the database
+        as of its first read. Inside a transaction() block the caller
+        already has a consistent view, so the block just joins it.
+        """
+        conn = self.connection
+        if getattr(self._local, 'depth', 0) or conn.in_transaction:
+            yield conn
+            return
+
+        conn.execute('BEGIN')
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+    def close(self):
+        """Close every connection opened by this manager"""
+        with self._lock:
+            self._closed = True
+            for thread, conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
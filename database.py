@@ -1,229 +1,471 @@
 # database_updated.py
-import sqlite3
+import re
 import pandas as pd
 from datetime import datetime, timedelta
 import json
+from contextlib import contextmanager
+from connection_manager import ConnectionManager
+from migrations import ensure_schema
+from rollups import get_daily_rollups, rebuild_daily_rollups
+from archive import (ensure_archive, union_source, stored_columns, archive_closed_requests,
+                     DEFAULT_ARCHIVE_AFTER_DAYS, DEFAULT_ARCHIVE_BATCH_SIZE)
+import os
+import time
+from id_generator import new_id, init_node_id
+from storage import record_usage, UPLOADS_AREA
+from document_store import release_blob, DEFAULT_BLOB_ROOT
+from status_transitions import transition_requests, TRANSITION_CHUNK_SIZE
 
-class ComprehensiveDatabase:
-    def __init__(self, db_name='suvidha_comprehensive.db'):
-        self.conn = sqlite3.connect(db_name, check_same_thread=False)
-        self.create_comprehensive_tables()
+# Rows written per transaction by the bulk ingestion methods
+DEFAULT_BULK_CHUNK_SIZE = 5000
+
+def chunked(rows, size):
+    """Yield lists of up to size items from any iterable or generator"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Rows fetched per page by the keyset-paginated listings
+DEFAULT_PAGE_SIZE = 20
+
+def fetch_page(conn, table, columns, where, params=(), after=None,
+               page_size=DEFAULT_PAGE_SIZE, order_column='created_at', include_archived=False):
+    """Fetch one page of rows, newest first, using keyset pagination.
     
-    def create_comprehensive_tables(self):
-        """Create all tables for the comprehensive system"""
-        cursor = self.conn.cursor()
-        
-        # 1. Users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT UNIQUE,
-                aadhaar TEXT UNIQUE,
-                name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                email TEXT,
-                address TEXT,
-                pincode TEXT,
-                language TEXT DEFAULT 'en',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP,
-                is_active BOOLEAN DEFAULT TRUE,
-                user_type TEXT DEFAULT 'citizen',
-                photo_path TEXT
-            )
-        ''')
-        
-        # 2. Service requests table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS service_requests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                request_id TEXT UNIQUE,
-                user_id INTEGER,
-                department TEXT NOT NULL,
-                service_type TEXT NOT NULL,
-                description TEXT NOT NULL,
-                address TEXT,
-                pincode TEXT,
-                language TEXT DEFAULT 'en',
-                priority TEXT DEFAULT 'Medium',
-                status TEXT DEFAULT 'Pending',
-                assigned_to TEXT,
-                estimated_completion DATE,
-                actual_completion DATE,
-                feedback_rating INTEGER CHECK(feedback_rating >= 1 AND feedback_rating <= 5),
-                feedback_comment TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # 3. Request status history
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS request_status_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                request_id TEXT,
-                status TEXT,
-                comments TEXT,
-                updated_by TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (request_id) REFERENCES service_requests (request_id)
-            )
-        ''')
-        
-        # 4. Payments table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS payments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                payment_id TEXT UNIQUE,
-                request_id TEXT,
-                user_id INTEGER,
-                bill_type TEXT,
-                bill_number TEXT,
-                amount REAL NOT NULL,
-                due_date DATE,
-                payment_method TEXT,
-                transaction_id TEXT,
-                status TEXT DEFAULT 'Pending',
-                receipt_path TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completed_at TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (request_id) REFERENCES service_requests (request_id)
-            )
-        ''')
-        
-        # 5. Documents table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                doc_id TEXT UNIQUE,
-                user_id INTEGER,
-                request_id TEXT,
-                document_type TEXT,
-                document_name TEXT,
-                file_path TEXT,
-                file_size INTEGER,
-                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                verified BOOLEAN DEFAULT FALSE,
-                verified_by TEXT,
-                verified_at TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (request_id) REFERENCES service_requests (request_id)
-            )
-        ''')
-        
-        # 6. Notifications table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS notifications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                notification_type TEXT,
-                title TEXT,
-                message TEXT,
-                is_read BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # 7. Analytics table (for precomputed metrics)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS analytics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                metric_date DATE UNIQUE,
-                total_requests INTEGER DEFAULT 0,
-                completed_requests INTEGER DEFAULT 0,
-                pending_requests INTEGER DEFAULT 0,
-                avg_completion_time REAL,
-                user_count INTEGER DEFAULT 0,
-                new_users INTEGER DEFAULT 0,
-                payment_amount REAL DEFAULT 0,
-                satisfaction_score REAL
-            )
-        ''')
-        
-        # 8. Departments table (for department info)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS departments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                dept_key TEXT UNIQUE,
-                name_en TEXT,
-                name_hi TEXT,
-                name_mr TEXT,
-                name_ta TEXT,
-                contact TEXT,
-                working_hours TEXT,
-                services_json TEXT
-            )
-        ''')
-        
-        # Insert default departments
-        self.insert_default_departments()
-        
-        # 9. System settings
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS system_settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                setting_key TEXT UNIQUE,
-                setting_value TEXT,
-                description TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Insert default settings
-        default_settings = [
-            ('system_name', 'SUVIDHA', 'Application name'),
-            ('support_email', 'support@suvidha.gov.in', 'Support email'),
-            ('support_phone', '1800-123-456', 'Support phone number'),
-            ('version', '1.0.0', 'System version'),
-            ('maintenance_mode', 'false', 'Maintenance mode flag')
-        ]
-        
-        cursor.executemany('''
-            INSERT OR IGNORE INTO system_settings (setting_key, setting_value, description)
-            VALUES (?, ?, ?)
-        ''', default_settings)
+    Rows are ordered by (order_column, id) descending, so each page is a
+    bounded index range scan no matter how deep the user has paged. after is
+    the cursor returned with the previous page (None for the first page).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    include_archived also reads the rows moved to the archive database.
+    """
+    source = union_source(conn, table) if include_archived else table
+    sql = f"SELECT {columns}, {order_column}, id FROM {source} WHERE {where}"
+    params = list(params)
+    if after is not None:
+        sql += f" AND ({order_column}, id) < (?, ?)"
+        params.extend(after)
+    sql += f" ORDER BY {order_column} DESC, id DESC LIMIT ?"
+    # One extra row tells us whether another page exists
+    params.append(page_size + 1)
+    
+    rows = conn.execute(sql, params).fetchall()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (rows[-1][-2], rows[-1][-1])
+    return [row[:-2] for row in rows], next_cursor
+
+def get_user_requests_page(conn, user_id, after=None, page_size=DEFAULT_PAGE_SIZE,
+                           status=None, columns='*', include_archived=False):
+    """One page of a user's service requests, optionally for one status"""
+    if status:
+        return fetch_page(conn, 'service_requests', columns, 'user_id=? AND status=?',
+                          (user_id, status), after, page_size, include_archived=include_archived)
+    return fetch_page(conn, 'service_requests', columns, 'user_id=?',
+                      (user_id,), after, page_size, include_archived=include_archived)
+
+def get_user_payments_page(conn, user_id, after=None, page_size=DEFAULT_PAGE_SIZE,
+                           start=None, end=None, columns='*'):
+    """One page of a user's payments, optionally created in [start, end)"""
+    where = 'user_id=?'
+    params = [user_id]
+    if start is not None:
+        where += ' AND created_at >= ?'
+        params.append(start)
+    if end is not None:
+        where += ' AND created_at < ?'
+        params.append(end)
+    return fetch_page(conn, 'payments', columns, where, params, after, page_size)
+
+def get_pending_bills(conn, user_id,
+                      columns='payment_id, bill_type, bill_number, amount, due_date, status, created_at'):
+    """A user's Pending and Overdue bills, soonest due first"""
+    return conn.execute(f'''
+        SELECT {columns}
+        FROM payments
+        WHERE user_id=? AND status IN ('Pending', 'Overdue')
+        ORDER BY due_date ASC
+    ''', (user_id,)).fetchall()
+
+def get_latest_otp(conn, aadhaar, phone):
+    """(id, otp, expires_at, attempt_count) of the newest unverified OTP, or None"""
+    return conn.execute('''
+        SELECT id, otp, expires_at, attempt_count
+        FROM otp_verification
+        WHERE aadhaar=? AND phone=? AND verified=FALSE
+        ORDER BY created_at DESC LIMIT 1
+    ''', (aadhaar, phone)).fetchone()
+
+def count_active_users(conn, since):
+    """Users who logged in after since"""
+    return conn.execute('SELECT COUNT(*) FROM users WHERE last_login > ?', (since,)).fetchone()[0]
+
+def get_user_documents_page(conn, user_id, after=None, page_size=DEFAULT_PAGE_SIZE,
+                            columns='*', include_archived=False):
+    """One page of a user's documents, most recently uploaded first"""
+    return fetch_page(conn, 'documents', columns, 'user_id=?', (user_id,),
+                      after, page_size, order_column='uploaded_at',
+                      include_archived=include_archived)
+
+# Request ids per IN (...) list, well under SQLite's bound parameter limit
+HISTORY_BATCH_SIZE = 500
+
+def get_requests_history(conn, request_ids, include_archived=False):
+    """Status histories of many requests with one query per HISTORY_BATCH_SIZE ids.
+    
+    Returns {request_id: [(status, comments, updated_by, created_at), ...]},
+    each list newest first and empty for requests without history.
+    """
+    request_ids = list(dict.fromkeys(request_ids))
+    histories = {request_id: [] for request_id in request_ids}
+    source = union_source(conn, 'request_status_history') if include_archived else 'request_status_history'
+    for batch in chunked(request_ids, HISTORY_BATCH_SIZE):
+        rows = conn.execute(f'''
+            SELECT request_id, status, comments, updated_by, created_at
+            FROM {source}
+            WHERE request_id IN ({', '.join('?' * len(batch))})
+            ORDER BY request_id, created_at DESC, id DESC
+        ''', batch).fetchall()
+        for row in rows:
+            histories[row[0]].append(row[1:])
+    return histories
+
+def get_request_history(conn, request_id, include_archived=False):
+    """Status history of one request, newest first"""
+    return get_requests_history(conn, [request_id], include_archived)[request_id]
+
+def get_user_notifications_page(conn, user_id, after=None, page_size=DEFAULT_PAGE_SIZE,
+                                unread_only=False, columns='*'):
+    """One page of a user's notifications, optionally unread only"""
+    if unread_only:
+        return fetch_page(conn, 'notifications', columns, 'user_id=? AND is_read=FALSE',
+                          (user_id,), after, page_size)
+    return fetch_page(conn, 'notifications', columns, 'user_id=?',
+                      (user_id,), after, page_size)
+
+# Search results returned when the caller does not ask for a limit
+DEFAULT_SEARCH_LIMIT = 50
+
+# Text columns searched in each FTS index, with their bm25 weights; user_id
+# is indexed too but only ever used as a filter
+REQUEST_SEARCH_COLUMNS = [('request_id', 10.0), ('department', 4.0), ('service_type', 4.0),
+                          ('description', 1.0), ('address', 1.0)]
+DOCUMENT_SEARCH_COLUMNS = [('doc_id', 10.0), ('document_type', 4.0), ('document_name', 2.0)]
+
+def build_fts_query(text, columns):
+    """Turn free text into an FTS5 query that prefix-matches every word.
+    
+    'water lea' becomes {department ...} : ("water"* "lea"*), so each word must
+    appear (as a word prefix) in one of the given columns. Returns None when
+    the text has no searchable words.
+    """
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    terms = ' '.join(f'"{word}"*' for word in words)
+    return f"{{{' '.join(columns)}}} : ({terms})"
+
+def fts_available(conn, fts_table):
+    """Whether the FTS5 index was created (SQLite may be built without FTS5)"""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (fts_table,)).fetchone()
+    return row is not None
+
+def _search(conn, table, fts_table, search_columns, text, columns, filters, limit):
+    """Ranked full-text search over one table, falling back to LIKE without FTS5"""
+    names = [name for name, weight in search_columns]
+    if columns == '*':
+        columns = f'{table}.*'
+    
+    if not fts_available(conn, fts_table):
+        words = re.findall(r'\w+', text or '')
+        if not words:
+            return []
+        like = ' AND '.join('(' + ' OR '.join(f'{name} LIKE ?' for name in names) + ')' for word in words)
+        where = ' AND '.join([like] + [f'{column}=?' for column in filters])
+        params = [f'%{word}%' for word in words for name in names] + list(filters.values())
+        return conn.execute(f'''
+            SELECT {columns} FROM {table}
+            WHERE {where}
+            LIMIT ?
+        ''', params + [limit]).fetchall()
+    
+    query = build_fts_query(text, names)
+    if query is None:
+        return []
+    
+    # Filtering on user_id inside the MATCH lets FTS5 intersect posting lists
+    filters = dict(filters)
+    user_id = filters.pop('user_id', None)
+    if user_id is not None:
+        query += f' AND user_id : "{int(user_id)}"'
+    where = ' AND '.join(f'{table}.{column}=?' for column in filters) or '1'
+    
+    # bm25 takes one weight per FTS column; user_id (last) gets none
+    weights = ', '.join(str(weight) for name, weight in search_columns) + ', 0.0'
+    return conn.execute(f'''
+        WITH hits AS (
+            SELECT rowid AS hit_id, bm25({fts_table}, {weights}) AS score
+            FROM {fts_table}
+            WHERE {fts_table} MATCH ?
+        )
+        SELECT {columns}
+        FROM hits JOIN {table} ON {table}.id = hits.hit_id
+        WHERE {where}
+        ORDER BY hits.score
+        LIMIT ?
+    ''', [query] + list(filters.values()) + [limit]).fetchall()
+
+def search_requests(conn, text, user_id=None, status=None, limit=DEFAULT_SEARCH_LIMIT, columns='*'):
+    """Service requests matching text, best match first.
+    
+    Matches request IDs, departments, service types, descriptions and
+    addresses by word prefix; optionally limited to one user and/or status.
+    """
+    filters = {}
+    if user_id is not None:
+        filters['user_id'] = user_id
+    if status:
+        filters['status'] = status
+    return _search(conn, 'service_requests', 'requests_fts', REQUEST_SEARCH_COLUMNS,
+                   text, columns, filters, limit)
+
+def search_documents(conn, text, user_id=None, limit=DEFAULT_SEARCH_LIMIT, columns='*'):
+    """Documents whose ID, type or file name match text, best match first"""
+    filters = {}
+    if user_id is not None:
+        filters['user_id'] = user_id
+    return _search(conn, 'documents', 'documents_fts', DOCUMENT_SEARCH_COLUMNS,
+                   text, columns, filters, limit)
+
+@contextmanager
+def _plain_transaction(conn):
+    """ConnectionManager.transaction() for a plain sqlite3 connection"""
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+class UnitOfWork:
+    """Groups related writes into one transaction with a single commit.
+
+    Usage:
+        with UnitOfWork(conn) as uow:
+            request_id = uow.add_service_request(request_data)
+            uow.add_status_history(request_id, 'Pending', 'Request submitted', name)
+            uow.add_document(doc_data)
+            uow.add_notification(notification_data)
+
+    Everything inside the block commits together when it exits, or is rolled
+    back if it raises. conn is a ConnectionManager, whose helpers that call
+    conn.commit() inside the block join the same transaction, or a plain
+    sqlite3 connection. Work outside the database, such as moving files into
+    place, is registered with after_commit() and after_rollback().
+    """
+    
+    def __init__(self, conn):
+        self.conn = conn
+        self._transaction = None
+        self._after_commit = []
+        self._after_rollback = []
+        self.cursor = None
+    
+    def __enter__(self):
+        if hasattr(self.conn, 'transaction'):
+            self._transaction = self.conn.transaction()
+        else:
+            self._transaction = _plain_transaction(self.conn)
+        self.cursor = self._transaction.__enter__().cursor()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            suppressed = self._transaction.__exit__(exc_type, exc_value, traceback)
+        except BaseException:
+            self._run(self._after_rollback)
+            raise
+        self._run(self._after_commit if exc_type is None else self._after_rollback)
+        return suppressed
+    
+    def _run(self, callbacks):
+        for callback in callbacks:
+            callback()
+    
+    def after_commit(self, callback):
+        """Call callback() once the block has committed"""
+        self._after_commit.append(callback)
+    
+    def after_rollback(self, callback):
+        """Call callback() if the block is rolled back instead"""
+        self._after_rollback.append(callback)
+    
+    def add_service_request(self, request_data):
+        """Insert a service request and return its request_id"""
+        request_id = request_data.get('request_id') or new_id('SR')
         
-        self.conn.commit()
+        self.cursor.execute('''
+            INSERT INTO service_requests 
+            (request_id, user_id, department, service_type, description, 
+             address, pincode, zone, language, priority, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            request_id,
+            request_data.get('user_id'),
+            request_data.get('department'),
+            request_data.get('service_type'),
+            request_data.get('description'),
+            request_data.get('address'),
+            request_data.get('pincode'),
+            request_data.get('zone'),
+            request_data.get('language', 'en'),
+            request_data.get('priority', 'Medium'),
+            request_data.get('status', 'Pending'),
+            datetime.now(),
+            datetime.now()
+        ))
+        return request_id
     
-    def insert_default_departments(self):
-        """Insert default department data"""
-        cursor = self.conn.cursor()
+    def update_request_status(self, request_id, status):
+        """Set a request's status, and its completion time when it is Completed"""
+        now = datetime.now()
+        self.cursor.execute('''
+            UPDATE service_requests 
+            SET status=?, updated_at=?, actual_completion=COALESCE(?, actual_completion)
+            WHERE request_id=?
+        ''', (status, now, now if status == 'Completed' else None, request_id))
+    
+    def add_status_history(self, request_id, status, comments="", updated_by="System"):
+        """Append a row to a request's status history"""
+        self.cursor.execute('''
+            INSERT INTO request_status_history 
+            (request_id, status, comments, updated_by, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (request_id, status, comments, updated_by, datetime.now()))
+    
+    def add_payment(self, payment_data):
+        """Insert a payment record and return its payment_id"""
+        payment_id = payment_data.get('payment_id') or new_id('PAY')
         
-        departments = [
-            ('electricity', 'Electricity Department', 'बिजली विभाग', 'वीज विभाग', 'மின்சார துறை', 
-             '1912', '24/7 Emergency, 9 AM - 6 PM Regular', 
-             json.dumps(['Power Outage', 'New Connection', 'Bill Issue', 'Meter Complaint', 'Safety Inspection'])),
-            
-            ('water', 'Water Department', 'जल विभाग', 'पाणी विभाग', 'நீர் துறை',
-             '1916', '24/7 Emergency, 8 AM - 8 PM Regular',
-             json.dumps(['No Water Supply', 'Water Quality Issue', 'New Connection', 'Pipeline Leakage', 'Bill Payment'])),
-            
-            ('gas', 'Gas Department', 'गैस विभाग', 'गॅस विभाग', 'எரிவாயு துறை',
-             '1906', '24/7 Emergency, 8 AM - 8 PM Regular',
-             json.dumps(['Gas Leak Complaint', 'New Connection', 'Safety Check', 'Appliance Service', 'Bill Payment'])),
-            
-            ('waste', 'Waste Management', 'कचरा प्रबंधन', 'कचरा व्यवस्थापन', 'குப்பை மேலாண்மை',
-             '155304', '6 AM - 10 PM',
-             json.dumps(['Garbage Not Collected', 'Sanitation Complaint', 'Recycling Information', 'Illegal Dumping', 'Composting Request']))
-        ]
+        self.cursor.execute('''
+            INSERT INTO payments 
+            (payment_id, request_id, user_id, bill_type, bill_number, 
+             amount, due_date, payment_method, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            payment_id,
+            payment_data.get('request_id'),
+            payment_data.get('user_id'),
+            payment_data.get('bill_type'),
+            payment_data.get('bill_number'),
+            payment_data.get('amount'),
+            payment_data.get('due_date'),
+            payment_data.get('payment_method'),
+            payment_data.get('status', 'Pending'),
+            datetime.now()
+        ))
+        return payment_id
+    
+    def complete_payment(self, payment_id, method, transaction_id):
+        """Mark a payment as completed"""
+        self.cursor.execute('''
+            UPDATE payments 
+            SET status=?, payment_method=?, transaction_id=?, completed_at=?
+            WHERE payment_id=?
+        ''', ('Completed', method, transaction_id, datetime.now(), payment_id))
+    
+    def add_document(self, doc_data):
+        """Insert metadata for an uploaded file and return its doc_id.
         
-        cursor.executemany('''
-            INSERT OR IGNORE INTO departments 
-            (dept_key, name_en, name_hi, name_mr, name_ta, contact, working_hours, services_json)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', departments)
+        A loose file's size is added to the uploads storage counters in the
+        same transaction; blob-backed documents (blob_sha256 set, see
+        DocumentStore.add_document) are counted when their blob is stored.
+        """
+        doc_id = doc_data.get('doc_id') or new_id('DOC')
         
-        self.conn.commit()
+        self.cursor.execute('''
+            INSERT INTO documents 
+            (doc_id, user_id, request_id, document_type, document_name, 
+             file_path, file_size, blob_sha256, uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            doc_id,
+            doc_data.get('user_id'),
+            doc_data.get('request_id'),
+            doc_data.get('document_type'),
+            doc_data.get('document_name'),
+            doc_data.get('file_path'),
+            doc_data.get('file_size'),
+            doc_data.get('blob_sha256'),
+            datetime.now()
+        ))
+        if doc_data.get('file_path') and not doc_data.get('blob_sha256'):
+            record_usage(self.cursor, UPLOADS_AREA, 1, doc_data.get('file_size') or 0)
+        return doc_id
+    
+    def remove_document(self, doc_id):
+        """Delete a document's row and release its file.
+        
+        Blob-backed documents drop a blob reference; the blob store deletes
+        the blob once nothing refers to it. For a loose file the counters are
+        updated and its path returned: removing that file is up to the
+        caller. Returns None when there is no loose file to remove.
+        """
+        self.cursor.execute('SELECT file_path, file_size, blob_sha256 FROM documents WHERE doc_id=?', (doc_id,))
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        file_path, file_size, blob_sha256 = row
+        self.cursor.execute('DELETE FROM documents WHERE doc_id=?', (doc_id,))
+        if blob_sha256:
+            release_blob(self.cursor, blob_sha256)
+            return None
+        if file_path:
+            record_usage(self.cursor, UPLOADS_AREA, -1, -(file_size or 0))
+        return file_path
+    
+    def add_notification(self, notification_data):
+        """Insert a notification and return its row id"""
+        self.cursor.execute('''
+            INSERT INTO notifications 
+            (user_id, notification_type, title, message, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (
+            notification_data.get('user_id'),
+            notification_data.get('notification_type'),
+            notification_data.get('title'),
+            notification_data.get('message'),
+            datetime.now()
+        ))
+        return self.cursor.lastrowid
+
+class ComprehensiveDatabase:
+    def __init__(self, db_name='suvidha_comprehensive.db'):
+        self.conn = ConnectionManager(db_name)
+        ensure_schema(self.conn)
+        ensure_archive(self.conn)
+        init_node_id(self.conn)
+    
+    def unit_of_work(self):
+        """Start a UnitOfWork on this database"""
+        return UnitOfWork(self.conn)
     
     # User management methods
     def create_user(self, user_data):
         """Create a new user"""
         cursor = self.conn.cursor()
         
-        user_id = user_data.get('user_id', f"USER_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        user_id = user_data.get('user_id') or new_id('USER_')
         
         cursor.execute('''
             INSERT INTO users 
@@ -268,38 +510,13 @@ class ComprehensiveDatabase:
     # Service request methods
     def create_service_request(self, request_data):
         """Create a new service request"""
-        cursor = self.conn.cursor()
-        
-        request_id = f"SR{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        
-        cursor.execute('''
-            INSERT INTO service_requests 
-            (request_id, user_id, department, service_type, description, 
-             address, pincode, language, priority, status, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            request_id,
-            request_data.get('user_id'),
-            request_data.get('department'),
-            request_data.get('service_type'),
-            request_data.get('description'),
-            request_data.get('address'),
-            request_data.get('pincode'),
-            request_data.get('language', 'en'),
-            request_data.get('priority', 'Medium'),
-            request_data.get('status', 'Pending'),
-            datetime.now(),
-            datetime.now()
-        ))
-        
-        # Add to status history
-        cursor.execute('''
-            INSERT INTO request_status_history 
-            (request_id, status, comments, updated_by)
-            VALUES (?, ?, ?, ?)
-        ''', (request_id, 'Pending', 'Request submitted', request_data.get('user_name', 'System')))
+        with self.unit_of_work() as uow:
+            request_id = uow.add_service_request(request_data)
+            
+            # Add to status history
+            uow.add_status_history(request_id, 'Pending', 'Request submitted',
+                                   request_data.get('user_name', 'System'))
         
-        self.conn.commit()
         return request_id
     
     def get_user_requests(self, user_id, limit=50):
@@ -313,109 +530,94 @@ class ComprehensiveDatabase:
         ''', (user_id, limit))
         return cursor.fetchall()
     
-    def get_request_by_id(self, request_id):
+    def get_user_requests_page(self, user_id, after=None, page_size=DEFAULT_PAGE_SIZE, status=None,
+                               include_archived=False):
+        """Get one page of a user's requests; returns (rows, next_cursor)"""
+        return get_user_requests_page(self.conn, user_id, after, page_size, status,
+                                      include_archived=include_archived)
+    
+    def search_requests(self, text, user_id=None, status=None, limit=DEFAULT_SEARCH_LIMIT):
+        """Full-text search over service requests, best match first"""
+        return search_requests(self.conn, text, user_id, status, limit)
+    
+    def get_request_by_id(self, request_id, include_archived=False):
         """Get request by request_id"""
+        # Stored columns only, so hot and archived rows have the same shape
+        columns = ', '.join(f'sr.{name}' for name, declared in
+                            stored_columns(self.conn, 'main', 'service_requests'))
+        sources = ['main.service_requests AS sr']
+        if include_archived:
+            # Closed requests may have moved to the archive
+            sources.append(union_source(self.conn, 'service_requests', alias='sr'))
+        
         cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT sr.*, u.name, u.phone, u.email
-            FROM service_requests sr
-            JOIN users u ON sr.user_id = u.id
-            WHERE sr.request_id=?
-        ''', (request_id,))
-        return cursor.fetchone()
+        for source in sources:
+            cursor.execute(f'''
+                SELECT {columns}, u.name, u.phone, u.email
+                FROM {source}
+                JOIN users u ON sr.user_id = u.id
+                WHERE sr.request_id=?
+            ''', (request_id,))
+            request = cursor.fetchone()
+            if request:
+                return request
+        return None
+    
+    def get_request_history(self, request_id, include_archived=False):
+        """Get a request's status history, newest first"""
+        return get_request_history(self.conn, request_id, include_archived)
+    
+    def get_requests_history(self, request_ids, include_archived=False):
+        """Get the status histories of many requests as {request_id: rows}"""
+        return get_requests_history(self.conn, request_ids, include_archived)
+    
+    def archive_closed_requests(self, older_than_days=DEFAULT_ARCHIVE_AFTER_DAYS,
+                                batch_size=DEFAULT_ARCHIVE_BATCH_SIZE):
+        """Move old Completed/Rejected requests to the archive database"""
+        return archive_closed_requests(self.conn, older_than_days, batch_size)
     
     def update_request_status(self, request_id, status, comments="", updated_by="System"):
         """Update request status"""
-        cursor = self.conn.cursor()
-        
-        # Update request
-        cursor.execute('''
-            UPDATE service_requests 
-            SET status=?, updated_at=?
-            WHERE request_id=?
-        ''', (status, datetime.now(), request_id))
-        
-        # Add to history
-        cursor.execute('''
-            INSERT INTO request_status_history 
-            (request_id, status, comments, updated_by)
-            VALUES (?, ?, ?, ?)
-        ''', (request_id, status, comments, updated_by))
-        
-        self.conn.commit()
+        with self.unit_of_work() as uow:
+            uow.update_request_status(request_id, status)
+            uow.add_status_history(request_id, status, comments, updated_by)
+    
+    def update_request_status_bulk(self, request_ids, status, comments="", updated_by="System",
+                                   notify=True, chunk_size=TRANSITION_CHUNK_SIZE):
+        """Move many requests to status, with history and citizen notifications"""
+        return transition_requests(self.conn, request_ids, status, comments, updated_by, notify, chunk_size)
     
     # Analytics methods
     def get_daily_metrics(self, date=None):
-        """Get metrics for a specific date"""
+        """Get metrics for a specific date from the live daily rollups"""
         if date is None:
             date = datetime.now().date()
         
         cursor = self.conn.cursor()
-        
-        # Check if precomputed metrics exist
-        cursor.execute('SELECT * FROM analytics WHERE metric_date=?', (date,))
-        existing = cursor.fetchone()
-        
-        if existing:
-            return existing
-        
-        # Compute metrics
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_requests,
-                SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed_requests,
-                SUM(CASE WHEN status = 'Pending' THEN 1 ELSE 0 END) as pending_requests,
-                AVG(CASE WHEN actual_completion IS NOT NULL 
-                    THEN julianday(actual_completion) - julianday(created_at) 
-                    ELSE NULL END) as avg_completion_time,
-                COUNT(DISTINCT user_id) as active_users,
-                (SELECT COUNT(*) FROM users WHERE DATE(created_at) = ?) as new_users,
-                (SELECT SUM(amount) FROM payments WHERE DATE(created_at) = ? AND status='Completed') as payment_amount,
-                AVG(feedback_rating) as satisfaction_score
-            FROM service_requests 
-            WHERE DATE(created_at) = ?
-        ''', (date, date, date))
-        
-        metrics = cursor.fetchone()
-        
-        # Store in analytics table
         cursor.execute('''
-            INSERT INTO analytics 
-            (metric_date, total_requests, completed_requests, pending_requests, 
-             avg_completion_time, user_count, new_users, payment_amount, satisfaction_score)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (date, *metrics))
-        
-        self.conn.commit()
-        return metrics
+            SELECT total_requests, completed_requests, pending_requests,
+                   avg_completion_time, user_count, new_users, payment_amount,
+                   satisfaction_score
+            FROM analytics 
+            WHERE metric_date=?
+        ''', (str(date),))
+        
+        # Days without any activity have no rollup row
+        return cursor.fetchone() or (0, 0, 0, None, 0, 0, 0, None)
+    
+    def get_daily_rollups(self, start_date=None, end_date=None):
+        """Get per-day rollup rows for a date range"""
+        return get_daily_rollups(self.conn, start_date, end_date)
+    
+    def rebuild_daily_rollups(self, start_date=None, end_date=None):
+        """Recompute rollups from the base tables, e.g. after a bulk repair"""
+        rebuild_daily_rollups(self.conn, start_date, end_date)
     
     # Payment methods
     def create_payment(self, payment_data):
         """Create a new payment record"""
-        cursor = self.conn.cursor()
-        
-        payment_id = f"PAY{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        
-        cursor.execute('''
-            INSERT INTO payments 
-            (payment_id, request_id, user_id, bill_type, bill_number, 
-             amount, due_date, payment_method, status, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            payment_id,
-            payment_data.get('request_id'),
-            payment_data.get('user_id'),
-            payment_data.get('bill_type'),
-            payment_data.get('bill_number'),
-            payment_data.get('amount'),
-            payment_data.get('due_date'),
-            payment_data.get('payment_method'),
-            payment_data.get('status', 'Pending'),
-            datetime.now()
-        ))
-        
-        self.conn.commit()
-        return payment_id
+        with self.unit_of_work() as uow:
+            return uow.add_payment(payment_data)
     
     def update_payment_status(self, payment_id, status, transaction_id=None):
         """Update payment status"""
@@ -447,31 +649,16 @@ class ComprehensiveDatabase:
         ''', (user_id,))
         return cursor.fetchall()
     
+    def get_user_payments_page(self, user_id, after=None, page_size=DEFAULT_PAGE_SIZE,
+                               start=None, end=None):
+        """Get one page of a user's payments; returns (rows, next_cursor)"""
+        return get_user_payments_page(self.conn, user_id, after, page_size, start, end)
+    
     # Document methods
     def save_document(self, doc_data):
         """Save document metadata"""
-        cursor = self.conn.cursor()
-        
-        doc_id = f"DOC{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        
-        cursor.execute('''
-            INSERT INTO documents 
-            (doc_id, user_id, request_id, document_type, document_name, 
-             file_path, file_size, uploaded_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            doc_id,
-            doc_data.get('user_id'),
-            doc_data.get('request_id'),
-            doc_data.get('document_type'),
-            doc_data.get('document_name'),
-            doc_data.get('file_path'),
-            doc_data.get('file_size'),
-            datetime.now()
-        ))
-        
-        self.conn.commit()
-        return doc_id
+        with self.unit_of_work() as uow:
+            return uow.add_document(doc_data)
     
     def get_user_documents(self, user_id):
         """Get all documents for a user"""
@@ -483,24 +670,19 @@ class ComprehensiveDatabase:
         ''', (user_id,))
         return cursor.fetchall()
     
+    def get_user_documents_page(self, user_id, after=None, page_size=DEFAULT_PAGE_SIZE):
+        """Get one page of a user's documents; returns (rows, next_cursor)"""
+        return get_user_documents_page(self.conn, user_id, after, page_size)
+    
+    def search_documents(self, text, user_id=None, limit=DEFAULT_SEARCH_LIMIT):
+        """Full-text search over document IDs, types and file names"""
+        return search_documents(self.conn, text, user_id, limit)
+    
     # Notification methods
     def add_notification(self, notification_data):
         """Add a new notification"""
-        cursor = self.conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO notifications 
-            (user_id, notification_type, title, message)
-            VALUES (?, ?, ?, ?)
-        ''', (
-            notification_data.get('user_id'),
-            notification_data.get('notification_type'),
-            notification_data.get('title'),
-            notification_data.get('message')
-        ))
-        
-        self.conn.commit()
-        return cursor.lastrowid
+        with self.unit_of_work() as uow:
+            return uow.add_notification(notification_data)
     
     def get_user_notifications(self, user_id, unread_only=False, limit=20):
         """Get notifications for a user"""
@@ -523,6 +705,11 @@ class ComprehensiveDatabase:
         
         return cursor.fetchall()
     
+    def get_user_notifications_page(self, user_id, after=None, page_size=DEFAULT_PAGE_SIZE,
+                                    unread_only=False):
+        """Get one page of a user's notifications; returns (rows, next_cursor)"""
+        return get_user_notifications_page(self.conn, user_id, after, page_size, unread_only)
+    
     def mark_notification_read(self, notification_id):
         """Mark notification as read"""
         cursor = self.conn.cursor()
@@ -611,4 +798,198 @@ class ComprehensiveDatabase:
             SET setting_value=?, updated_at=?
             WHERE setting_key=?
         ''', (value, datetime.now(), key))
-        self.conn.commit()
\ No newline at end of file
+        self.conn.commit()
+    
+    # Bulk ingestion methods
+    def _bulk_write(self, rows, chunk_size, write_chunk):
+        """Stream rows through write_chunk, one transaction per chunk.
+
+        Returns throughput stats: rows, chunks, seconds and rows_per_second.
+        """
+        total_rows = 0
+        chunks = 0
+        started = time.perf_counter()
+        
+        for chunk in chunked(rows, chunk_size):
+            with self.unit_of_work() as uow:
+                write_chunk(uow.cursor, chunk, datetime.now())
+            total_rows += len(chunk)
+            chunks += 1
+        
+        seconds = time.perf_counter() - started
+        return {
+            'rows': total_rows,
+            'chunks': chunks,
+            'seconds': seconds,
+            'rows_per_second': total_rows / seconds if seconds > 0 else 0.0
+        }
+    
+    def create_users_bulk(self, users, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+        """Insert many users from an iterable of user_data dicts"""
+        def write_chunk(cursor, chunk, now):
+            cursor.executemany('''
+                INSERT INTO users 
+                (user_id, aadhaar, name, phone, email, address, pincode, language, 
+                 user_type, created_at, last_login)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                user.get('user_id') or new_id('USER_'),
+                user.get('aadhaar'),
+                user.get('name'),
+                user.get('phone'),
+                user.get('email'),
+                user.get('address'),
+                user.get('pincode'),
+                user.get('language', 'en'),
+                user.get('user_type', 'citizen'),
+                user.get('created_at') or now,
+                user.get('last_login')
+            ) for user in chunk])
+        
+        return self._bulk_write(users, chunk_size, write_chunk)
+    
+    def create_service_requests_bulk(self, requests, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+        """Insert many service requests, plus their status history rows.
+        
+        A request dict may carry a 'history' list of {status, comments,
+        updated_by, created_at} dicts; otherwise one initial history row is
+        written for it.
+        """
+        def write_chunk(cursor, chunk, now):
+            request_rows = []
+            history_rows = []
+            for request_data in chunk:
+                request_id = request_data.get('request_id') or new_id('SR')
+                status = request_data.get('status', 'Pending')
+                created_at = request_data.get('created_at') or now
+                request_rows.append((
+                    request_id,
+                    request_data.get('user_id'),
+                    request_data.get('department'),
+                    request_data.get('service_type'),
+                    request_data.get('description'),
+                    request_data.get('address'),
+                    request_data.get('pincode'),
+                    request_data.get('zone'),
+                    request_data.get('language', 'en'),
+                    request_data.get('priority', 'Medium'),
+                    status,
+                    request_data.get('assigned_to'),
+                    request_data.get('estimated_completion'),
+                    request_data.get('actual_completion'),
+                    request_data.get('feedback_rating'),
+                    created_at,
+                    request_data.get('updated_at') or created_at
+                ))
+                if 'history' in request_data:
+                    history_rows.extend((
+                        request_id,
+                        entry.get('status'),
+                        entry.get('comments'),
+                        entry.get('updated_by', 'System'),
+                        entry.get('created_at') or created_at
+                    ) for entry in request_data['history'])
+                else:
+                    history_rows.append((
+                        request_id,
+                        status,
+                        request_data.get('comments', 'Request submitted'),
+                        request_data.get('user_name', 'System'),
+                        created_at
+                    ))
+            
+            cursor.executemany('''
+                INSERT INTO service_requests 
+                (request_id, user_id, department, service_type, description, 
+                 address, pincode, zone, language, priority, status, assigned_to,
+                 estimated_completion, actual_completion, feedback_rating,
+                 created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', request_rows)
+            
+            cursor.executemany('''
+                INSERT INTO request_status_history 
+                (request_id, status, comments, updated_by, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', history_rows)
+        
+        return self._bulk_write(requests, chunk_size, write_chunk)
+    
+    def create_payments_bulk(self, payments, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+        """Insert many payment records, e.g. a month of utility bills"""
+        def write_chunk(cursor, chunk, now):
+            cursor.executemany('''
+                INSERT INTO payments 
+                (payment_id, request_id, user_id, bill_type, bill_number, 
+                 amount, due_date, payment_method, transaction_id, status, 
+                 created_at, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                payment_data.get('payment_id') or new_id('PAY'),
+                payment_data.get('request_id'),
+                payment_data.get('user_id'),
+                payment_data.get('bill_type'),
+                payment_data.get('bill_number'),
+                payment_data.get('amount'),
+                payment_data.get('due_date'),
+                payment_data.get('payment_method'),
+                payment_data.get('transaction_id'),
+                payment_data.get('status', 'Pending'),
+                payment_data.get('created_at') or now,
+                payment_data.get('completed_at')
+            ) for payment_data in chunk])
+        
+        return self._bulk_write(payments, chunk_size, write_chunk)
+    
+    def create_documents_bulk(self, documents, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+        """Insert many document metadata rows from doc_data dicts.
+        
+        For synthetic metadata only (synthetic_data.py): no blob is
+        referenced and the storage counters are not touched. Real uploads go
+        through DocumentStore.add_document, so a file_path inside the blob
+        store raises ValueError.
+        """
+        blob_root = os.path.abspath(DEFAULT_BLOB_ROOT)
+        
+        def write_chunk(cursor, chunk, now):
+            for doc_data in chunk:
+                file_path = doc_data.get('file_path')
+                if file_path and os.path.commonpath([blob_root, os.path.abspath(file_path)]) == blob_root:
+                    raise ValueError(f"{file_path} is in the blob store; "
+                                     "use DocumentStore.add_document")
+            cursor.executemany('''
+                INSERT INTO documents 
+                (doc_id, user_id, request_id, document_type, document_name, 
+                 file_path, file_size, uploaded_at, verified)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                doc_data.get('doc_id') or new_id('DOC'),
+                doc_data.get('user_id'),
+                doc_data.get('request_id'),
+                doc_data.get('document_type'),
+                doc_data.get('document_name'),
+                doc_data.get('file_path'),
+                doc_data.get('file_size'),
+                doc_data.get('uploaded_at') or now,
+                doc_data.get('verified', False)
+            ) for doc_data in chunk])
+        
+        return self._bulk_write(documents, chunk_size, write_chunk)
+    
+    def create_notifications_bulk(self, notifications, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+        """Insert many notifications from notification_data dicts"""
+        def write_chunk(cursor, chunk, now):
+            cursor.executemany('''
+                INSERT INTO notifications 
+                (user_id, notification_type, title, message, is_read, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(
+                notification_data.get('user_id'),
+                notification_data.get('notification_type'),
+                notification_data.get('title'),
+                notification_data.get('message'),
+                notification_data.get('is_read', False),
+                notification_data.get('created_at') or now
+            ) for notification_data in chunk])
+        
+        return self._bulk_write(notifications, chunk_size, write_chunk)
\ No newline at end of file
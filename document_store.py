@@ -0,0 +1,257 @@
+# document_store.py
+import os
+import sys
+import time
+import hashlib
+import tempfile
+from datetime import datetime
+from storage import record_usage, UPLOADS_AREA
+from previews import rendition_paths
+
+# Uploaded files are stored once per distinct content, named by their SHA-256
+# under two levels of hash-prefix directories (uploads/blobs/ab/cd/abcd...),
+# so no directory grows past a few thousand entries however many documents
+# there are. documents.blob_sha256 points at the blob and blobs.ref_count
+# counts the documents rows, hot or archived, that do.
+#
+# Uploads are streamed into uploads/blobs/tmp in CHUNK_SIZE pieces while
+# being hashed, and abandoned as soon as they pass the size limit. The
+# blobs row and storage counters are written in the transaction that inserts
+# the documents row; the staged file is moved into place (or dropped as a
+# duplicate) only once that transaction commits, so a rollback leaves no
+# file behind. Unreferenced blobs are only deleted by collect_garbage() under
+# the same write lock, so an upload racing a delete of the same content
+# cannot lose its file. A blob's preview renditions (previews.py) sit next
+# to it and go with it.
+
+MAX_UPLOAD_MB = 10
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_BLOB_ROOT = os.path.join('uploads', 'blobs')
+
+# Staged files older than this belong to uploads that never committed
+STALE_UPLOAD_SECONDS = 60 * 60
+GARBAGE_BATCH_SIZE = 500
+
+
+class UploadTooLarge(ValueError):
+    """An upload is bigger than the store's limit"""
+
+
+class StagedBlob:
+    """An upload written to the staging area and hashed, not yet stored"""
+    
+    def __init__(self, sha256, size, temp_path):
+        self.sha256 = sha256
+        self.size = size
+        self.temp_path = temp_path
+
+
+def release_blob(cursor, sha256):
+    """Drop one reference to a blob; collect_garbage() deletes it at zero"""
+    cursor.execute('''
+        UPDATE blobs
+        SET ref_count = ref_count - 1,
+            released_at = CASE WHEN ref_count <= 1 THEN ? ELSE released_at END
+        WHERE sha256 = ?
+    ''', (datetime.now(), sha256))
+
+
+class DocumentStore:
+    """Content-addressed, reference-counted file store for uploaded documents"""
+    
+    def __init__(self, root=DEFAULT_BLOB_ROOT, max_bytes=MAX_UPLOAD_BYTES, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.staging_dir = os.path.join(root, 'tmp')
+    
+    def blob_path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+    
+    def stage(self, stream):
+        """Copy a file-like object into the staging area, hashing as it goes.
+        
+        Raises UploadTooLarge before reading anything when the stream reports
+        a size (Streamlit's UploadedFile does), otherwise as soon as the
+        limit is passed.
+        """
+        declared = getattr(stream, 'size', None)
+        if self.max_bytes is not None and declared is not None and declared > self.max_bytes:
+            raise UploadTooLarge(f"File is {declared / (1024 * 1024):.1f} MB; "
+                                 f"the limit is {self.max_bytes / (1024 * 1024):.0f} MB")
+        
+        os.makedirs(self.staging_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=self.staging_dir, delete=False) as f:
+            temp_path = f.name
+            try:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if self.max_bytes is not None and size > self.max_bytes:
+                        raise UploadTooLarge(f"File is larger than "
+                                             f"{self.max_bytes / (1024 * 1024):.0f} MB")
+                    digest.update(chunk)
+                    f.write(chunk)
+            except BaseException:
+                f.close()
+                os.remove(temp_path)
+                raise
+        return StagedBlob(digest.hexdigest(), size, temp_path)
+    
+    def discard(self, staged):
+        """Remove a staged upload that will not be stored"""
+        try:
+            os.remove(staged.temp_path)
+        except FileNotFoundError:
+            pass
+    
+    def store(self, cursor, staged):
+        """Take a reference to the staged blob's content; returns the blob path.
+        
+        Must run inside the caller's write transaction, which calls
+        finalize(staged) once it has committed. The first reference adds the
+        blob to the storage counters.
+        """
+        cursor.execute('SELECT 1 FROM blobs WHERE sha256 = ?', (staged.sha256,))
+        first_reference = cursor.fetchone() is None
+        cursor.execute('''
+            INSERT INTO blobs (sha256, size, ref_count, created_at)
+            VALUES (?, ?, 1, ?)
+            ON CONFLICT(sha256) DO UPDATE SET ref_count = ref_count + 1, released_at = NULL
+        ''', (staged.sha256, staged.size, datetime.now()))
+        if first_reference:
+            record_usage(cursor, UPLOADS_AREA, 1, staged.size)
+        return self.blob_path(staged.sha256)
+    
+    def finalize(self, staged):
+        """Move a stored upload into place, or discard it as a duplicate"""
+        path = self.blob_path(staged.sha256)
+        if os.path.exists(path):
+            self.discard(staged)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(staged.temp_path, path)
+    
+    def add_document(self, uow, doc_data, staged):
+        """Store a staged upload and insert its documents row in uow; returns the doc_id"""
+        path = self.store(uow.cursor, staged)
+        uow.after_commit(lambda: self.finalize(staged))
+        uow.after_rollback(lambda: self.discard(staged))
+        return uow.add_document(dict(doc_data, file_path=path, file_size=staged.size,
+                                     blob_sha256=staged.sha256))
+    
+    def collect_garbage(self, conn, batch_size=GARBAGE_BATCH_SIZE):
+        """Delete unreferenced blobs, their renditions and abandoned staged uploads"""
+        removed_blobs = 0
+        removed_bytes = 0
+        while True:
+            with conn.transaction() as tx:
+                cursor = tx.cursor()
+                cursor.execute('SELECT sha256, size FROM blobs WHERE ref_count <= 0 LIMIT ?', (batch_size,))
+                batch = cursor.fetchall()
+                blobs = 0
+                files = 0
+                size = 0
+                for sha256, blob_size in batch:
+                    path = self.blob_path(sha256)
+                    try:
+                        os.remove(path)
+                        blobs += 1
+                        files += 1
+                        size += blob_size
+                    except FileNotFoundError:
+                        pass
+                    for rendition in rendition_paths(path):
+                        try:
+                            rendition_size = os.path.getsize(rendition)
+                            os.remove(rendition)
+                            files += 1
+                            size += rendition_size
+                        except FileNotFoundError:
+                            pass
+                cursor.executemany('DELETE FROM blobs WHERE sha256 = ? AND ref_count <= 0',
+                                   [(sha256,) for sha256, blob_size in batch])
+                if files:
+                    record_usage(cursor, UPLOADS_AREA, -files, -size)
+            removed_blobs += blobs
+            removed_bytes += size
+            if len(batch) < batch_size:
+                break
+        
+        stale = 0
+        cutoff = time.time() - STALE_UPLOAD_SECONDS
+        if os.path.isdir(self.staging_dir):
+            for entry in os.scandir(self.staging_dir):
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        stale += 1
+                except FileNotFoundError:
+                    pass
+        return {'blobs': removed_blobs, 'bytes': removed_bytes, 'stale_uploads': stale}
+    
+    def import_legacy_documents(self, conn, batch_size=GARBAGE_BATCH_SIZE):
+        """Move documents stored as loose files into the blob store.
+        
+        Each file is hashed, stored (deduplicated against existing blobs)
+        and its documents row repointed; the loose file is removed once the
+        transaction commits. Files that no longer exist are skipped.
+        """
+        imported = 0
+        missing = 0
+        last_id = 0
+        unlimited = DocumentStore(self.root, max_bytes=None, chunk_size=self.chunk_size)
+        while True:
+            rows = conn.execute('''
+                SELECT id, file_path, file_size FROM documents
+                WHERE blob_sha256 IS NULL AND file_path IS NOT NULL AND id > ?
+                ORDER BY id LIMIT ?
+            ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            
+            for doc_id, file_path, file_size in rows:
+                if not os.path.isfile(file_path):
+                    missing += 1
+                    continue
+                with open(file_path, 'rb') as f:
+                    staged = unlimited.stage(f)
+                with conn.transaction() as tx:
+                    cursor = tx.cursor()
+                    path = self.store(cursor, staged)
+                    # Every row sharing the loose file moves to the blob
+                    cursor.execute('''
+                        UPDATE documents SET blob_sha256 = ?, file_path = ?, file_size = ?
+                        WHERE file_path = ? AND blob_sha256 IS NULL
+                    ''', (staged.sha256, path, staged.size, file_path))
+                    if cursor.rowcount > 1:
+                        cursor.execute('UPDATE blobs SET ref_count = ref_count + ? WHERE sha256 = ?',
+                                       (cursor.rowcount - 1, staged.sha256))
+                    record_usage(cursor, UPLOADS_AREA, -1, -os.path.getsize(file_path))
+                self.finalize(staged)
+                os.remove(file_path)
+                imported += 1
+        return {'imported': imported, 'missing': missing}
+
+
+if __name__ == "__main__":
+    # Usage: python document_store.py [db_path] [gc|import-legacy]
+    from connection_manager import ConnectionManager
+    from migrations import ensure_schema
+    
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'suvidha_live.db'
+    command = sys.argv[2] if len(sys.argv) > 2 else 'gc'
+    
+    manager = ConnectionManager(db_path)
+    ensure_schema(manager)
+    store = DocumentStore()
+    if command == 'import-legacy':
+        print(store.import_legacy_documents(manager))
+    else:
+        print(store.collect_garbage(manager))
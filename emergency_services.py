@@ -4,10 +4,12 @@ from translations import t
 import json
 from datetime import datetime
 import sqlite3
+from id_generator import new_id, init_node_id
 
 class LiveEmergencyServices:
     def __init__(self, db_connection):
         self.db = db_connection
+        init_node_id(db_connection)
         
     def show_emergency_dashboard(self, current_lang='en'):
         """Show emergency services dashboard with live data"""
@@ -223,7 +225,7 @@ class LiveEmergencyServices:
             )
         ''')
         
-        report_id = f"EMG{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        report_id = new_id('EMG')
         
         cursor.execute('''
             INSERT INTO emergency_reports 
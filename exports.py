@@ -0,0 +1,335 @@
+# exports.py
+import io
+import os
+import sys
+import csv
+import json
+import time
+import uuid
+import glob
+import logging
+import zipfile
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import product
+from archive import ARCHIVE_SCHEMA, ARCHIVED_TABLES, is_archive_attached, stored_columns
+
+# Data exports written straight from SQLite cursors to a temporary file.
+# Rows are fetched EXPORT_CHUNK_ROWS at a time and written as they arrive,
+# so memory stays flat however many rows an export covers. Nothing is
+# sorted: ORDER BY over millions of rows would make SQLite build a temporary
+# B-tree before returning the first row.
+#
+# An export is a list of sections (name, queries). Each query covers one
+# place the rows live (the main database, and the archive when attached) and
+# selects the table's stored columns, so every query of a section returns
+# the same header. WAL mode lets writers carry on while a long query reads.
+# NDJSON writes one {"section": ..., "data": {...}} object per line; CSV
+# writes one file per section and is therefore always zipped when there is
+# more than one section.
+#
+# Admin exports run on an ExportRunner thread, not the page's. Finished
+# files are served from disk when the download is clicked and purged by the
+# purge_exports scheduler job once they are EXPORT_KEEP_SECONDS old.
+
+logger = logging.getLogger(__name__)
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+EXPORT_FORMATS = (NDJSON, CSV)
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_FILE_PREFIX = 'suvidha_export_'
+EXPORT_KEEP_SECONDS = 60 * 60
+EXPORT_WORKERS = 1
+EXPORT_JOB_HISTORY = 20
+
+MIME_TYPES = {
+    NDJSON: 'application/x-ndjson',
+    CSV: 'text/csv',
+    'zip': 'application/zip'
+}
+
+
+class ExportFile:
+    """A finished export in a temporary file; the caller removes it"""
+    
+    def __init__(self, path, file_name, mime, rows):
+        self.path = path
+        self.file_name = file_name
+        self.mime = mime
+        self.rows = rows  # section -> rows written
+    
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+    
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _sources(conn, table):
+    """Where table's rows live: main, plus the archive when it is attached"""
+    if table in ARCHIVED_TABLES and is_archive_attached(conn):
+        return [f'main.{table}', f'{ARCHIVE_SCHEMA}.{table}']
+    return [f'main.{table}']
+
+
+def _columns(conn, table, alias):
+    return ', '.join(f'{alias}.{name}' for name, declared in stored_columns(conn, 'main', table))
+
+
+def _table_queries(conn, table, where, params, alias='t'):
+    """One query per source of table, filtered by where on alias"""
+    columns = _columns(conn, table, alias)
+    return [(f'SELECT {columns} FROM {source} AS {alias} WHERE {where}', list(params))
+            for source in _sources(conn, table)]
+
+
+def _related_queries(conn, table, request_where, params):
+    """table's rows for the service requests matching request_where on alias r.
+    
+    Every source of the requests is joined with every source of table, so a
+    request archived apart from its rows still finds them.
+    """
+    columns = _columns(conn, table, 't')
+    return [(f'''SELECT {columns} FROM {requests} AS r
+                 JOIN {source} AS t ON t.request_id = r.request_id
+                 WHERE {request_where}''', list(params))
+            for requests, source in product(_sources(conn, 'service_requests'), _sources(conn, table))]
+
+
+def user_export_sections(conn, user_id):
+    """Everything stored about one citizen, by users.id"""
+    return [
+        ('user_profile', _table_queries(conn, 'users', 't.id = ?', [user_id])),
+        ('service_requests', _table_queries(conn, 'service_requests', 't.user_id = ?', [user_id])),
+        ('request_status_history', _related_queries(conn, 'request_status_history', 'r.user_id = ?', [user_id])),
+        ('payments', _table_queries(conn, 'payments', 't.user_id = ?', [user_id])),
+        ('documents', _table_queries(conn, 'documents', 't.user_id = ?', [user_id])),
+        ('notifications', _table_queries(conn, 'notifications', 't.user_id = ?', [user_id]))
+    ]
+
+
+def request_export_sections(conn, department=None, start_date=None, end_date=None):
+    """Service requests filed with a department and/or between two dates (inclusive),
+    with their status history, payments and documents"""
+    conditions = []
+    params = []
+    if department:
+        conditions.append('r.department = ?')
+        params.append(department)
+    if start_date:
+        conditions.append('r.created_at >= ?')
+        params.append(start_date.strftime('%Y-%m-%d'))
+    if end_date:
+        conditions.append('r.created_at < ?')
+        params.append((end_date + timedelta(days=1)).strftime('%Y-%m-%d'))
+    request_where = ' AND '.join(conditions) or '1'
+    
+    return [
+        ('service_requests', _table_queries(conn, 'service_requests', request_where, params, alias='r')),
+        ('request_status_history', _related_queries(conn, 'request_status_history', request_where, params)),
+        ('payments', _related_queries(conn, 'payments', request_where, params)),
+        ('documents', _related_queries(conn, 'documents', request_where, params))
+    ]
+
+
+def iter_rows(conn, queries, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield (columns, row) for every row of queries, chunk_rows rows in memory at a time"""
+    for sql, params in queries:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        columns = [description[0] for description in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            for row in rows:
+                yield columns, row
+        cursor.close()
+
+
+def _json_value(value):
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+# One encoder for every row; json.dumps() builds a new one per call when
+# given default=
+_encoder = json.JSONEncoder(default=_json_value, ensure_ascii=False)
+
+
+def _write_ndjson(out, conn, sections, rows, chunk_rows):
+    for name, queries in sections:
+        count = 0
+        for columns, row in iter_rows(conn, queries, chunk_rows):
+            out.write(_encoder.encode({'section': name, 'data': dict(zip(columns, row))}))
+            out.write('\n')
+            count += 1
+        rows[name] = count
+
+
+def _write_csv(out, conn, queries, chunk_rows):
+    writer = csv.writer(out)
+    count = 0
+    header_written = False
+    for columns, row in iter_rows(conn, queries, chunk_rows):
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def _zip_member(archive, member):
+    """A text stream writing member into a zip archive as it goes"""
+    return io.TextIOWrapper(archive.open(member, 'w', force_zip64=True), encoding='utf-8', newline='')
+
+
+def write_export(conn, sections, export_format=NDJSON, compress=False, name='suvidha_export',
+                 chunk_rows=EXPORT_CHUNK_ROWS, directory=None):
+    """Write sections to a temporary file and return it as an ExportFile.
+    
+    Zipped members are streamed into the archive as they are written
+    (ZIP64, so members may pass 4 GB).
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}'")
+    if export_format == CSV and len(sections) > 1:
+        compress = True
+    
+    extension = 'zip' if compress else export_format
+    fd, path = tempfile.mkstemp(prefix=EXPORT_FILE_PREFIX, suffix=f'.{extension}', dir=directory)
+    os.close(fd)
+    rows = {}
+    try:
+        if compress:
+            with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                if export_format == NDJSON:
+                    with _zip_member(archive, f'{name}.{NDJSON}') as out:
+                        _write_ndjson(out, conn, sections, rows, chunk_rows)
+                else:
+                    for section, queries in sections:
+                        with _zip_member(archive, f'{section}.{CSV}') as out:
+                            rows[section] = _write_csv(out, conn, queries, chunk_rows)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as out:
+                if export_format == NDJSON:
+                    _write_ndjson(out, conn, sections, rows, chunk_rows)
+                else:
+                    section, queries = sections[0]
+                    rows[section] = _write_csv(out, conn, queries, chunk_rows)
+    except BaseException:
+        os.remove(path)
+        raise
+    
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return ExportFile(path, f'{name}_{stamp}.{extension}', MIME_TYPES[extension], rows)
+
+
+def purge_stale_exports(directory=None, max_age_seconds=EXPORT_KEEP_SECONDS):
+    """Delete export files older than max_age_seconds; returns how many"""
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for path in glob.glob(os.path.join(directory or tempfile.gettempdir(), f'{EXPORT_FILE_PREFIX}*')):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+class ExportJob:
+    """One export run; the page polls it and offers the file when done"""
+    
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = 'queued'
+        self.started_at = time.time()
+        self.seconds = None
+        self.export = None
+        self.error = None
+        self._done = threading.Event()
+    
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+    
+    @property
+    def elapsed(self):
+        return self.seconds if self.seconds is not None else time.time() - self.started_at
+    
+    def wait(self, timeout=None):
+        """Block until the run finishes; returns whether it did"""
+        return self._done.wait(timeout)
+
+
+class ExportRunner:
+    """Writes exports on a background thread, keeping page reruns free"""
+    
+    def __init__(self, conn, workers=EXPORT_WORKERS):
+        self.conn = conn
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        self._jobs = OrderedDict()  # job id -> ExportJob
+        self._lock = threading.Lock()
+    
+    def submit(self, sections, export_format=NDJSON, compress=False, name='suvidha_export'):
+        job = ExportJob(name)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > EXPORT_JOB_HISTORY:
+                oldest = next(iter(self._jobs.values()))
+                if not oldest.finished:
+                    break
+                self._jobs.popitem(last=False)
+                if oldest.export is not None:
+                    oldest.export.remove()
+        self._executor.submit(self._run, job, sections, export_format, compress)
+        return job
+    
+    def job(self, job_id):
+        return self._jobs.get(job_id)
+    
+    def _run(self, job, sections, export_format, compress):
+        job.status = 'running'
+        try:
+            job.export = write_export(self.conn, sections, export_format, compress, job.name)
+            job.status = 'done'
+        except Exception as e:
+            logger.exception("Export %s failed", job.name)
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.seconds = time.time() - job.started_at
+            job._done.set()
+    
+    def shutdown(self, wait=False):
+        """Drop queued exports; wait=True also waits for a running one"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    # Usage: python exports.py [db_path] [ndjson|csv] [department] - export service requests
+    from connection_manager import ConnectionManager
+    from archive import ensure_archive
+    
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'suvidha_live.db'
+    export_format = sys.argv[2] if len(sys.argv) > 2 else NDJSON
+    department = sys.argv[3] if len(sys.argv) > 3 else None
+    
+    manager = ConnectionManager(db_path)
+    ensure_archive(manager)
+    export = write_export(manager, request_export_sections(manager, department), export_format,
+                          compress=True, directory='.')
+    print(export.path, export.size, export.rows)
@@ -0,0 +1,213 @@
+# id_generator.py
+import os
+import uuid
+import atexit
+import socket
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from connection_manager import ConnectionManager
+from migrations import ensure_schema
+
+logger = logging.getLogger(__name__)
+
+# Digits reserved for each part of the ID after the prefix
+NODE_DIGITS = 3
+SEQUENCE_DIGITS = 3
+MAX_NODE_ID = 10 ** NODE_DIGITS - 1
+MAX_SEQUENCE = 10 ** SEQUENCE_DIGITS - 1
+
+# A leased node id is renewed every NODE_RENEW_SECONDS; one not renewed for
+# NODE_LEASE_SECONDS belongs to a dead process and may be handed out again
+NODE_LEASE_SECONDS = 10 * 60
+NODE_RENEW_SECONDS = 60
+
+
+def configured_node_id():
+    """The node id set in SUVIDHA_NODE_ID (0-999), or None"""
+    configured = os.getenv('SUVIDHA_NODE_ID')
+    if configured is None:
+        return None
+    node_id = int(configured)
+    if not 0 <= node_id <= MAX_NODE_ID:
+        raise ValueError(f"SUVIDHA_NODE_ID must be between 0 and {MAX_NODE_ID}")
+    return node_id
+
+
+class IdGenerator:
+    """Time-ordered, monotonic ID allocator (snowflake style).
+
+    IDs look like SR20260210165533123042007:
+        prefix + YYYYMMDDHHMMSS (UTC) + milliseconds (3) + node id (3) + sequence (3)
+
+    They sort by creation time, stay readable, and never repeat within a
+    process: up to 1000 IDs share a millisecond, after which the generator
+    borrows the next millisecond instead of waiting. A clock that steps
+    backwards is ignored, so IDs keep increasing. Processes sharing a
+    database must use distinct node ids; see init_node_id().
+    """
+
+    def __init__(self, node_id):
+        self.node_id = int(node_id)
+        if not 0 <= self.node_id <= MAX_NODE_ID:
+            raise ValueError(f"node_id must be between 0 and {MAX_NODE_ID}")
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._sequence = 0
+
+    def _next_tick(self):
+        """Reserve the next (millisecond, sequence, node id)"""
+        now_ms = time.time_ns() // 1_000_000
+        with self._lock:
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._last_ms += 1
+                self._sequence = 0
+            return self._last_ms, self._sequence, self.node_id
+
+    def set_node_id(self, node_id):
+        """Switch to another node id, e.g. a fresh lease after losing the old one"""
+        with self._lock:
+            self.node_id = int(node_id)
+
+    def new_id(self, prefix=''):
+        """Allocate a new ID with the given prefix (e.g. 'SR', 'PAY')"""
+        ms, sequence, node_id = self._next_tick()
+        seconds, millis = divmod(ms, 1000)
+        stamp = datetime.fromtimestamp(seconds, timezone.utc).strftime('%Y%m%d%H%M%S')
+        return f"{prefix}{stamp}{millis:03d}{node_id:03d}{sequence:03d}"
+
+
+class NodeLease:
+    """A node id leased from the node_leases table (migration 014).
+
+    acquire() takes the lowest node id nobody holds, in one write
+    transaction, so two processes can never get the same one. A daemon
+    thread renews the lease until release(); if it was lost anyway (the
+    process stalled past NODE_LEASE_SECONDS) a new node id is leased and
+    handed to the generator.
+    """
+
+    def __init__(self, conn, generator=None, lease_seconds=NODE_LEASE_SECONDS,
+                 renew_seconds=NODE_RENEW_SECONDS):
+        self.conn = conn
+        self.generator = generator
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.node_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def acquire(self):
+        now = time.time()
+        with self.conn.transaction() as tx:
+            tx.execute('DELETE FROM node_leases WHERE renewed_at < ? OR owner = ?',
+                       (now - self.lease_seconds, self.owner))
+            taken = {node_id for (node_id,) in tx.execute('SELECT node_id FROM node_leases')}
+            free = [node_id for node_id in range(MAX_NODE_ID + 1) if node_id not in taken]
+            if not free:
+                raise RuntimeError(f"All {MAX_NODE_ID + 1} node ids are leased")
+            tx.execute('INSERT INTO node_leases (node_id, owner, leased_at, renewed_at) VALUES (?, ?, ?, ?)',
+                       (free[0], self.owner, now, now))
+        self.node_id = free[0]
+        if self.generator is not None:
+            self.generator.set_node_id(self.node_id)
+        return self.node_id
+
+    def renew(self):
+        """Extend the lease; returns False if it had been taken over"""
+        with self.conn.transaction() as tx:
+            renewed = tx.execute('UPDATE node_leases SET renewed_at=? WHERE node_id=? AND owner=?',
+                                 (time.time(), self.node_id, self.owner)).rowcount
+        return renewed == 1
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='node-lease', daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(self.renew_seconds):
+            try:
+                if not self.renew():
+                    lost = self.node_id
+                    logger.error("Node id %s lease was taken over; leased %s instead", lost, self.acquire())
+            except Exception:
+                logger.exception('Node id lease renewal failed')
+
+    def release(self):
+        self._stop.set()
+        try:
+            with self.conn.transaction() as tx:
+                tx.execute('DELETE FROM node_leases WHERE node_id=? AND owner=?', (self.node_id, self.owner))
+        except sqlite3.Error:
+            pass  # it expires on its own
+
+
+_default_generator = None
+_default_pid = None
+_default_lease = None
+_init_lock = threading.Lock()
+# SUVIDHA_NODE_ID names one process; workers forked from it lease their own
+_configured_pid = os.getpid()
+
+
+def init_node_id(conn):
+    """Give this process its node id: SUVIDHA_NODE_ID if set, otherwise a
+    lease from conn's database, migrated first if need be. conn may be a
+    ConnectionManager or a plain sqlite3 connection. An in-memory database
+    is private to this process, so there is nothing to lease from and
+    node id 0 is used.
+
+    Call once at startup, before new_id(); later calls return the same id.
+    """
+    global _default_generator, _default_pid, _default_lease
+    with _init_lock:
+        if _default_pid == os.getpid():
+            return _default_generator.node_id
+        node_id = configured_node_id() if os.getpid() == _configured_pid else None
+        if node_id is None and not isinstance(conn, ConnectionManager):
+            path = conn.execute('PRAGMA database_list').fetchone()[2]
+            if path:
+                # The lease is renewed from another thread, which a plain
+                # connection does not allow
+                conn = ConnectionManager(path)
+            else:
+                logger.warning('No database file to lease a node id from; using node id 0')
+                node_id = 0
+        if node_id is None:
+            ensure_schema(conn)
+            generator = IdGenerator(0)
+            lease = NodeLease(conn, generator)
+            lease.acquire()
+            lease.start()
+            atexit.register(lease.release)
+        else:
+            generator = IdGenerator(node_id)
+            lease = None
+        _default_generator, _default_pid, _default_lease = generator, os.getpid(), lease
+        return generator.node_id
+
+
+def new_id(prefix=''):
+    """Allocate an ID from the process-wide generator"""
+    global _default_generator, _default_pid
+    if _default_pid != os.getpid():
+        # Not initialized here yet, or a forked worker still holding its
+        # parent's generator: only a configured node id is safe without a lease
+        with _init_lock:
+            if _default_pid != os.getpid():
+                node_id = configured_node_id() if os.getpid() == _configured_pid else None
+                if node_id is None:
+                    raise RuntimeError("No node id for this process: set SUVIDHA_NODE_ID or call "
+                                       "id_generator.init_node_id(conn) at startup")
+                _default_generator, _default_pid = IdGenerator(node_id), os.getpid()
+    return _default_generator.new_id(prefix)
@@ -3,17 +3,41 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
-import sqlite3
 import qrcode
-from PIL import Image
 import io
 import base64
 import uuid
 import os
+import mimetypes
 from pathlib import Path
 from twilio.rest import Client
 from dotenv import load_dotenv
 import time
+from connection_manager import ConnectionManager
+from migrations import ensure_schema
+from id_generator import new_id, init_node_id
+from rollups import get_daily_rollups, summarize_rollups
+from database import (UnitOfWork, get_user_requests_page, get_user_payments_page,
+                      get_user_documents_page, get_user_notifications_page,
+                      search_requests, search_documents, get_request_history,
+                      get_requests_history, get_pending_bills, get_latest_otp,
+                      count_active_users)
+from archive import ensure_archive
+from user_stats import UserSummaryCache
+from storage import get_storage_usage, UPLOADS_AREA, DATABASE_AREA
+from scheduler import Scheduler
+from document_store import DocumentStore, UploadTooLarge, MAX_UPLOAD_MB
+from previews import PreviewGenerator, existing_rendition, THUMBNAIL, PREVIEW
+from exports import write_export, user_export_sections, request_export_sections, ExportRunner, NDJSON, CSV
+from reports import ReportEngine, REPORTS
+from request_grid import (fetch_grid_page, count_grid_rows, iter_matching_request_ids, GRID_SORTS,
+                          REQUEST_STATUSES, OPEN_STATUSES, REQUEST_PRIORITIES, DEFAULT_GRID_PAGE_SIZE)
+from status_transitions import transition_requests, summarize_failures, ALLOWED_TRANSITIONS, LOOKUP_BATCH_SIZE
+from assignment import (AssignmentEngine, add_field_staff, get_field_staff, set_staff_online, ZONES,
+                        DEFAULT_MAX_OPEN_REQUESTS)
+from maintenance_jobs import default_jobs
+import query_stats
+from resources import register, get_resource, registry, check_connection
 
 # Load environment variables
 load_dotenv()
@@ -85,6 +109,89 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Process-wide resources. This script re-runs on every interaction, but the
+# registry keeps what the factories build, so reruns only pay for rendering.
+def open_database():
+    """Open the database and apply any pending schema migrations"""
+    conn = ConnectionManager('suvidha_live.db')
+    ensure_schema(conn)
+    ensure_archive(conn)
+    init_node_id(conn)
+    return conn
+
+
+def create_sms_client():
+    """Twilio client, or None when Twilio is not configured"""
+    account_sid = os.getenv('TWILIO_ACCOUNT_SID')
+    auth_token = os.getenv('TWILIO_AUTH_TOKEN')
+    twilio_phone = os.getenv('TWILIO_PHONE_NUMBER')
+    
+    if not all([account_sid, auth_token, twilio_phone]):
+        return None
+    return Client(account_sid, auth_token)
+
+
+def create_upload_folder():
+    """Create uploads folder if it doesn't exist"""
+    folder = Path("uploads")
+    folder.mkdir(exist_ok=True)
+    return folder
+
+
+def load_catalog():
+    """Languages and departments (with their service types) offered by the kiosk"""
+    return {
+        'languages': {
+            'en': 'English',
+            'hi': 'हिंदी',
+            'mr': 'मराठी',
+            'ta': 'தமிழ்'
+        },
+        'departments': {
+            "⚡ Electricity Department": ["Power Outage", "New Connection", "Bill Issue", "Meter Complaint", "Safety Inspection"],
+            "💧 Water Department": ["No Water Supply", "Water Quality Issue", "New Connection", "Pipeline Leakage", "Bill Payment"],
+            "🔥 Gas Department": ["Gas Leak Complaint", "New Connection", "Safety Inspection", "Appliance Service", "Bill Payment"],
+            "🗑️ Waste Management": ["Garbage Not Collected", "Sanitation Complaint", "Recycling Information", "Illegal Dumping", "Composting Request"]
+        }
+    }
+
+
+def create_scheduler():
+    """This process's maintenance job scheduler, started unless SUVIDHA_SCHEDULER=0"""
+    scheduler = Scheduler(get_resource('db'), default_jobs())
+    if os.getenv('SUVIDHA_SCHEDULER', '1') != '0':
+        scheduler.start()
+    return scheduler
+
+
+def create_assignment_engine():
+    """This process's request auto-assignment engine, started unless SUVIDHA_AUTO_ASSIGN=0"""
+    engine = AssignmentEngine(get_resource('db'))
+    if os.getenv('SUVIDHA_AUTO_ASSIGN', '1') != '0':
+        engine.start()
+    return engine
+
+
+register('db', open_database, health_check=check_connection, teardown=lambda conn: conn.close())
+register('sms', create_sms_client)
+register('uploads', create_upload_folder)
+register('catalog', load_catalog)
+register('document_store', DocumentStore)
+# These hold the db manager in worker threads: a db rebuild stops them (and
+# waits for work in flight) before the old manager is closed
+register('previews', lambda: PreviewGenerator(get_resource('db')),
+         teardown=lambda previews: previews.shutdown(wait=True), depends_on=['db'])
+register('user_summaries', UserSummaryCache)
+register('reports', lambda: ReportEngine(get_resource('db')),
+         teardown=lambda engine: engine.shutdown(wait=True), depends_on=['db'])
+register('exports', lambda: ExportRunner(get_resource('db')),
+         teardown=lambda runner: runner.shutdown(wait=True), depends_on=['db'])
+register('scheduler', create_scheduler,
+         teardown=lambda scheduler: scheduler.stop(), depends_on=['db'])
+register('assignments', create_assignment_engine,
+         teardown=lambda engine: engine.stop(), depends_on=['db'])
+
+
 class LiveSuvidha:
     def __init__(self):
         # Initialize Twilio client
@@ -95,215 +202,43 @@ class LiveSuvidha:
         
         self.db = self.init_database()
         self.create_upload_folder()
-        self.languages = {
-            'en': 'English',
-            'hi': 'हिंदी',
-            'mr': 'मराठी',
-            'ta': 'தமிழ்'
-        }
-        self.departments = {
-            "⚡ Electricity Department": ["Power Outage", "New Connection", "Bill Issue", "Meter Complaint", "Safety Inspection"],
-            "💧 Water Department": ["No Water Supply", "Water Quality Issue", "New Connection", "Pipeline Leakage", "Bill Payment"],
-            "🔥 Gas Department": ["Gas Leak Complaint", "New Connection", "Safety Inspection", "Appliance Service", "Bill Payment"],
-            "🗑️ Waste Management": ["Garbage Not Collected", "Sanitation Complaint", "Recycling Information", "Illegal Dumping", "Composting Request"]
-        }
+        # Maintenance jobs run in every server process, not just on admin pages
+        self.scheduler = get_resource('scheduler')
+        self.assignments = get_resource('assignments')
+        catalog = get_resource('catalog')
+        self.languages = catalog['languages']
+        self.departments = catalog['departments']
         
         # OTP settings
         self.otp_expiry_minutes = 5  # OTP expires in 5 minutes
         self.max_otp_attempts = 3    # Max attempts per OTP
     
     def init_twilio(self):
-        """Initialize Twilio client"""
+        """Get the shared Twilio client"""
         try:
-            account_sid = os.getenv('TWILIO_ACCOUNT_SID')
-            auth_token = os.getenv('TWILIO_AUTH_TOKEN')
-            twilio_phone = os.getenv('TWILIO_PHONE_NUMBER')
-            
-            if not all([account_sid, auth_token, twilio_phone]):
-                st.warning("⚠️ Twilio not configured. Using demo OTP mode.")
-                return None
-            
-            client = Client(account_sid, auth_token)
-            return client
+            client = get_resource('sms')
         except Exception as e:
             st.warning(f"⚠️ Twilio initialization failed: {str(e)}. Using demo OTP mode.")
             return None
+        
+        if client is None:
+            st.warning("⚠️ Twilio not configured. Using demo OTP mode.")
+        return client
     
     def create_upload_folder(self):
-        """Create uploads folder if it doesn't exist"""
-        Path("uploads").mkdir(exist_ok=True)
+        """Get the uploads folder, creating it once per process"""
+        return get_resource('uploads')
     
     def init_database(self):
-        """Initialize SQLite database with comprehensive schema"""
-        conn = sqlite3.connect('suvidha_live.db', check_same_thread=False)
-        cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT UNIQUE,
-                aadhaar TEXT UNIQUE,
-                name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                email TEXT,
-                address TEXT,
-                pincode TEXT,
-                language TEXT DEFAULT 'en',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP,
-                is_active BOOLEAN DEFAULT TRUE,
-                user_type TEXT DEFAULT 'citizen'
-            )
-        ''')
-        
-        # Create OTP verification table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS otp_verification (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                aadhaar TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                otp TEXT NOT NULL,
-                attempt_count INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP DEFAULT (datetime('now', '+5 minutes')),
-                verified BOOLEAN DEFAULT FALSE,
-                message_sid TEXT
-            )
-        ''')
-        
-        # Create OTP rate limiting table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS otp_rate_limit (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                phone TEXT NOT NULL,
-                attempt_count INTEGER DEFAULT 0,
-                last_attempt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                blocked_until TIMESTAMP
-            )
-        ''')
-        
-        # Create service requests table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS service_requests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                request_id TEXT UNIQUE,
-                user_id INTEGER,
-                department TEXT NOT NULL,
-                service_type TEXT NOT NULL,
-                description TEXT NOT NULL,
-                address TEXT,
-                pincode TEXT,
-                priority TEXT DEFAULT 'Medium',
-                status TEXT DEFAULT 'Pending',
-                assigned_to TEXT,
-                estimated_completion DATE,
-                actual_completion DATE,
-                feedback_rating INTEGER,
-                feedback_comment TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Create request status history
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS request_status_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                request_id TEXT,
-                status TEXT,
-                comments TEXT,
-                updated_by TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (request_id) REFERENCES service_requests (request_id)
-            )
-        ''')
-        
-        # Create payments table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS payments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                payment_id TEXT UNIQUE,
-                request_id TEXT,
-                user_id INTEGER,
-                bill_type TEXT,
-                bill_number TEXT,
-                amount REAL NOT NULL,
-                due_date DATE,
-                payment_method TEXT,
-                transaction_id TEXT,
-                status TEXT DEFAULT 'Pending',
-                receipt_path TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completed_at TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (request_id) REFERENCES service_requests (request_id)
-            )
-        ''')
-        
-        # Create documents table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                doc_id TEXT UNIQUE,
-                user_id INTEGER,
-                request_id TEXT,
-                document_type TEXT,
-                document_name TEXT,
-                file_path TEXT,
-                file_size INTEGER,
-                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                verified BOOLEAN DEFAULT FALSE,
-                verified_by TEXT,
-                verified_at TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (request_id) REFERENCES service_requests (request_id)
-            )
-        ''')
-        
-        # Create notifications table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS notifications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                notification_type TEXT,
-                title TEXT,
-                message TEXT,
-                is_read BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Create analytics table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS analytics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                metric_date DATE,
-                total_requests INTEGER DEFAULT 0,
-                completed_requests INTEGER DEFAULT 0,
-                pending_requests INTEGER DEFAULT 0,
-                avg_completion_time REAL,
-                user_count INTEGER DEFAULT 0,
-                payment_amount REAL DEFAULT 0
-            )
-        ''')
-        
-        # Insert default admin user
-        cursor.execute("SELECT COUNT(*) FROM users WHERE user_type='admin'")
-        if cursor.fetchone()[0] == 0:
-            admin_id = str(uuid.uuid4())[:8]
-            cursor.execute('''
-                INSERT INTO users (user_id, name, phone, email, user_type, is_active)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (admin_id, 'Admin User', '9999999999', 'admin@suvidha.gov.in', 'admin', True))
-        
-        conn.commit()
-        return conn
+        """Get the shared database connection manager"""
+        return get_resource('db')
     
     def get_user_id(self):
         """Get current user's database ID"""
+        # Every login path stores the row id; only older sessions need the lookup
+        user = st.session_state.get('user') or {}
+        if user.get('id') is not None:
+            return user['id']
         if 'user_id' in st.session_state:
             cursor = self.db.cursor()
             cursor.execute("SELECT id FROM users WHERE user_id=?", (st.session_state.user_id,))
@@ -311,6 +246,31 @@ class LiveSuvidha:
             return result[0] if result else None
         return None
     
+    def get_paged_rows(self, key, fetch_page):
+        """Rows for a keyset-paginated listing, plus the cursor for the next page.
+        
+        The first page is fetched fresh on every render. Older pages are only
+        fetched when the user clicks "Load more" and are kept in session state
+        under key. fetch_page(after) must return (rows, next_cursor).
+        """
+        rows, next_cursor = fetch_page(None)
+        older = st.session_state.get(key)
+        if older and next_cursor is not None:
+            seen = {row[0] for row in rows}
+            rows = rows + [row for row in older['rows'] if row[0] not in seen]
+            next_cursor = older['cursor']
+        return rows, next_cursor
+    
+    def show_load_more(self, key, fetch_page, next_cursor):
+        """Render a "Load more" button that fetches exactly one more page"""
+        if next_cursor is None:
+            return
+        if st.button("Load more", key=f"{key}_more"):
+            page, cursor = fetch_page(next_cursor)
+            older = st.session_state.get(key) or {'rows': []}
+            st.session_state[key] = {'rows': older['rows'] + page, 'cursor': cursor}
+            st.rerun()
+    
     def send_otp_sms(self, phone_number, otp):
         """Send OTP via Twilio SMS"""
         try:
@@ -346,8 +306,8 @@ class LiveSuvidha:
         # Check if blocked
         cursor.execute('''
             SELECT blocked_until FROM otp_rate_limit 
-            WHERE phone=? AND blocked_until > datetime('now')
-        ''', (phone,))
+            WHERE phone=? AND blocked_until > ?
+        ''', (phone, datetime.now()))
         result = cursor.fetchone()
         
         if result:
@@ -439,14 +399,7 @@ class LiveSuvidha:
         cursor = self.db.cursor()
         
         # Get the most recent unverified OTP
-        cursor.execute('''
-            SELECT id, otp, expires_at, attempt_count 
-            FROM otp_verification 
-            WHERE aadhaar=? AND phone=? AND verified=FALSE
-            ORDER BY created_at DESC LIMIT 1
-        ''', (aadhaar, phone))
-        
-        result = cursor.fetchone()
+        result = get_latest_otp(self.db, aadhaar, phone)
         
         if not result:
             return False, "No OTP found. Please request a new one."
@@ -466,32 +419,32 @@ class LiveSuvidha:
         
         # Verify OTP
         if stored_otp == otp_input:
-            # Mark OTP as verified
-            cursor.execute('''
-                UPDATE otp_verification 
-                SET verified=TRUE 
-                WHERE id=?
-            ''', (otp_id,))
-            
-            # Update rate limit (success)
-            self.update_rate_limit(phone, success=True)
+            with self.db.transaction():
+                # Mark OTP as verified
+                cursor.execute('''
+                    UPDATE otp_verification 
+                    SET verified=TRUE 
+                    WHERE id=?
+                ''', (otp_id,))
+                
+                # Update rate limit (success)
+                self.update_rate_limit(phone, success=True)
             
-            self.db.commit()
             return True, "OTP verified successfully!"
         else:
-            # Increment attempt count
-            cursor.execute('''
-                UPDATE otp_verification 
-                SET attempt_count=attempt_count + 1 
-                WHERE id=?
-            ''', (otp_id,))
-            
-            # Update rate limit (failure)
-            self.update_rate_limit(phone, success=False)
+            with self.db.transaction():
+                # Increment attempt count
+                cursor.execute('''
+                    UPDATE otp_verification 
+                    SET attempt_count=attempt_count + 1 
+                    WHERE id=?
+                ''', (otp_id,))
+                
+                # Update rate limit (failure)
+                self.update_rate_limit(phone, success=False)
             
             attempts_left = self.max_otp_attempts - (attempt_count + 1)
             
-            self.db.commit()
             return False, f"Incorrect OTP. {attempts_left} attempt(s) left."
     
     def resend_otp(self, aadhaar, phone):
@@ -508,11 +461,12 @@ class LiveSuvidha:
         message_sid, status = self.send_otp_sms(phone, otp)
         
         if status == "SUCCESS" or status == "DEMO_MODE":
-            # Store in database
-            self.store_otp(aadhaar, phone, otp, message_sid)
-            
-            # Update rate limit
-            self.update_rate_limit(phone, success=False)
+            with self.db.transaction():
+                # Store in database
+                self.store_otp(aadhaar, phone, otp, message_sid)
+                
+                # Update rate limit
+                self.update_rate_limit(phone, success=False)
             
             demo_msg = " (Demo Mode)" if status == "DEMO_MODE" else ""
             return True, f"OTP resent successfully!{demo_msg} OTP: {otp}"
@@ -673,55 +627,56 @@ class LiveSuvidha:
                     verified, message = self.verify_otp(aadhaar, phone, otp_input)
                     
                     if verified:
-                        # Check if user exists
-                        cursor = self.db.cursor()
-                        cursor.execute("SELECT * FROM users WHERE aadhaar=?", (aadhaar,))
-                        user = cursor.fetchone()
-                        
-                        if user:
-                            # Update last login
-                            cursor.execute("UPDATE users SET last_login=? WHERE id=?", 
-                                          (datetime.now(), user[0]))
-                            user_data = {
-                                'id': user[0],
-                                'user_id': user[1],
-                                'aadhaar': user[2],
-                                'name': user[3],
-                                'phone': user[4],
-                                'email': user[5],
-                                'address': user[6],
-                                'user_type': user[12]
-                            }
-                        else:
-                            # Create new user
-                            user_id = str(uuid.uuid4())[:8]
-                            cursor.execute('''
-                                INSERT INTO users 
-                                (user_id, aadhaar, name, phone, email, created_at, last_login)
-                                VALUES (?, ?, ?, ?, ?, ?, ?)
-                            ''', (user_id, aadhaar, name, phone, email, datetime.now(), datetime.now()))
-                            self.db.commit()
-                            
+                        # Login bookkeeping and welcome notification commit together
+                        with self.db.transaction():
+                            # Check if user exists
+                            cursor = self.db.cursor()
                             cursor.execute("SELECT * FROM users WHERE aadhaar=?", (aadhaar,))
                             user = cursor.fetchone()
-                            user_data = {
-                                'id': user[0],
-                                'user_id': user[1],
-                                'aadhaar': user[2],
-                                'name': user[3],
-                                'phone': user[4],
-                                'email': user[5],
-                                'user_type': user[12]
-                            }
                         
-                        st.session_state.authenticated = True
-                        st.session_state.user = user_data
-                        st.session_state.user_id = user_data['user_id']
-                        st.session_state.user_type = user_data['user_type']
+                            if user:
+                                # Update last login
+                                cursor.execute("UPDATE users SET last_login=? WHERE id=?", 
+                                              (datetime.now(), user[0]))
+                                user_data = {
+                                    'id': user[0],
+                                    'user_id': user[1],
+                                    'aadhaar': user[2],
+                                    'name': user[3],
+                                    'phone': user[4],
+                                    'email': user[5],
+                                    'address': user[6],
+                                    'user_type': user[12]
+                                }
+                            else:
+                                # Create new user
+                                user_id = str(uuid.uuid4())[:8]
+                                cursor.execute('''
+                                    INSERT INTO users 
+                                    (user_id, aadhaar, name, phone, email, created_at, last_login)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                                ''', (user_id, aadhaar, name, phone, email, datetime.now(), datetime.now()))
+                            
+                                cursor.execute("SELECT * FROM users WHERE aadhaar=?", (aadhaar,))
+                                user = cursor.fetchone()
+                                user_data = {
+                                    'id': user[0],
+                                    'user_id': user[1],
+                                    'aadhaar': user[2],
+                                    'name': user[3],
+                                    'phone': user[4],
+                                    'email': user[5],
+                                    'user_type': user[12]
+                                }
+                        
+                            st.session_state.authenticated = True
+                            st.session_state.user = user_data
+                            st.session_state.user_id = user_data['user_id']
+                            st.session_state.user_type = user_data['user_type']
                         
-                        # Add login notification
-                        self.add_notification(user_data['id'], 'login', 'Welcome Back!', 
-                                             f'Successfully logged in at {datetime.now().strftime("%Y-%m-%d %H:%M")}')
+                            # Add login notification
+                            self.add_notification(user_data['id'], 'login', 'Welcome Back!', 
+                                                 f'Successfully logged in at {datetime.now().strftime("%Y-%m-%d %H:%M")}')
                         
                         st.success(f"Welcome {name}!")
                         time.sleep(1)
@@ -821,8 +776,8 @@ class LiveSuvidha:
                         st.error("Invalid password")
                 else:
                     st.error("Invalid admin ID")
-
-
+    
+    
     def guest_login(self):
         st.info("Guest access provides limited functionality")
         
@@ -848,7 +803,7 @@ class LiveSuvidha:
             st.session_state.user_type = 'guest'
             st.success("Guest access granted!")
             st.rerun()
-
+    
     def show_main_app(self):
         """Show main application"""
         # Update OTP timer using time-based approach
@@ -880,10 +835,13 @@ class LiveSuvidha:
                 menu_items = {
                     "🏠 Admin Dashboard": "admin_dashboard",
                     "📊 Analytics": "analytics",
+                    "📈 Reports": "reports",
                     "👥 User Management": "user_management",
                     "📋 All Requests": "all_requests",
+                    "👷 Field Staff": "field_staff",
                     "💰 Payments": "payments_admin",
                     "📄 Documents": "documents_admin",
+                    "📤 Data Export": "data_export",
                     "⚙️ System Settings": "system_settings"
                 }
             else:
@@ -931,45 +889,35 @@ class LiveSuvidha:
             'payments_admin': self.show_payments_admin,
             'documents': self.show_documents,
             'documents_admin': self.show_documents_admin,
+            'data_export': self.show_data_export,
             'notifications': self.show_notifications,
             'settings': self.show_settings,
             'emergency': self.show_emergency,
             'admin_dashboard': self.show_admin_dashboard,
             'analytics': self.show_analytics,
+            'reports': self.generate_reports,
             'user_management': self.show_user_management,
             'all_requests': self.show_all_requests,
+            'field_staff': self.show_field_staff,
             'system_settings': self.show_system_settings
         }
         
         pages.get(st.session_state.page, self.show_dashboard)()
-
-
+    
+    
     def show_dashboard(self):
         """Show citizen dashboard with live data"""
         st.markdown(f"<div class='main-header'><h2>Welcome, {st.session_state.user['name']}!</h2></div>", 
                    unsafe_allow_html=True)
         
-        # Get live stats from database
+        # One read of the trigger-maintained counters; the recent lists are
+        # only refetched when this user's requests, payments or notifications change
         user_id = self.get_user_id()
-        
-        cursor = self.db.cursor()
-        
-        # Total requests
-        cursor.execute("SELECT COUNT(*) FROM service_requests WHERE user_id=?", (user_id,))
-        total_requests = cursor.fetchone()[0]
-        
-        # Pending requests
-        cursor.execute("SELECT COUNT(*) FROM service_requests WHERE user_id=? AND status='Pending'", (user_id,))
-        pending_requests = cursor.fetchone()[0]
-        
-        # Completed requests
-        cursor.execute("SELECT COUNT(*) FROM service_requests WHERE user_id=? AND status='Completed'", (user_id,))
-        completed_requests = cursor.fetchone()[0]
-        
-        # Pending payments
-        cursor.execute("SELECT SUM(amount) FROM payments WHERE user_id=? AND status='Pending'", (user_id,))
-        pending_payments_result = cursor.fetchone()[0]
-        pending_payments = pending_payments_result if pending_payments_result else 0
+        summary = get_resource('user_summaries').get(self.db, user_id)
+        total_requests = summary['total_requests']
+        pending_requests = summary['pending_requests']
+        completed_requests = summary['completed_requests']
+        pending_payments = summary['pending_payment_amount']
         
         # Quick stats
         col1, col2, col3, col4 = st.columns(4)
@@ -1016,16 +964,7 @@ class LiveSuvidha:
         # Recent activity from database
         st.subheader("📋 Recent Activity")
         
-        cursor.execute('''
-            SELECT sr.request_id, sr.department, sr.service_type, sr.status, sr.created_at,
-                   p.amount, p.status as payment_status
-            FROM service_requests sr
-            LEFT JOIN payments p ON sr.request_id = p.request_id
-            WHERE sr.user_id=?
-            ORDER BY sr.created_at DESC
-            LIMIT 10
-        ''', (user_id,))
-        recent_activities = cursor.fetchall()
+        recent_activities = summary['recent_activity']
         
         if recent_activities:
             for activity in recent_activities:
@@ -1049,14 +988,7 @@ class LiveSuvidha:
         
         # Recent notifications
         st.subheader("🔔 Recent Notifications")
-        cursor.execute('''
-            SELECT title, message, created_at, is_read 
-            FROM notifications 
-            WHERE user_id=? 
-            ORDER BY created_at DESC 
-            LIMIT 5
-        ''', (user_id,))
-        notifications = cursor.fetchall()
+        notifications = summary['recent_notifications']
         
         if notifications:
             for notif in notifications:
@@ -1088,7 +1020,7 @@ class LiveSuvidha:
                 landmark = st.text_input("Landmark (Optional)")
             with col2:
                 pincode = st.text_input("Pincode", max_chars=6)
-                zone = st.selectbox("Zone", ["Zone 1", "Zone 2", "Zone 3", "Zone 4"])
+                zone = st.selectbox("Zone", ZONES)
             
             # Priority
             priority = st.select_slider("Priority Level", 
@@ -1114,65 +1046,56 @@ class LiveSuvidha:
                     user_id = self.get_user_id()
                     
                     # Generate request ID
-                    request_id = f"SR{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                    
-                    # Save to database
-                    cursor = self.db.cursor()
-                    cursor.execute('''
-                        INSERT INTO service_requests 
-                        (request_id, user_id, department, service_type, description, 
-                         address, pincode, priority, created_at, updated_at)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        request_id,
-                        user_id,
-                        selected_dept,
-                        service_type,
-                        description,
-                        address,
-                        pincode,
-                        priority,
-                        datetime.now(),
-                        datetime.now()
-                    ))
+                    request_id = new_id('SR')
                     
-                    # Save uploaded documents
-                    if uploaded_files:
-                        for uploaded_file in uploaded_files:
-                            # Save file
-                            file_path = f"uploads/{request_id}_{uploaded_file.name}"
-                            with open(file_path, "wb") as f:
-                                f.write(uploaded_file.getbuffer())
-                            
-                            doc_id = f"DOC{str(uuid.uuid4())[:8]}"
-                            cursor.execute('''
-                                INSERT INTO documents 
-                                (doc_id, user_id, request_id, document_type, document_name, 
-                                 file_path, file_size, uploaded_at)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                            ''', (
-                                doc_id,
-                                user_id,
-                                request_id,
-                                "Supporting Document",
-                                uploaded_file.name,
-                                file_path,
-                                len(uploaded_file.getbuffer()),
-                                datetime.now()
-                            ))
-                    
-                    self.db.commit()
+                    # Stream uploads into the document store's staging area
+                    # before opening the transaction
+                    store = get_resource('document_store')
+                    staged_files = []
+                    try:
+                        for uploaded_file in uploaded_files or []:
+                            staged_files.append((uploaded_file.name, store.stage(uploaded_file)))
+                    except UploadTooLarge as e:
+                        for file_name, staged in staged_files:
+                            store.discard(staged)
+                        st.error(f"❌ {uploaded_file.name}: {e}")
+                        return
                     
-                    # Add status history
-                    cursor.execute('''
-                        INSERT INTO request_status_history 
-                        (request_id, status, comments, updated_by)
-                        VALUES (?, ?, ?, ?)
-                    ''', (request_id, "Pending", "Request submitted by user", st.session_state.user['name']))
+                    # Request, documents, history and notification commit together
+                    with UnitOfWork(self.db) as uow:
+                        uow.add_service_request({
+                            'request_id': request_id,
+                            'user_id': user_id,
+                            'department': selected_dept,
+                            'service_type': service_type,
+                            'description': description,
+                            'address': address,
+                            'pincode': pincode,
+                            'zone': zone,
+                            'priority': priority
+                        })
+                        
+                        for file_name, staged in staged_files:
+                            store.add_document(uow, {
+                                'user_id': user_id,
+                                'request_id': request_id,
+                                'document_type': "Supporting Document",
+                                'document_name': file_name
+                            }, staged)
+                        
+                        uow.add_status_history(request_id, "Pending", "Request submitted by user",
+                                               st.session_state.user['name'])
+                        
+                        uow.add_notification({
+                            'user_id': user_id,
+                            'notification_type': 'request_submitted',
+                            'title': 'Request Submitted',
+                            'message': f'Your service request {request_id} has been submitted successfully'
+                        })
                     
-                    # Add notification
-                    self.add_notification(user_id, 'request_submitted', 'Request Submitted', 
-                                         f'Your service request {request_id} has been submitted successfully')
+                    # Wake the assignment engine now rather than at its next poll
+                    self.assignments.submit(request_id)
+                    self.queue_previews(store, staged_files)
                     
                     # Show success
                     st.success("✅ Request submitted successfully!")
@@ -1277,42 +1200,52 @@ class LiveSuvidha:
         
         user_id = self.get_user_id()
         
-        # Get all user's requests
-        cursor = self.db.cursor()
-        cursor.execute('''
-            SELECT request_id, department, service_type, status, priority, created_at, 
-                   estimated_completion, actual_completion
-            FROM service_requests 
-            WHERE user_id=?
-            ORDER BY created_at DESC
-        ''', (user_id,))
-        user_requests = cursor.fetchall()
+        # Search and filter
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            search_term = st.text_input("Search requests",
+                                        placeholder="Request ID, department, description...")
+        with col2:
+            status_filter = st.selectbox("Filter by Status", 
+                                       ["All", "Pending", "In Progress", "Completed", "Rejected"])
+        
+        # Load the user's requests one page at a time; the status filter is
+        # applied in the query so paging stays on the index
+        # Closed requests older than the archive cutoff are only read on request
+        include_archived = st.checkbox("Include archived requests", value=False)
+        
+        status = None if status_filter == "All" else status_filter
+        columns = '''request_id, department, service_type, status, priority, created_at,
+                     estimated_completion, actual_completion'''
+        page_key = f"track_status_pages_{status_filter}_{include_archived}"
+        fetch_page = lambda after: get_user_requests_page(
+            self.db, user_id, after, status=status, columns=columns,
+            include_archived=include_archived)
+        if search_term:
+            # Ranked full-text search replaces paging while a term is entered
+            user_requests = search_requests(self.db, search_term, user_id=user_id,
+                                            status=status, columns=columns)
+            next_cursor = None
+        else:
+            user_requests, next_cursor = self.get_paged_rows(page_key, fetch_page)
+        
+        with col3:
+            department_filter = st.selectbox("Filter by Department", 
+                                           ["All"] + sorted(set([r[1] for r in user_requests])))
         
         if user_requests:
-            st.write(f"Found {len(user_requests)} request(s)")
-            
-            # Search and filter
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                search_term = st.text_input("Search by Request ID or Department")
-            with col2:
-                status_filter = st.selectbox("Filter by Status", 
-                                           ["All", "Pending", "In Progress", "Completed", "Rejected"])
-            with col3:
-                department_filter = st.selectbox("Filter by Department", 
-                                               ["All"] + list(set([r[1] for r in user_requests])))
+            st.write(f"Showing {len(user_requests)} request(s)")
             
             # Filter requests
             filtered_requests = user_requests
-            if search_term:
-                filtered_requests = [r for r in filtered_requests 
-                                   if search_term.lower() in r[0].lower() or 
-                                   search_term.lower() in r[1].lower()]
-            if status_filter != "All":
-                filtered_requests = [r for r in filtered_requests if r[3] == status_filter]
             if department_filter != "All":
                 filtered_requests = [r for r in filtered_requests if r[1] == department_filter]
             
+            # History is only loaded for requests whose "Show status history"
+            # box is ticked, all of them in one query
+            history_ids = [r[0] for r in filtered_requests if st.session_state.get(f"history_{r[0]}")]
+            histories = get_requests_history(self.db, history_ids, include_archived) if history_ids else {}
+            
             # Display requests
             for req in filtered_requests:
                 with st.expander(f"{req[0]} - {req[1]} - {req[2]}"):
@@ -1338,18 +1271,8 @@ class LiveSuvidha:
                             st.write(f"**Actual Completion:** {req[7]}")
                     
                     # Show status history
-                    cursor.execute('''
-                        SELECT status, comments, updated_by, created_at 
-                        FROM request_status_history 
-                        WHERE request_id=? 
-                        ORDER BY created_at DESC
-                    ''', (req[0],))
-                    status_history = cursor.fetchall()
-                    
-                    if status_history:
-                        st.subheader("Status History")
-                        for history in status_history:
-                            st.write(f"**{history[0]}** - {history[1]} (by {history[2]} at {history[3]})")
+                    if st.checkbox("Show status history", key=f"history_{req[0]}"):
+                        self.show_status_history(histories.get(req[0], []))
                     
                     # Action buttons
                     col3, col4, col5 = st.columns(3)
@@ -1363,9 +1286,24 @@ class LiveSuvidha:
                         if req[3] == "Completed":
                             if st.button("Give Feedback", key=f"feedback_{req[0]}"):
                                 self.collect_feedback(req[0])
+            
+            self.show_load_more(page_key, fetch_page, next_cursor)
+        elif search_term:
+            st.info(f"No requests match '{search_term}'")
+        elif status:
+            st.info(f"No {status} requests found")
         else:
             st.info("No service requests found. Submit your first request!")
     
+    def show_status_history(self, status_history):
+        """Render status history rows from get_requests_history()"""
+        if status_history:
+            st.subheader("Status History")
+            for history in status_history:
+                st.write(f"**{history[0]}** - {history[1]} (by {history[2]} at {history[3]})")
+        else:
+            st.caption("No status history yet")
+    
     def show_request_details(self, request_id):
         """Show detailed view of a request"""
         cursor = self.db.cursor()
@@ -1414,6 +1352,8 @@ class LiveSuvidha:
                 st.subheader("Attached Documents")
                 for doc in documents:
                     st.write(f"📄 {doc[0]} - Uploaded: {doc[1]} - Verified: {'✅' if doc[2] else '❌'}")
+            
+            self.show_status_history(get_request_history(self.db, request_id))
     
     def show_payments(self):
         """Show payment interface with live data"""
@@ -1423,13 +1363,7 @@ class LiveSuvidha:
         
         # Get user's pending bills
         cursor = self.db.cursor()
-        cursor.execute('''
-            SELECT payment_id, bill_type, bill_number, amount, due_date, status, created_at
-            FROM payments 
-            WHERE user_id=? AND status IN ('Pending', 'Overdue')
-            ORDER BY due_date ASC
-        ''', (user_id,))
-        pending_bills = cursor.fetchall()
+        pending_bills = get_pending_bills(self.db, user_id)
         
         if pending_bills:
             st.subheader("📋 Pending Bills")
@@ -1482,14 +1416,15 @@ class LiveSuvidha:
         with col2:
             end_date = st.date_input("To Date", datetime.now())
         
-        cursor.execute('''
-            SELECT payment_id, bill_type, amount, payment_method, status, 
-                   transaction_id, created_at, completed_at
-            FROM payments 
-            WHERE user_id=? AND created_at BETWEEN ? AND ?
-            ORDER BY created_at DESC
-        ''', (user_id, start_date, end_date))
-        payment_history = cursor.fetchall()
+        # Include payments made on the end date itself
+        range_start = str(start_date)
+        range_end = str(end_date + timedelta(days=1))
+        page_key = f"payment_history_pages_{range_start}_{range_end}"
+        fetch_page = lambda after: get_user_payments_page(
+            self.db, user_id, after, start=range_start, end=range_end,
+            columns='''payment_id, bill_type, amount, payment_method, status,
+                       transaction_id, created_at, completed_at''')
+        payment_history, next_cursor = self.get_paged_rows(page_key, fetch_page)
         
         if payment_history:
             # Create DataFrame for better display
@@ -1497,10 +1432,15 @@ class LiveSuvidha:
                             columns=['ID', 'Type', 'Amount', 'Method', 'Status', 
                                     'Transaction ID', 'Created', 'Completed'])
             st.dataframe(df, use_container_width=True, hide_index=True)
+            self.show_load_more(page_key, fetch_page, next_cursor)
             
-            # Summary
-            total_paid = sum([p[2] for p in payment_history if p[4] == 'Completed'])
-            successful_payments = len([p for p in payment_history if p[4] == 'Completed'])
+            # Summary over the whole date range, not just the loaded pages
+            cursor.execute('''
+                SELECT COALESCE(SUM(amount), 0), COUNT(*)
+                FROM payments 
+                WHERE user_id=? AND created_at >= ? AND created_at < ? AND status='Completed'
+            ''', (user_id, range_start, range_end))
+            total_paid, successful_payments = cursor.fetchone()
             
             col1, col2 = st.columns(2)
             with col1:
@@ -1568,20 +1508,18 @@ class LiveSuvidha:
             
             if st.button("Confirm Payment", type="primary"):
                 # Process payment
-                transaction_id = f"TXN{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                transaction_id = new_id('TXN')
                 user_id = self.get_user_id()
                 
-                cursor = self.db.cursor()
-                cursor.execute('''
-                    UPDATE payments 
-                    SET status=?, payment_method=?, transaction_id=?, completed_at=?
-                    WHERE payment_id=?
-                ''', ('Completed', 'UPI', transaction_id, datetime.now(), bill['payment_id']))
-                self.db.commit()
-                
-                # Add notification
-                self.add_notification(user_id, 'payment_completed', 'Payment Successful', 
-                                     f'Payment of ₹{bill["amount"]:,.2f} for {bill["bill_type"]} completed successfully')
+                # Payment update and notification commit together
+                with UnitOfWork(self.db) as uow:
+                    uow.complete_payment(bill['payment_id'], 'UPI', transaction_id)
+                    uow.add_notification({
+                        'user_id': user_id,
+                        'notification_type': 'payment_completed',
+                        'title': 'Payment Successful',
+                        'message': f'Payment of ₹{bill["amount"]:,.2f} for {bill["bill_type"]} completed successfully'
+                    })
                 
                 st.success(f"✅ Payment of ₹{bill['amount']:,.2f} successful!")
                 st.balloons()
@@ -1651,6 +1589,19 @@ class LiveSuvidha:
             st.session_state.page = "payments"
             st.rerun()
     
+    def queue_previews(self, store, staged_files):
+        """Start rendering thumbnails for freshly stored uploads"""
+        try:
+            previews = get_resource('previews')
+            for file_name, staged in staged_files:
+                previews.submit(store.blob_path(staged.sha256))
+        except Exception as e:
+            # The render_previews job picks up anything missed here
+            st.caption(f"Previews will be generated later ({e})")
+    
+    def document_mime_type(self, file_name):
+        return mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+    
     def show_documents(self):
         """Document management with live data"""
         st.title("📄 Document Management")
@@ -1680,61 +1631,60 @@ class LiveSuvidha:
             uploaded_files = st.file_uploader("Choose files", 
                                             accept_multiple_files=True,
                                             type=['pdf', 'jpg', 'jpeg', 'png', 'doc', 'docx'],
-                                            help="Maximum 10MB per file")
+                                            help=f"Maximum {MAX_UPLOAD_MB}MB per file")
             
             if st.form_submit_button("Upload Documents", type="primary"):
                 if uploaded_files:
-                    for uploaded_file in uploaded_files:
-                        # Generate unique filename
-                        file_ext = uploaded_file.name.split('.')[-1]
-                        unique_filename = f"{str(uuid.uuid4())[:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_ext}"
-                        file_path = f"uploads/{unique_filename}"
-                        
-                        # Save file
-                        with open(file_path, "wb") as f:
-                            f.write(uploaded_file.getbuffer())
-                        
-                        # Save to database
-                        doc_id = f"DOC{str(uuid.uuid4())[:8]}"
-                        cursor = self.db.cursor()
-                        cursor.execute('''
-                            INSERT INTO documents 
-                            (doc_id, user_id, request_id, document_type, document_name, 
-                             file_path, file_size, uploaded_at)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            doc_id,
-                            user_id,
-                            request_id if request_id else None,
-                            doc_type,
-                            uploaded_file.name,
-                            file_path,
-                            len(uploaded_file.getbuffer()),
-                            datetime.now()
-                        ))
+                    # Hash and stage every file first; identical content is stored once
+                    store = get_resource('document_store')
+                    staged_files = []
+                    try:
+                        for uploaded_file in uploaded_files:
+                            staged_files.append((uploaded_file.name, store.stage(uploaded_file)))
+                    except UploadTooLarge as e:
+                        for file_name, staged in staged_files:
+                            store.discard(staged)
+                        st.error(f"❌ {uploaded_file.name}: {e}")
+                        return
+                    
+                    # All document rows and the notification commit together
+                    with UnitOfWork(self.db) as uow:
+                        for file_name, staged in staged_files:
+                            store.add_document(uow, {
+                                'user_id': user_id,
+                                'request_id': request_id if request_id else None,
+                                'document_type': doc_type,
+                                'document_name': file_name
+                            }, staged)
                         
-                        st.success(f"✅ Uploaded: {uploaded_file.name}")
+                        # Add notification
+                        uow.add_notification({
+                            'user_id': user_id,
+                            'notification_type': 'document_uploaded',
+                            'title': 'Documents Uploaded',
+                            'message': f'{len(uploaded_files)} document(s) uploaded successfully'
+                        })
                     
-                    self.db.commit()
+                    self.queue_previews(store, staged_files)
                     
-                    # Add notification
-                    self.add_notification(user_id, 'document_uploaded', 'Documents Uploaded', 
-                                         f'{len(uploaded_files)} document(s) uploaded successfully')
+                    for uploaded_file in uploaded_files:
+                        st.success(f"✅ Uploaded: {uploaded_file.name}")
                 else:
                     st.error("Please select files to upload")
         
         # Document list
         st.subheader("Your Documents")
         
-        cursor = self.db.cursor()
-        cursor.execute('''
-            SELECT doc_id, document_type, document_name, file_path, uploaded_at, 
-                   verified, request_id
-            FROM documents 
-            WHERE user_id=?
-            ORDER BY uploaded_at DESC
-        ''', (user_id,))
-        documents = cursor.fetchall()
+        doc_search = st.text_input("Search documents", placeholder="Document ID, type or file name...")
+        columns = '''doc_id, document_type, document_name, file_path, uploaded_at,
+                     verified, request_id'''
+        page_key = "document_pages"
+        fetch_page = lambda after: get_user_documents_page(self.db, user_id, after, columns=columns)
+        if doc_search:
+            documents = search_documents(self.db, doc_search, user_id=user_id, columns=columns)
+            next_cursor = None
+        else:
+            documents, next_cursor = self.get_paged_rows(page_key, fetch_page)
         
         if documents:
             # Filter options
@@ -1755,7 +1705,7 @@ class LiveSuvidha:
             elif verification_filter == "Not Verified":
                 filtered_docs = [d for d in filtered_docs if not d[5]]
             
-            st.write(f"Showing {len(filtered_docs)} of {len(documents)} documents")
+            st.write(f"Showing {len(filtered_docs)} of {len(documents)} loaded documents")
             
             for doc in filtered_docs:
                 with st.expander(f"{doc[1]} - {doc[2]}"):
@@ -1771,34 +1721,43 @@ class LiveSuvidha:
                         st.write(f"**Verified:** {'✅ Yes' if doc[5] else '❌ No'}")
                         st.write(f"**Size:** {doc[3]}")
                     with col3:
+                        thumbnail = existing_rendition(doc[3], THUMBNAIL)
+                        if thumbnail:
+                            st.image(thumbnail)
+                        
                         if st.button("View", key=f"view_{doc[0]}"):
-                            # Show file preview
-                            try:
-                                if doc[2].lower().endswith(('.png', '.jpg', '.jpeg')):
-                                    image = Image.open(doc[3])
-                                    st.image(image, caption=doc[2], use_column_width=True)
-                                elif doc[2].lower().endswith('.pdf'):
-                                    st.info(f"PDF Document: {doc[2]}")
-                                    with open(doc[3], "rb") as f:
-                                        st.download_button(
-                                            "Download PDF",
-                                            f.read(),
-                                            file_name=doc[2],
-                                            mime="application/pdf"
-                                        )
-                            except Exception as e:
-                                st.error(f"Could not preview file: {e}")
+                            # Show the preview rendition, never the original
+                            preview = existing_rendition(doc[3], PREVIEW)
+                            if preview:
+                                st.image(preview, caption=doc[2], use_column_width=True)
+                            else:
+                                st.info("No preview available for this file")
+                        
+                        # The original is only read from disk when clicked, like exports
+                        if os.path.exists(doc[3]):
+                            self.offer_file("Download", doc[3], doc[2],
+                                            self.document_mime_type(doc[2]),
+                                            key=f"download_{doc[0]}")
+                        else:
+                            st.caption("File no longer available")
                         
                         if st.button("Delete", key=f"del_{doc[0]}", type="secondary"):
                             # Delete document
                             try:
-                                os.remove(doc[3])
-                                cursor.execute("DELETE FROM documents WHERE doc_id=?", (doc[0],))
-                                self.db.commit()
+                                with UnitOfWork(self.db) as uow:
+                                    loose_file = uow.remove_document(doc[0])
+                                # Blobs are deleted by the garbage collection job
+                                if loose_file and os.path.exists(loose_file):
+                                    os.remove(loose_file)
+                                st.session_state.pop(page_key, None)
                                 st.success(f"Deleted: {doc[2]}")
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"Error deleting: {e}")
+            
+            self.show_load_more(page_key, fetch_page, next_cursor)
+        elif doc_search:
+            st.info(f"No documents match '{doc_search}'")
         else:
             st.info("No documents uploaded yet")
     
@@ -1809,13 +1768,10 @@ class LiveSuvidha:
         user_id = self.get_user_id()
         
         cursor = self.db.cursor()
-        cursor.execute('''
-            SELECT id, title, message, created_at, is_read 
-            FROM notifications 
-            WHERE user_id=?
-            ORDER BY created_at DESC
-        ''', (user_id,))
-        notifications = cursor.fetchall()
+        page_key = "notification_pages"
+        fetch_page = lambda after: get_user_notifications_page(
+            self.db, user_id, after, columns='id, title, message, created_at, is_read')
+        notifications, next_cursor = self.get_paged_rows(page_key, fetch_page)
         
         if notifications:
             # Mark all as read button
@@ -1824,11 +1780,15 @@ class LiveSuvidha:
                     UPDATE notifications SET is_read=TRUE WHERE user_id=?
                 ''', (user_id,))
                 self.db.commit()
+                st.session_state.pop(page_key, None)
                 st.success("All notifications marked as read!")
                 st.rerun()
             
             # Unread count
-            unread_count = len([n for n in notifications if not n[4]])
+            cursor.execute('''
+                SELECT COUNT(*) FROM notifications WHERE user_id=? AND is_read=FALSE
+            ''', (user_id,))
+            unread_count = cursor.fetchone()[0]
             st.subheader(f"You have {unread_count} unread notification(s)")
             
             # Display notifications
@@ -1846,7 +1806,10 @@ class LiveSuvidha:
                                 UPDATE notifications SET is_read=TRUE WHERE id=?
                             ''', (notif[0],))
                             self.db.commit()
+                            st.session_state.pop(page_key, None)
                             st.rerun()
+            
+            self.show_load_more(page_key, fetch_page, next_cursor)
         else:
             st.info("No notifications")
     
@@ -1930,8 +1893,10 @@ class LiveSuvidha:
             
             col1, col2 = st.columns(2)
             with col1:
+                export_format = st.selectbox("Export format", [NDJSON, CSV],
+                                             format_func=lambda fmt: {NDJSON: "JSON lines", CSV: "CSV (zip)"}[fmt])
                 if st.button("Export My Data", type="secondary"):
-                    self.export_user_data(user_id)
+                    self.export_user_data(user_id, export_format)
             
             with col2:
                 if st.button("Delete Account", type="secondary"):
@@ -2027,7 +1992,7 @@ class LiveSuvidha:
             if st.form_submit_button("Report Emergency", type="primary"):
                 if location and description:
                     # Save emergency report to database
-                    emergency_id = f"EMG{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                    emergency_id = new_id('EMG')
                     
                     # In a real application, this would:
                     # 1. Save to emergency_reports table
@@ -2063,22 +2028,15 @@ class LiveSuvidha:
         cursor.execute("SELECT COUNT(*) FROM users WHERE is_active=TRUE")
         total_users = cursor.fetchone()[0]
         
-        # Total requests
-        cursor.execute("SELECT COUNT(*) FROM service_requests")
-        total_requests = cursor.fetchone()[0]
-        
-        # Pending requests
-        cursor.execute("SELECT COUNT(*) FROM service_requests WHERE status='Pending'")
-        pending_requests = cursor.fetchone()[0]
-        
-        # Total payments
-        cursor.execute("SELECT SUM(amount) FROM payments WHERE status='Completed'")
-        total_payments_result = cursor.fetchone()[0]
-        total_payments = total_payments_result if total_payments_result else 0
+        # Request and payment totals from the daily rollups (one row per day)
+        summary = summarize_rollups(self.db)
+        total_requests = summary['total_requests']
+        pending_requests = summary['pending_requests']
+        total_payments = summary['payment_amount']
         
         # Active today
-        cursor.execute("SELECT COUNT(DISTINCT user_id) FROM service_requests WHERE DATE(created_at)=DATE('now')")
-        active_today = cursor.fetchone()[0]
+        today = get_daily_rollups(self.db, datetime.now().date(), datetime.now().date())
+        active_today = today[0]['active_users'] if today else 0
         
         # Display metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -2100,7 +2058,7 @@ class LiveSuvidha:
             {"icon": "💰", "label": "Payment Management", "page": "payments_admin"},
             {"icon": "📊", "label": "Analytics", "page": "analytics"},
             {"icon": "⚙️", "label": "System Settings", "page": "system_settings"},
-            {"icon": "📈", "label": "Generate Reports", "action": self.generate_reports}
+            {"icon": "📈", "label": "Generate Reports", "page": "reports"}
         ]
         
         cols = st.columns(3)
@@ -2148,28 +2106,144 @@ class LiveSuvidha:
         # System health
         st.subheader("🖥️ System Health")
         
+        # Sizes come from the storage counters; the reconcile_storage job
+        # keeps them honest and refreshes the database size
+        usage = get_storage_usage(self.db)
+        uploads = usage.get(UPLOADS_AREA, {})
+        database = usage.get(DATABASE_AREA, {})
+        
         col1, col2, col3 = st.columns(3)
         with col1:
-            # Database size
-            import os
-            db_size = os.path.getsize('suvidha_live.db') / (1024 * 1024)  # MB
-            st.metric("Database Size", f"{db_size:.2f} MB")
+            if database:
+                db_size = database['byte_count'] / (1024 * 1024)  # MB
+                st.metric("Database Size", f"{db_size:.2f} MB", help=f"As of {database['reconciled_at']}")
+            else:
+                st.metric("Database Size", "Calculating…")
         
         with col2:
-            # Uploads folder size
-            uploads_size = 0
-            for path, dirs, files in os.walk("uploads"):
-                for f in files:
-                    fp = os.path.join(path, f)
-                    uploads_size += os.path.getsize(fp)
-            uploads_size_mb = uploads_size / (1024 * 1024)
-            st.metric("Storage Used", f"{uploads_size_mb:.2f} MB")
+            if uploads:
+                uploads_size_mb = uploads['byte_count'] / (1024 * 1024)
+                st.metric("Storage Used", f"{uploads_size_mb:.2f} MB",
+                          help=f"{uploads['file_count']} file(s); "
+                               f"reconciled {uploads['reconciled_at'] or 'not yet'}")
+            else:
+                st.metric("Storage Used", "Calculating…")
         
         with col3:
             # Active sessions (simplified)
-            cursor.execute("SELECT COUNT(*) FROM users WHERE last_login > datetime('now', '-1 hour')")
-            active_sessions = cursor.fetchone()[0]
+            active_sessions = count_active_users(self.db, datetime.now() - timedelta(hours=1))
             st.metric("Active Sessions", active_sessions)
+        
+        if st.button("🔄 Reconcile Storage"):
+            run = self.scheduler.run_now('reconcile_storage')
+            if run is None:
+                st.info("Storage reconciliation is already running")
+            elif run['status'] == 'failed':
+                st.error(f"Storage reconciliation failed: {run['error']}")
+            else:
+                result = run['result']
+                st.success(f"Counted {result['files']} file(s); counters were off by "
+                           f"{result['drift_files']} file(s), {result['drift_bytes']:,} byte(s)")
+        
+        self.show_resource_health()
+        self.show_scheduled_jobs()
+        self.show_query_stats()
+    
+    def show_resource_health(self):
+        """Status of the process-wide resources shared by all sessions"""
+        with st.expander("🧩 Shared Resources"):
+            report = registry.check_health()
+            rows = []
+            for name, status in report.items():
+                if not status['built']:
+                    state = "Not built"
+                elif status['healthy'] is False:
+                    state = "❌ Unhealthy"
+                else:
+                    state = "✅ OK"
+                rows.append({
+                    'Resource': name,
+                    'Status': state,
+                    'Build Time (ms)': round(status['build_seconds'] * 1000, 1) if status['build_seconds'] is not None else None,
+                    'Built At': datetime.fromtimestamp(status['built_at']).strftime('%Y-%m-%d %H:%M:%S') if status['built_at'] else None,
+                    'Last Error': status['last_error']
+                })
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            
+            if st.button("♻️ Rebuild SMS Client", help="Pick up changed Twilio settings"):
+                registry.release('sms')
+                st.rerun()
+    
+    def show_scheduled_jobs(self):
+        """Maintenance job schedule, recent runs and a manual trigger"""
+        with st.expander("⏰ Scheduled Jobs"):
+            if self.scheduler.last_error:
+                st.warning(f"Scheduler error: {self.scheduler.last_error}")
+            st.dataframe(pd.DataFrame(self.scheduler.job_status()),
+                         use_container_width=True, hide_index=True)
+            
+            runs = self.scheduler.recent_runs(limit=20)
+            if runs:
+                st.markdown("**Recent runs**")
+                df = pd.DataFrame(runs)
+                st.dataframe(df[['job_name', 'triggered_by', 'status', 'started_at', 'duration_ms',
+                                 'result', 'error', 'owner']],
+                             use_container_width=True, hide_index=True)
+            
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                job_name = st.selectbox("Job", list(self.scheduler.jobs), label_visibility="collapsed")
+            with col2:
+                if st.button("▶️ Run Now"):
+                    run = self.scheduler.run_now(job_name)
+                    if run is None:
+                        st.info(f"{job_name} is already running on another worker")
+                    elif run['status'] == 'failed':
+                        st.error(f"{job_name} failed: {run['error']}")
+                    else:
+                        st.success(f"{job_name} finished in {run['duration_ms']:.0f} ms")
+    
+    def show_query_stats(self):
+        """Per-statement latency stats recorded by query_stats"""
+        with st.expander("🔍 Query Statistics"):
+            recording = st.checkbox("Record query statistics", value=query_stats.is_enabled(),
+                                    key="query_stats_enabled")
+            if recording and not query_stats.is_enabled():
+                query_stats.enable()
+            elif not recording and query_stats.is_enabled():
+                query_stats.disable()
+            
+            stats = query_stats.snapshot()
+            if stats is None:
+                st.info("Query statistics are off. Enable them here or start the app with SUVIDHA_QUERY_STATS=1.")
+                return
+            
+            st.caption(f"Recording since {stats['started_at']} · slow query threshold {stats['slow_query_ms']:.0f} ms")
+            if stats['statements']:
+                df = pd.DataFrame(stats['statements'])
+                st.dataframe(df[['caller', 'sql', 'count', 'errors', 'total_ms', 'avg_ms',
+                                 'p50_ms', 'p95_ms', 'max_ms']].head(50),
+                             use_container_width=True, hide_index=True)
+            else:
+                st.info("No statements recorded yet")
+            
+            if stats['slow_queries']:
+                st.markdown("**Slow queries**")
+                for entry in reversed(stats['slow_queries'][-10:]):
+                    st.markdown(f"`{entry['at']}` · {entry['elapsed_ms']:.1f} ms · {entry['caller']}")
+                    st.code(entry['sql'] + '\n-- ' + '\n-- '.join(entry['plan']), language='sql')
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.download_button("📥 Download JSON", json.dumps(stats, indent=2),
+                                   file_name="query_stats.json", mime="application/json")
+            with col2:
+                if st.button("💾 Write Dump File"):
+                    st.success(f"Saved to {query_stats.dump()}")
+            with col3:
+                if st.button("🔄 Reset Statistics"):
+                    query_stats.recorder.reset()
+                    st.rerun()
     
     def validate_input(self, aadhaar, phone, name):
         """Validate user input"""
@@ -2188,9 +2262,9 @@ class LiveSuvidha:
         """Add notification to database"""
         cursor = self.db.cursor()
         cursor.execute('''
-            INSERT INTO notifications (user_id, notification_type, title, message)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, notif_type, title, message))
+            INSERT INTO notifications (user_id, notification_type, title, message, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, notif_type, title, message, datetime.now()))
         self.db.commit()
     
     def add_comment_to_request(self, request_id):
@@ -2201,9 +2275,9 @@ class LiveSuvidha:
                 cursor = self.db.cursor()
                 cursor.execute('''
                     INSERT INTO request_status_history 
-                    (request_id, status, comments, updated_by)
-                    VALUES (?, ?, ?, ?)
-                ''', (request_id, 'Comment Added', comment, st.session_state.user['name']))
+                    (request_id, status, comments, updated_by, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (request_id, 'Comment Added', comment, st.session_state.user['name'], datetime.now()))
                 self.db.commit()
                 st.success("Comment added!")
     
@@ -2224,45 +2298,82 @@ class LiveSuvidha:
             self.db.commit()
             st.success("Thank you for your feedback!")
     
-    def export_user_data(self, user_id):
-        """Export user data"""
-        cursor = self.db.cursor()
-        
-        # Get user data
-        cursor.execute("SELECT * FROM users WHERE id=?", (user_id,))
-        user_data = cursor.fetchone()
+    def export_user_data(self, user_id, export_format=NDJSON):
+        """Export everything stored about the user"""
+        with st.spinner("Preparing your data..."):
+            export = write_export(self.db, user_export_sections(self.db, user_id), export_format,
+                                  name='suvidha_data_export')
+        # Keep one export per session; the purge_exports job removes abandoned ones
+        previous = st.session_state.get('user_export')
+        if previous is not None:
+            previous.remove()
+        st.session_state.user_export = export
+        self.offer_export(export, "📥 Download Data")
+    
+    def offer_export(self, export, label):
+        """Download button for a finished export"""
+        self.offer_file(label, export.path, export.file_name, export.mime)
+    
+    def offer_file(self, label, path, file_name, mime=None, **kwargs):
+        """Download button for a file on disk, read only when it is clicked"""
+        def read_file():
+            with open(path, "rb") as f:
+                return f.read()
+        
+        st.download_button(label, read_file, file_name=file_name, mime=mime,
+                           on_click="ignore", **kwargs)
+    
+    def generate_reports(self):
+        """Reports computed in the background from a database snapshot"""
+        st.title("📈 Reports")
+        engine = get_resource('reports')
         
-        # Get service requests
-        cursor.execute("SELECT * FROM service_requests WHERE user_id=?", (user_id,))
-        requests = cursor.fetchall()
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            report_name = st.selectbox("Report", list(REPORTS), format_func=lambda name: REPORTS[name].title)
+        with col2:
+            start_date = st.date_input("From Date", datetime.now() - timedelta(days=30), key="report_start")
+        with col3:
+            end_date = st.date_input("To Date", datetime.now(), key="report_end")
+        st.caption(REPORTS[report_name].description)
         
-        # Get payments
-        cursor.execute("SELECT * FROM payments WHERE user_id=?", (user_id,))
-        payments = cursor.fetchall()
+        if start_date > end_date:
+            st.error("From Date must be on or before To Date")
+            return
         
-        # Create export data
-        export_data = {
-            'user_profile': user_data,
-            'service_requests': requests,
-            'payments': payments,
-            'exported_at': datetime.now().isoformat()
-        }
+        params = {'start_date': start_date, 'end_date': end_date}
+        job = engine.job(st.session_state.get('report_job'))
+        if job is not None and not job.finished:
+            # Poll until the worker is done; the page stays responsive meanwhile
+            st.progress(job.progress, text=f"{job.report.title}: {job.message}")
+            time.sleep(0.5)
+            st.rerun()
+        if job is not None and job.status == 'failed':
+            st.error(f"Report failed: {job.error}")
+        
+        # The run this session started, even if the data moved on while it ran
+        result = engine.result(st.session_state.get('report_job'), report_name, params)
+        if result is None or not engine.is_current(result):
+            if result is not None:
+                st.info("The data has changed since this report was generated")
+            if st.button("Generate Report", type="primary"):
+                st.session_state.report_job = engine.submit(report_name, params).id
+                st.rerun()
+            if result is None:
+                return
         
-        # Convert to JSON
-        json_data = json.dumps(export_data, indent=2, default=str)
+        st.caption(f"Generated {result.generated_at.strftime('%Y-%m-%d %H:%M:%S')} from "
+                   f"{result.rows_read:,} rows in {result.seconds:.2f}s")
+        st.dataframe(result.frame, use_container_width=True, hide_index=True)
         
-        # Download button
-        st.download_button(
-            "📥 Download Data",
-            json_data,
-            file_name=f"suvidha_data_export_{datetime.now().strftime('%Y%m%d')}.json",
-            mime="application/json"
-        )
-    
-    def generate_reports(self):
-        """Generate system reports"""
-        st.info("Report generation feature")
-        # Implement report generation logic
+        file_name = f"suvidha_{report_name}_{start_date}_{end_date}"
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("📥 Download CSV", result.to_csv(), file_name=f"{file_name}.csv",
+                               mime="text/csv")
+        with col2:
+            st.download_button("📥 Download HTML", result.to_html(), file_name=f"{file_name}.html",
+                               mime="text/html")
     
     def show_department_info(self):
         """Show department information"""
@@ -2295,15 +2406,302 @@ class LiveSuvidha:
         st.info("User management feature")
     
     def show_all_requests(self):
-        """Show all requests"""
+        """Admin grid over every request; a search term switches to full-text search"""
         st.title("📋 All Service Requests")
-        st.info("All requests view feature")
+        
+        search_term = st.text_input("Search all requests",
+                                    placeholder="Request ID, department, description, address...")
+        if search_term:
+            self.show_request_search(search_term)
+        else:
+            self.show_request_grid()
+    
+    def show_request_search(self, search_term):
+        """Best full-text matches for search_term across all citizens"""
+        status_filter = st.selectbox("Status", ["All"] + REQUEST_STATUSES)
+        status = None if status_filter == "All" else status_filter
+        results = search_requests(self.db, search_term, status=status, limit=100, columns='''
+            request_id, user_id, department, service_type, status, priority, address, created_at''')
+        
+        if results:
+            df = pd.DataFrame(results, columns=['Request ID', 'User', 'Department', 'Service',
+                                                'Status', 'Priority', 'Address', 'Created'])
+            st.write(f"Top {len(results)} match(es), best first")
+            st.dataframe(df, use_container_width=True, hide_index=True)
+            self.show_request_histories([r[0] for r in results])
+        else:
+            st.info(f"No requests match '{search_term}'")
+    
+    def show_request_grid(self):
+        """Filtered, sorted request grid, one keyset page at a time"""
+        with st.expander("🔎 Filters", expanded=True):
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                departments = st.multiselect("Department", list(self.departments.keys()), key="grid_department")
+            with col2:
+                services = dict.fromkeys(service for department in (departments or self.departments)
+                                         for service in self.departments[department])
+                service_types = st.multiselect("Service", list(services), key="grid_service_type")
+            with col3:
+                statuses = st.multiselect("Status", REQUEST_STATUSES, default=OPEN_STATUSES, key="grid_status")
+            with col4:
+                priorities = st.multiselect("Priority", REQUEST_PRIORITIES, key="grid_priority")
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                pincode = st.text_input("Pincode", key="grid_pincode").strip()
+            with col2:
+                start_date = st.date_input("From Date (Optional)", value=None, key="grid_start_date")
+            with col3:
+                end_date = st.date_input("To Date (Optional)", value=None, key="grid_end_date")
+            with col4:
+                sort = st.selectbox("Sort", list(GRID_SORTS), format_func=lambda name: GRID_SORTS[name][0],
+                                    key="grid_sort")
+        
+        if start_date and end_date and start_date > end_date:
+            st.error("From Date must be on or before To Date")
+            return
+        filters = {'department': departments, 'service_type': service_types, 'status': statuses,
+                   'priority': priorities, 'pincode': [pincode] if pincode else []}
+        
+        # Cursors of the pages visited so far; any filter change starts over
+        grid_key = repr((filters, start_date, end_date, sort))
+        paging = st.session_state.get('request_grid')
+        if not paging or paging['key'] != grid_key:
+            paging = st.session_state.request_grid = {'key': grid_key, 'cursors': [None]}
+        
+        started = time.perf_counter()
+        rows, next_cursor = fetch_grid_page(self.db, filters, start_date, end_date, sort,
+                                            paging['cursors'][-1], DEFAULT_GRID_PAGE_SIZE)
+        total, exact = count_grid_rows(self.db, filters, start_date, end_date)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        if not rows:
+            st.info("No requests match these filters")
+            self.show_bulk_transition(filters, start_date, end_date, total, exact)
+            return
+        
+        page_number = len(paging['cursors'])
+        first_row = (page_number - 1) * DEFAULT_GRID_PAGE_SIZE + 1
+        st.caption(f"Rows {first_row:,}–{first_row + len(rows) - 1:,} of {total:,}{'' if exact else '+'}"
+                   f" · page {page_number} · {elapsed_ms:.0f} ms")
+        df = pd.DataFrame(rows, columns=['Request ID', 'User', 'Department', 'Service', 'Status',
+                                         'Priority', 'Pincode', 'Assigned To', 'Created', 'Updated'])
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        
+        col1, col2, col3 = st.columns([1, 1, 4])
+        with col1:
+            if page_number > 1 and st.button("← Previous", key="grid_previous"):
+                paging['cursors'].pop()
+                st.rerun()
+        with col2:
+            if next_cursor is not None and st.button("Next →", key="grid_next"):
+                paging['cursors'].append(next_cursor)
+                st.rerun()
+        
+        self.show_request_histories([r[0] for r in rows])
+        self.show_bulk_transition(filters, start_date, end_date, total, exact)
+    
+    def show_bulk_transition(self, filters, start_date, end_date, total, exact):
+        """Move every request matching the grid's filters, or a list of IDs, to another status"""
+        with st.expander("🔁 Bulk Status Change"):
+            scope = st.radio("Change", ["All requests matching the filters", "These request IDs"],
+                             horizontal=True, key="bulk_scope")
+            by_filter = scope == "All requests matching the filters"
+            if by_filter:
+                st.caption(f"{total:,}{'' if exact else '+'} requests match the filters above")
+            else:
+                id_text = st.text_area("Request IDs", key="bulk_ids",
+                                       help="One per line, or separated by commas or spaces")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                new_status = st.selectbox("New Status", REQUEST_STATUSES, index=2, key="bulk_status")
+            with col2:
+                comments = st.text_input("Comment", placeholder="Shown to citizens, e.g. Outage fixed",
+                                         key="bulk_comments")
+            notify = st.checkbox("Notify citizens", value=True, key="bulk_notify")
+            allowed_from = [status for status, targets in ALLOWED_TRANSITIONS.items() if new_status in targets]
+            st.caption(f"Only requests that are {' or '.join(allowed_from) or 'nowhere'} can move to {new_status}")
+            
+            if not st.button("Apply Status Change", type="primary", key="bulk_apply"):
+                return
+            if by_filter:
+                request_ids = iter_matching_request_ids(self.db, filters, start_date, end_date,
+                                                        batch_size=LOOKUP_BATCH_SIZE)
+            else:
+                request_ids = id_text.replace(',', ' ').split()
+                total = len(set(request_ids))
+                if not request_ids:
+                    st.error("Enter at least one request ID")
+                    return
+            
+            progress_bar = st.progress(0.0)
+            
+            def progress(rows, updated):
+                progress_bar.progress(min(rows / max(total, 1), 1.0),
+                                      text=f"{rows:,} checked, {updated:,} updated")
+            
+            result = transition_requests(self.db, request_ids, new_status, comments,
+                                         st.session_state.user['name'], notify, progress=progress)
+            progress_bar.progress(1.0, text=f"{result['rows']:,} checked, {result['updated']:,} updated")
+            # The grid's pages no longer match the filters
+            st.session_state.pop('request_grid', None)
+            
+            st.success(f"✅ Moved {result['updated']:,} of {result['rows']:,} requests to {new_status} "
+                       f"in {result['seconds']:.1f}s ({result['rows_per_second']:,.0f} requests/s)")
+            if result['failures']:
+                by_reason, sample = summarize_failures(result['failures'])
+                st.warning(f"{len(result['failures']):,} requests were not changed")
+                st.dataframe(pd.DataFrame(by_reason, columns=['Reason', 'Requests']),
+                             use_container_width=True, hide_index=True)
+                with st.expander(f"First {len(sample):,} unchanged requests"):
+                    st.dataframe(pd.DataFrame(sample, columns=['Request ID', 'Reason']),
+                                 use_container_width=True, hide_index=True)
+    
+    def show_request_histories(self, request_ids):
+        """Status histories of the requests the admin picks, in one query"""
+        history_ids = st.multiselect("Show status history for", request_ids)
+        if history_ids:
+            histories = get_requests_history(self.db, history_ids)
+            for request_id in history_ids:
+                st.markdown(f"**{request_id}**")
+                self.show_status_history(histories[request_id])
     
     def show_system_settings(self):
         """Show system settings"""
         st.title("⚙️ System Settings")
         st.info("System settings feature")
     
+    def show_data_export(self):
+        """Admin export of service requests with their history, payments and documents"""
+        st.title("📤 Data Export")
+        
+        with st.form("data_export_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                department = st.selectbox("Department", ["All"] + list(self.departments.keys()))
+                export_format = st.selectbox("Format", [NDJSON, CSV],
+                                             format_func=lambda fmt: {NDJSON: "JSON lines", CSV: "CSV"}[fmt])
+                compress = st.checkbox("Zip the export", value=True,
+                                       help="CSV exports are always zipped, one file per table")
+            with col2:
+                start_date = st.date_input("From Date (Optional)", value=None)
+                end_date = st.date_input("To Date (Optional)", value=None)
+            submitted = st.form_submit_button("Prepare Export", type="primary")
+        
+        runner = get_resource('exports')
+        if submitted:
+            if start_date and end_date and start_date > end_date:
+                st.error("From Date must be on or before To Date")
+                return
+            sections = request_export_sections(self.db, None if department == "All" else department,
+                                               start_date, end_date)
+            st.session_state.export_job = runner.submit(sections, export_format, compress,
+                                                        name='suvidha_requests').id
+        
+        job = runner.job(st.session_state.get('export_job'))
+        if job is None:
+            st.info("Exports are written in the background to a temporary file, so any date range is safe")
+            return
+        if not job.finished:
+            # Poll until the worker is done, like the reports page
+            st.info(f"⏳ Exporting... {job.elapsed:.0f}s")
+            time.sleep(0.5)
+            st.rerun()
+        if job.status == 'failed':
+            st.error(f"Export failed: {job.error}")
+            return
+        
+        export = job.export
+        if not os.path.exists(export.path):
+            st.warning("This export has expired; prepare it again")
+            return
+        st.success(f"✅ Exported {sum(export.rows.values()):,} rows "
+                   f"({export.size / (1024 * 1024):.1f} MB) in {job.seconds:.1f}s")
+        st.dataframe(pd.DataFrame(list(export.rows.items()), columns=['Table', 'Rows']),
+                     use_container_width=True, hide_index=True)
+        self.offer_export(export, "📥 Download Export")
+    
+    def show_field_staff(self):
+        """Field staff roster, load and availability, and the auto-assignment queues"""
+        st.title("👷 Field Staff")
+        engine = self.assignments
+        
+        with st.expander("➕ Add Staff Member"):
+            with st.form("field_staff_form"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    name = st.text_input("Name")
+                    phone = st.text_input("Phone", max_chars=10)
+                    capacity = st.number_input("Max Open Requests", min_value=1, max_value=500,
+                                               value=DEFAULT_MAX_OPEN_REQUESTS)
+                with col2:
+                    department = st.selectbox("Department", list(self.departments.keys()))
+                    zone = st.selectbox("Zone", ["All zones"] + ZONES)
+                if st.form_submit_button("Add Staff Member", type="primary"):
+                    if name:
+                        staff_id = add_field_staff(self.db, {
+                            'name': name,
+                            'phone': phone,
+                            'department': department,
+                            'zone': None if zone == "All zones" else zone,
+                            'max_open_requests': capacity
+                        })
+                        engine.submit()
+                        st.success(f"✅ Added {name} ({staff_id})")
+                    else:
+                        st.error("Please enter a name")
+        
+        staff = get_field_staff(self.db)
+        if not staff:
+            st.info("No field staff yet; new requests stay unassigned until some are added")
+        else:
+            df = pd.DataFrame(staff, columns=['Staff ID', 'Name', 'Phone', 'Department', 'Zone',
+                                              'Online', 'Open Requests', 'Max Open'])
+            df['Zone'] = df['Zone'].fillna("All zones")
+            df['Online'] = df['Online'].astype(bool)
+            st.dataframe(df, use_container_width=True, hide_index=True)
+            
+            # Going offline hands their Pending requests to the rest
+            names = {row[0]: f"{row[1]} · {row[3]} · {row[4] or 'All zones'}" for row in staff}
+            online = {row[0]: bool(row[5]) for row in staff}
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                staff_id = st.selectbox("Staff member", list(names), format_func=names.get,
+                                        label_visibility="collapsed", key="field_staff_member")
+            with col2:
+                if online[staff_id]:
+                    if st.button("⏸️ Take Offline", key="field_staff_toggle"):
+                        released = set_staff_online(self.db, staff_id, False,
+                                                    st.session_state.user['name'])
+                        engine.rebalance()
+                        st.success(f"{names[staff_id]} is offline; {released} request(s) returned "
+                                   f"to the queue")
+                elif st.button("▶️ Bring Online", key="field_staff_toggle"):
+                    set_staff_online(self.db, staff_id, True)
+                    engine.rebalance()
+                    st.success(f"{names[staff_id]} is online")
+        
+        st.subheader("Assignment Queue")
+        if engine.last_error:
+            st.warning(f"Auto-assignment error: {engine.last_error}")
+        if engine.last_run:
+            run = engine.last_run
+            st.caption(f"Last run {run['at']:%H:%M:%S}: {run['assigned']} assigned, "
+                       f"{run['queued']} waiting, {run['staff_online']} staff online, "
+                       f"{run['ms']:.0f} ms")
+        queues = engine.queue_sizes()
+        if queues:
+            df = pd.DataFrame(queues, columns=['Department', 'Zone', 'Waiting', 'Emergencies'])
+            df['Zone'] = df['Zone'].fillna("No zone")
+            st.dataframe(df, use_container_width=True, hide_index=True)
+        else:
+            st.info("No unassigned Pending requests")
+        if st.button("▶️ Assign Now", key="field_staff_assign"):
+            run = engine.run_once()
+            st.success(f"Assigned {run['assigned']} request(s) in {run['ms']:.0f} ms")
+    
     def show_payments_admin(self):
         """Admin payments view"""
         st.title("💰 Payment Administration")
@@ -2312,7 +2710,22 @@ class LiveSuvidha:
     def show_documents_admin(self):
         """Admin documents view"""
         st.title("📄 Document Administration")
-        st.info("Admin documents feature")
+        
+        search_term = st.text_input("Search all documents", placeholder="Document ID, type or file name...")
+        if not search_term:
+            st.info("Enter a search term to find documents across all citizens")
+            return
+        
+        results = search_documents(self.db, search_term, limit=100, columns='''
+            doc_id, user_id, document_type, document_name, request_id, verified, uploaded_at''')
+        
+        if results:
+            df = pd.DataFrame(results, columns=['Document ID', 'User', 'Type', 'File Name',
+                                                'Request', 'Verified', 'Uploaded'])
+            st.write(f"Top {len(results)} match(es), best first")
+            st.dataframe(df, use_container_width=True, hide_index=True)
+        else:
+            st.info(f"No documents match '{search_term}'")
 
 # Run the app
 if __name__ == "__main__":
@@ -4,7 +4,6 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
-import sqlite3
 import qrcode
 from PIL import Image
 import io
@@ -15,16 +14,21 @@ from pathlib import Path
 from translations import TranslationSystem, t
 from voice_assistant import VoiceAssistant
 from webcam_capture import SimpleWebcam
+from connection_manager import ConnectionManager
+from resources import get_resource, check_connection
 
-# Initialize translation system
-translator = TranslationSystem()
+# Shared translation system, built once per process
+translator = get_resource('translator', TranslationSystem)
 
 class IntegratedSuvidha:
     def __init__(self):
-        self.db = self.init_database()
+        # Built once per process and shared by every rerun and session; the
+        # ConnectionManager gives each session thread its own connection
+        self.db = get_resource('integrated_db', self.init_database, check_connection,
+                               teardown=lambda conn: conn.close())
         self.create_upload_folder()
-        self.voice_assistant = VoiceAssistant()
-        self.webcam = SimpleWebcam()
+        self.voice_assistant = get_resource('voice_assistant', VoiceAssistant)
+        self.webcam = get_resource('webcam', SimpleWebcam)
         
         # Set default language
         if 'language' not in st.session_state:
@@ -100,7 +104,7 @@ class IntegratedSuvidha:
     
     def init_database(self):
         """Initialize database with multilingual support"""
-        conn = sqlite3.connect('suvidha_integrated.db', check_same_thread=False)
+        conn = ConnectionManager('suvidha_integrated.db')
         cursor = conn.cursor()
         
         # Add language column to users table
@@ -190,11 +194,10 @@ class IntegratedSuvidha:
                 st.session_state.language = selected_lang
                 # Update user's language preference in database
                 if st.session_state.get('user_id'):
-                    cursor = self.db.cursor()
-                    cursor.execute('''
-                        UPDATE users SET language=? WHERE user_id=?
-                    ''', (selected_lang, st.session_state.user_id))
-                    self.db.commit()
+                    with self.db.transaction() as tx:
+                        tx.execute('''
+                            UPDATE users SET language=? WHERE user_id=?
+                        ''', (selected_lang, st.session_state.user_id))
                 st.rerun()
     
     def show_login(self):
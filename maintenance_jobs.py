@@ -0,0 +1,128 @@
+# maintenance_jobs.py
+from datetime import datetime, timedelta
+from scheduler import Job, MINUTE, HOUR, DAY
+from rollups import rebuild_daily_rollups
+from storage import reconcile_storage, DEFAULT_UPLOADS_DIR
+from document_store import DocumentStore
+from previews import render_missing_previews
+from exports import purge_stale_exports
+
+# The jobs every app process schedules. Each takes the ConnectionManager and
+# returns a small dict that ends up in scheduler_runs.result. Deletes and
+# updates go in batches so no single transaction holds the write lock long.
+
+MAINTENANCE_BATCH_SIZE = 5000
+
+# Expired OTPs are kept this long so the login debug view can show them
+OTP_RETENTION = timedelta(hours=1)
+# update_rate_limit() forgets failed attempts after an hour
+RATE_LIMIT_WINDOW = timedelta(hours=1)
+# Days of rollups recomputed on each refresh
+ROLLUP_REFRESH_DAYS = 2
+
+
+def _delete_in_batches(conn, table, where, params, batch_size=MAINTENANCE_BATCH_SIZE):
+    """Delete rows matching where, batch_size rows per transaction; returns the count"""
+    deleted = 0
+    while True:
+        with conn.transaction() as tx:
+            cursor = tx.cursor()
+            cursor.execute(f'''
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM {table} WHERE {where} LIMIT ?
+                )
+            ''', list(params) + [batch_size])
+            deleted += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            return deleted
+
+
+def purge_expired_otps(conn):
+    """Delete expired OTPs and rate-limit rows that no longer block anyone"""
+    now = datetime.now()
+    otps = _delete_in_batches(conn, 'otp_verification', 'expires_at < ?', (now - OTP_RETENTION,))
+    rate_limits = _delete_in_batches(
+        conn, 'otp_rate_limit',
+        'last_attempt < ? AND (blocked_until IS NULL OR blocked_until < ?)',
+        (now - RATE_LIMIT_WINDOW, now))
+    return {'otps': otps, 'rate_limits': rate_limits}
+
+
+def mark_overdue_bills(conn, batch_size=MAINTENANCE_BATCH_SIZE):
+    """Move Pending bills past their due date to Overdue"""
+    today = datetime.now().date()
+    marked = 0
+    while True:
+        with conn.transaction() as tx:
+            cursor = tx.cursor()
+            cursor.execute('''
+                UPDATE payments SET status = 'Overdue'
+                WHERE id IN (
+                    SELECT id FROM payments
+                    WHERE status = 'Pending' AND due_date < ?
+                    LIMIT ?
+                )
+            ''', (today, batch_size))
+            marked += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            return {'marked_overdue': marked}
+
+
+def refresh_rollups(conn):
+    """Recompute the last few days of daily rollups from the base tables"""
+    # The triggers keep rollups current; this corrects the counters the
+    # triggers cannot (active users, rows written with triggers dropped)
+    end = datetime.now().date()
+    start = end - timedelta(days=ROLLUP_REFRESH_DAYS - 1)
+    rebuild_daily_rollups(conn, start, end)
+    return {'start': start, 'end': end}
+
+
+def reconcile_uploads(conn):
+    """Reset the storage counters from the uploads folder"""
+    return reconcile_storage(conn, DEFAULT_UPLOADS_DIR)
+
+
+def collect_blob_garbage(conn):
+    """Delete document blobs nothing refers to any more"""
+    return DocumentStore().collect_garbage(conn)
+
+
+def render_previews(conn):
+    """Render thumbnails for stored documents that have none yet"""
+    return render_missing_previews(conn, DocumentStore())
+
+
+def purge_exports(conn):
+    """Delete finished export files nobody downloaded in time"""
+    return {'removed': purge_stale_exports()}
+
+
+def optimize_database(conn):
+    """Let SQLite refresh statistics on tables whose indexes need it"""
+    # analysis_limit keeps any ANALYZE that optimize triggers cheap
+    conn.execute('PRAGMA analysis_limit=400')
+    rows = conn.execute('PRAGMA optimize').fetchall()
+    return {'statements': len(rows)}
+
+
+def analyze_database(conn):
+    """Refresh query planner statistics for every table"""
+    conn.execute('PRAGMA analysis_limit=1000')
+    conn.execute('ANALYZE')
+    return {'analyzed': True}
+
+
+def default_jobs():
+    return [
+        Job('purge_expired_otps', purge_expired_otps, every=15 * MINUTE),
+        Job('mark_overdue_bills', mark_overdue_bills, every=HOUR, offset=5 * MINUTE, run_on_start=True),
+        Job('refresh_rollups', refresh_rollups, every=HOUR, offset=10 * MINUTE),
+        Job('reconcile_storage', reconcile_uploads, every=15 * MINUTE, run_on_start=True),
+        Job('collect_blob_garbage', collect_blob_garbage, every=HOUR, offset=15 * MINUTE),
+        Job('render_previews', render_previews, every=HOUR, offset=25 * MINUTE),
+        Job('purge_exports', purge_exports, every=15 * MINUTE, offset=7 * MINUTE),
+        Job('optimize_database', optimize_database, every=6 * HOUR, offset=20 * MINUTE),
+        Job('analyze_database', analyze_database, every=7 * DAY, offset=3 * HOUR + 30 * MINUTE,
+            lease_seconds=2 * HOUR),
+    ]
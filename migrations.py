@@ -0,0 +1,1098 @@
+# migrations.py
+import os
+import re
+import json
+import sqlite3
+import uuid
+import threading
+from datetime import datetime
+from rollups import backfill_daily_rollups
+from user_stats import backfill_user_stats, OUTSTANDING_PAYMENT_STATUSES
+
+# Databases already migrated by this process (absolute path -> schema version)
+_migrated = {}
+_migrate_lock = threading.Lock()
+
+
+def _add_column_if_missing(cursor, table, column, declaration):
+    """Add a column to an existing table unless it is already there"""
+    # table_xinfo also lists generated columns
+    cursor.execute(f"PRAGMA table_xinfo({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+def migration_001_baseline(cursor):
+    """Baseline schema shared by LiveSuvidha and ComprehensiveDatabase"""
+    # 1. Users table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT UNIQUE,
+            aadhaar TEXT UNIQUE,
+            name TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            email TEXT,
+            address TEXT,
+            pincode TEXT,
+            language TEXT DEFAULT 'en',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP,
+            is_active BOOLEAN DEFAULT TRUE,
+            user_type TEXT DEFAULT 'citizen',
+            photo_path TEXT
+        )
+    ''')
+
+    # 2. OTP verification table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS otp_verification (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            aadhaar TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            otp TEXT NOT NULL,
+            attempt_count INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP DEFAULT (datetime('now', '+5 minutes')),
+            verified BOOLEAN DEFAULT FALSE,
+            message_sid TEXT
+        )
+    ''')
+
+    # 3. OTP rate limiting table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS otp_rate_limit (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            phone TEXT NOT NULL,
+            attempt_count INTEGER DEFAULT 0,
+            last_attempt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            blocked_until TIMESTAMP
+        )
+    ''')
+
+    # 4. Service requests table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS service_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_id TEXT UNIQUE,
+            user_id INTEGER,
+            department TEXT NOT NULL,
+            service_type TEXT NOT NULL,
+            description TEXT NOT NULL,
+            address TEXT,
+            pincode TEXT,
+            language TEXT DEFAULT 'en',
+            priority TEXT DEFAULT 'Medium',
+            status TEXT DEFAULT 'Pending',
+            assigned_to TEXT,
+            estimated_completion DATE,
+            actual_completion DATE,
+            feedback_rating INTEGER CHECK(feedback_rating >= 1 AND feedback_rating <= 5),
+            feedback_comment TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    # 5. Request status history
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS request_status_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            request_id TEXT,
+            status TEXT,
+            comments TEXT,
+            updated_by TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (request_id) REFERENCES service_requests (request_id)
+        )
+    ''')
+
+    # 6. Payments table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payment_id TEXT UNIQUE,
+            request_id TEXT,
+            user_id INTEGER,
+            bill_type TEXT,
+            bill_number TEXT,
+            amount REAL NOT NULL,
+            due_date DATE,
+            payment_method TEXT,
+            transaction_id TEXT,
+            status TEXT DEFAULT 'Pending',
+            receipt_path TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (request_id) REFERENCES service_requests (request_id)
+        )
+    ''')
+
+    # 7. Documents table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            doc_id TEXT UNIQUE,
+            user_id INTEGER,
+            request_id TEXT,
+            document_type TEXT,
+            document_name TEXT,
+            file_path TEXT,
+            file_size INTEGER,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            verified BOOLEAN DEFAULT FALSE,
+            verified_by TEXT,
+            verified_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (request_id) REFERENCES service_requests (request_id)
+        )
+    ''')
+
+    # 8. Notifications table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            notification_type TEXT,
+            title TEXT,
+            message TEXT,
+            is_read BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    # 9. Analytics table (for precomputed metrics)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analytics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            metric_date DATE UNIQUE,
+            total_requests INTEGER DEFAULT 0,
+            completed_requests INTEGER DEFAULT 0,
+            pending_requests INTEGER DEFAULT 0,
+            avg_completion_time REAL,
+            user_count INTEGER DEFAULT 0,
+            new_users INTEGER DEFAULT 0,
+            payment_amount REAL DEFAULT 0,
+            satisfaction_score REAL
+        )
+    ''')
+
+    # 10. Departments table (for department info)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS departments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dept_key TEXT UNIQUE,
+            name_en TEXT,
+            name_hi TEXT,
+            name_mr TEXT,
+            name_ta TEXT,
+            contact TEXT,
+            working_hours TEXT,
+            services_json TEXT
+        )
+    ''')
+
+    # 11. System settings
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS system_settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            setting_key TEXT UNIQUE,
+            setting_value TEXT,
+            description TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Databases created by older builds of either app miss some columns
+    _add_column_if_missing(cursor, 'users', 'photo_path', 'TEXT')
+    _add_column_if_missing(cursor, 'service_requests', 'language', "TEXT DEFAULT 'en'")
+    _add_column_if_missing(cursor, 'analytics', 'new_users', 'INTEGER DEFAULT 0')
+    _add_column_if_missing(cursor, 'analytics', 'satisfaction_score', 'REAL')
+
+    # Default departments
+    departments = [
+        ('electricity', 'Electricity Department', 'बिजली विभाग', 'वीज विभाग', 'மின்சார துறை',
+         '1912', '24/7 Emergency, 9 AM - 6 PM Regular',
+         json.dumps(['Power Outage', 'New Connection', 'Bill Issue', 'Meter Complaint', 'Safety Inspection'])),
+
+        ('water', 'Water Department', 'जल विभाग', 'पाणी विभाग', 'நீர் துறை',
+         '1916', '24/7 Emergency, 8 AM - 8 PM Regular',
+         json.dumps(['No Water Supply', 'Water Quality Issue', 'New Connection', 'Pipeline Leakage', 'Bill Payment'])),
+
+        ('gas', 'Gas Department', 'गैस विभाग', 'गॅस विभाग', 'எரிவாயு துறை',
+         '1906', '24/7 Emergency, 8 AM - 8 PM Regular',
+         json.dumps(['Gas Leak Complaint', 'New Connection', 'Safety Check', 'Appliance Service', 'Bill Payment'])),
+
+        ('waste', 'Waste Management', 'कचरा प्रबंधन', 'कचरा व्यवस्थापन', 'குப்பை மேலாண்மை',
+         '155304', '6 AM - 10 PM',
+         json.dumps(['Garbage Not Collected', 'Sanitation Complaint', 'Recycling Information', 'Illegal Dumping', 'Composting Request']))
+    ]
+
+    cursor.executemany('''
+        INSERT OR IGNORE INTO departments
+        (dept_key, name_en, name_hi, name_mr, name_ta, contact, working_hours, services_json)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', departments)
+
+    # Default settings
+    default_settings = [
+        ('system_name', 'SUVIDHA', 'Application name'),
+        ('support_email', 'support@suvidha.gov.in', 'Support email'),
+        ('support_phone', '1800-123-456', 'Support phone number'),
+        ('version', '1.0.0', 'System version'),
+        ('maintenance_mode', 'false', 'Maintenance mode flag')
+    ]
+
+    cursor.executemany('''
+        INSERT OR IGNORE INTO system_settings (setting_key, setting_value, description)
+        VALUES (?, ?, ?)
+    ''', default_settings)
+
+    # Default admin user
+    cursor.execute("SELECT COUNT(*) FROM users WHERE user_type='admin'")
+    if cursor.fetchone()[0] == 0:
+        admin_id = str(uuid.uuid4())[:8]
+        cursor.execute('''
+            INSERT INTO users (user_id, name, phone, email, user_type, is_active)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (admin_id, 'Admin User', '9999999999', 'admin@suvidha.gov.in', 'admin', True))
+
+
+def migration_002_hot_query_indexes(cursor):
+    """Secondary indexes for the per-user queries run on every page render"""
+    indexes = [
+        # get_user_requests, dashboard totals, track status
+        'CREATE INDEX IF NOT EXISTS idx_requests_user_created ON service_requests (user_id, created_at)',
+        # dashboard pending/completed counts
+        'CREATE INDEX IF NOT EXISTS idx_requests_user_status ON service_requests (user_id, status)',
+        # pending bills and pending payment totals
+        'CREATE INDEX IF NOT EXISTS idx_payments_user_status_due ON payments (user_id, status, due_date)',
+        # payment history
+        'CREATE INDEX IF NOT EXISTS idx_payments_user_created ON payments (user_id, created_at)',
+        # dashboard recent activity join
+        'CREATE INDEX IF NOT EXISTS idx_payments_request ON payments (request_id)',
+        # unread notifications
+        'CREATE INDEX IF NOT EXISTS idx_notifications_user_read_created ON notifications (user_id, is_read, created_at)',
+        # all notifications, newest first
+        'CREATE INDEX IF NOT EXISTS idx_notifications_user_created ON notifications (user_id, created_at)',
+        # status history per request
+        'CREATE INDEX IF NOT EXISTS idx_history_request_created ON request_status_history (request_id, created_at)',
+        # OTP verification lookup
+        'CREATE INDEX IF NOT EXISTS idx_otp_lookup ON otp_verification (aadhaar, phone, verified, created_at)',
+        # OTP rate limiting
+        'CREATE INDEX IF NOT EXISTS idx_otp_rate_limit_phone ON otp_rate_limit (phone)',
+        # document listings
+        'CREATE INDEX IF NOT EXISTS idx_documents_user_uploaded ON documents (user_id, uploaded_at)',
+        'CREATE INDEX IF NOT EXISTS idx_documents_request ON documents (request_id)',
+    ]
+    for statement in indexes:
+        cursor.execute(statement)
+
+
+def _rollup_contribution(row, sign):
+    """SET clause adding (sign='+') or removing (sign='-') a request row's counters"""
+    return f'''
+        total_requests = total_requests {sign} 1,
+        pending_requests = pending_requests {sign} ({row}.status IS 'Pending'),
+        in_progress_requests = in_progress_requests {sign} ({row}.status IS 'In Progress'),
+        completed_requests = completed_requests {sign} ({row}.status IS 'Completed'),
+        rejected_requests = rejected_requests {sign} ({row}.status IS 'Rejected'),
+        rating_sum = rating_sum {sign} COALESCE({row}.feedback_rating, 0),
+        rating_count = rating_count {sign} ({row}.feedback_rating IS NOT NULL),
+        resolution_days_sum = resolution_days_sum {sign}
+            COALESCE(julianday({row}.actual_completion) - julianday({row}.created_at), 0),
+        resolution_count = resolution_count {sign}
+            (julianday({row}.actual_completion) - julianday({row}.created_at) IS NOT NULL)
+    '''
+
+
+def _payment_contribution(row, sign):
+    """SET clause adding or removing a payment row's counters"""
+    return f'''
+        payment_count = payment_count {sign} ({row}.status IS 'Completed'),
+        payment_amount = payment_amount {sign}
+            (CASE WHEN {row}.status IS 'Completed' THEN COALESCE({row}.amount, 0) ELSE 0 END)
+    '''
+
+
+def migration_003_daily_rollups(cursor):
+    """Trigger-maintained per-day counters that replace the frozen analytics rows"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            metric_date TEXT PRIMARY KEY NOT NULL,
+            total_requests INTEGER NOT NULL DEFAULT 0,
+            pending_requests INTEGER NOT NULL DEFAULT 0,
+            in_progress_requests INTEGER NOT NULL DEFAULT 0,
+            completed_requests INTEGER NOT NULL DEFAULT 0,
+            rejected_requests INTEGER NOT NULL DEFAULT 0,
+            rating_sum REAL NOT NULL DEFAULT 0,
+            rating_count INTEGER NOT NULL DEFAULT 0,
+            resolution_days_sum REAL NOT NULL DEFAULT 0,
+            resolution_count INTEGER NOT NULL DEFAULT 0,
+            payment_count INTEGER NOT NULL DEFAULT 0,
+            payment_amount REAL NOT NULL DEFAULT 0,
+            new_users INTEGER NOT NULL DEFAULT 0,
+            active_users INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    # Distinct users who submitted a request each day
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_active_users (
+            metric_date TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (metric_date, user_id)
+        ) WITHOUT ROWID
+    ''')
+
+    triggers = [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_request_insert
+        AFTER INSERT ON service_requests
+        BEGIN
+            INSERT OR IGNORE INTO daily_rollups (metric_date) VALUES (DATE(NEW.created_at));
+            UPDATE daily_rollups SET {_rollup_contribution('NEW', '+')}
+            WHERE metric_date = DATE(NEW.created_at);
+            INSERT OR IGNORE INTO daily_active_users (metric_date, user_id)
+            VALUES (DATE(NEW.created_at), NEW.user_id);
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_request_update
+        AFTER UPDATE OF status, feedback_rating, actual_completion, created_at ON service_requests
+        BEGIN
+            UPDATE daily_rollups SET {_rollup_contribution('OLD', '-')}
+            WHERE metric_date = DATE(OLD.created_at);
+            INSERT OR IGNORE INTO daily_rollups (metric_date) VALUES (DATE(NEW.created_at));
+            UPDATE daily_rollups SET {_rollup_contribution('NEW', '+')}
+            WHERE metric_date = DATE(NEW.created_at);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_active_user
+        AFTER INSERT ON daily_active_users
+        BEGIN
+            INSERT OR IGNORE INTO daily_rollups (metric_date) VALUES (NEW.metric_date);
+            UPDATE daily_rollups SET active_users = active_users + 1
+            WHERE metric_date = NEW.metric_date;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_payment_insert
+        AFTER INSERT ON payments
+        BEGIN
+            INSERT OR IGNORE INTO daily_rollups (metric_date) VALUES (DATE(NEW.created_at));
+            UPDATE daily_rollups SET {_payment_contribution('NEW', '+')}
+            WHERE metric_date = DATE(NEW.created_at);
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_payment_update
+        AFTER UPDATE OF status, amount, created_at ON payments
+        BEGIN
+            UPDATE daily_rollups SET {_payment_contribution('OLD', '-')}
+            WHERE metric_date = DATE(OLD.created_at);
+            INSERT OR IGNORE INTO daily_rollups (metric_date) VALUES (DATE(NEW.created_at));
+            UPDATE daily_rollups SET {_payment_contribution('NEW', '+')}
+            WHERE metric_date = DATE(NEW.created_at);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_user_insert
+        AFTER INSERT ON users
+        BEGIN
+            INSERT OR IGNORE INTO daily_rollups (metric_date) VALUES (DATE(NEW.created_at));
+            UPDATE daily_rollups SET new_users = new_users + 1
+            WHERE metric_date = DATE(NEW.created_at);
+        END
+        ''',
+    ]
+    for statement in triggers:
+        cursor.execute(statement)
+
+    # The old analytics table held one frozen snapshot per day; expose the
+    # live rollups under the same name and columns instead
+    cursor.execute("SELECT type FROM sqlite_master WHERE name='analytics'")
+    existing = cursor.fetchone()
+    if existing and existing[0] == 'table':
+        cursor.execute('DROP TABLE analytics')
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS analytics AS
+        SELECT metric_date,
+               total_requests,
+               completed_requests,
+               pending_requests,
+               CASE WHEN resolution_count > 0
+                    THEN resolution_days_sum / resolution_count END AS avg_completion_time,
+               active_users AS user_count,
+               new_users,
+               payment_amount,
+               CASE WHEN rating_count > 0
+                    THEN rating_sum / rating_count END AS satisfaction_score
+        FROM daily_rollups
+    ''')
+
+    backfill_daily_rollups(cursor)
+
+
+def migration_004_time_buckets(cursor):
+    """Normalize timestamps and add indexed day/hour bucket columns"""
+    # Rewrite every TIMESTAMP column to 'YYYY-MM-DD HH:MM:SS'. Older rows mix
+    # isoformat() strings with microseconds, 'T' separators and
+    # CURRENT_TIMESTAMP defaults. Values SQLite cannot parse are left alone.
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+    for table in [row[0] for row in cursor.fetchall()]:
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [row[1] for row in cursor.fetchall() if row[2].upper() in ('TIMESTAMP', 'DATETIME')]
+        for column in columns:
+            cursor.execute(f'''
+                UPDATE {table}
+                SET {column} = COALESCE(strftime('%Y-%m-%d %H:%M:%S', {column}), {column})
+                WHERE typeof({column}) = 'text'
+                AND {column} IS NOT strftime('%Y-%m-%d %H:%M:%S', {column})
+            ''')
+            cursor.execute(f'''
+                UPDATE {table}
+                SET {column} = datetime({column}, 'unixepoch', 'localtime')
+                WHERE typeof({column}) = 'integer'
+            ''')
+
+    # Virtual generated columns cost no storage; their indexes make
+    # day/hour ranges and GROUP BYs index range scans
+    day = "TEXT GENERATED ALWAYS AS (substr(created_at, 1, 10)) VIRTUAL"
+    hour = "TEXT GENERATED ALWAYS AS (substr(created_at, 1, 13)) VIRTUAL"
+    _add_column_if_missing(cursor, 'service_requests', 'created_day', day)
+    _add_column_if_missing(cursor, 'service_requests', 'created_hour', hour)
+    _add_column_if_missing(cursor, 'payments', 'created_day', day)
+    _add_column_if_missing(cursor, 'users', 'created_day', day)
+
+    indexes = [
+        # analytics date ranges and department breakdowns
+        'CREATE INDEX IF NOT EXISTS idx_requests_created_day ON service_requests (created_day, department)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_created_hour ON service_requests (created_hour)',
+        # rollup rebuilds of completed payments
+        'CREATE INDEX IF NOT EXISTS idx_payments_created_day ON payments (created_day, status)',
+        # new users per day and citizen analytics
+        'CREATE INDEX IF NOT EXISTS idx_users_created_day ON users (created_day)',
+        # admin "active in the last hour"
+        'CREATE INDEX IF NOT EXISTS idx_users_last_login ON users (last_login)',
+    ]
+    for statement in indexes:
+        cursor.execute(statement)
+
+
+# Full-text indexes: (fts table, content table, indexed columns). user_id is
+# indexed as a token so per-user searches are an index intersection.
+FTS_INDEXES = [
+    ('requests_fts', 'service_requests',
+     ['request_id', 'department', 'service_type', 'description', 'address', 'user_id']),
+    ('documents_fts', 'documents',
+     ['doc_id', 'document_type', 'document_name', 'user_id']),
+]
+
+
+def migration_005_full_text_search(cursor):
+    """FTS5 indexes over service requests and documents, synced by triggers"""
+    for fts_table, table, columns in FTS_INDEXES:
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'NEW.{column}' for column in columns)
+        old_values = ', '.join(f'OLD.{column}' for column in columns)
+        try:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                    {column_list},
+                    content='{table}',
+                    content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: search falls back to LIKE
+            if 'fts5' not in str(e):
+                raise
+            return
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{fts_table}_insert
+            AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{fts_table}_delete
+            AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+                VALUES ('delete', OLD.id, {old_values});
+            END
+        ''')
+        # Status changes and other unindexed columns do not touch the index
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{fts_table}_update
+            AFTER UPDATE OF {column_list} ON {table}
+            BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list})
+                VALUES ('delete', OLD.id, {old_values});
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END
+        ''')
+
+        # Index the rows that already exist
+        cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+
+
+def migration_006_archival_indexes(cursor):
+    """Indexes the archival job uses to find closed requests and old notifications"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_requests_status_updated ON service_requests (status, updated_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_notifications_read_created ON notifications (is_read, created_at)')
+
+
+def _user_request_contribution(row, sign):
+    """SET clause adding or removing a request row's per-user counters"""
+    return f'''
+        total_requests = total_requests {sign} 1,
+        pending_requests = pending_requests {sign} ({row}.status IS 'Pending'),
+        in_progress_requests = in_progress_requests {sign} ({row}.status IS 'In Progress'),
+        completed_requests = completed_requests {sign} ({row}.status IS 'Completed'),
+        rejected_requests = rejected_requests {sign} ({row}.status IS 'Rejected')
+    '''
+
+
+def _user_payment_contribution(row, sign):
+    """SET clause adding or removing a payment row's per-user counters"""
+    return f'''
+        pending_payment_count = pending_payment_count {sign} ({row}.status IS 'Pending'),
+        pending_payment_amount = pending_payment_amount {sign}
+            (CASE WHEN {row}.status IS 'Pending' THEN COALESCE({row}.amount, 0) ELSE 0 END)
+    '''
+
+
+def _user_notification_contribution(row, sign):
+    """SET clause adding or removing a notification row's per-user counters"""
+    return f"unread_notifications = unread_notifications {sign} (COALESCE({row}.is_read, 0) = 0)"
+
+
+def _user_stats_triggers(name, table, contribution, update_columns):
+    """Insert/update/delete triggers keeping user_stats in step with table"""
+    bump = "version = version + 1, updated_at = CURRENT_TIMESTAMP"
+    # SELECT ... WHERE rather than VALUES: a NULL user_id would make the
+    # INTEGER PRIMARY KEY pick a fresh rowid
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_user_stats_{name}_insert
+        AFTER INSERT ON {table}
+        BEGIN
+            INSERT OR IGNORE INTO user_stats (user_id)
+            SELECT NEW.user_id WHERE NEW.user_id IS NOT NULL;
+            UPDATE user_stats SET {contribution('NEW', '+')}, {bump}
+            WHERE user_id = NEW.user_id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_user_stats_{name}_update
+        AFTER UPDATE OF {update_columns} ON {table}
+        BEGIN
+            UPDATE user_stats SET {contribution('OLD', '-')}, {bump}
+            WHERE user_id = OLD.user_id;
+            INSERT OR IGNORE INTO user_stats (user_id)
+            SELECT NEW.user_id WHERE NEW.user_id IS NOT NULL;
+            UPDATE user_stats SET {contribution('NEW', '+')}, {bump}
+            WHERE user_id = NEW.user_id;
+        END
+        ''',
+        # Deletes (archival) keep the counters but still move the version
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_user_stats_{name}_delete
+        AFTER DELETE ON {table}
+        BEGIN
+            UPDATE user_stats SET {bump}
+            WHERE user_id = OLD.user_id;
+        END
+        ''',
+    ]
+
+
+def migration_007_user_stats(cursor):
+    """Trigger-maintained per-user counters for the citizen dashboard"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id INTEGER PRIMARY KEY,
+            total_requests INTEGER NOT NULL DEFAULT 0,
+            pending_requests INTEGER NOT NULL DEFAULT 0,
+            in_progress_requests INTEGER NOT NULL DEFAULT 0,
+            completed_requests INTEGER NOT NULL DEFAULT 0,
+            rejected_requests INTEGER NOT NULL DEFAULT 0,
+            pending_payment_count INTEGER NOT NULL DEFAULT 0,
+            pending_payment_amount REAL NOT NULL DEFAULT 0,
+            unread_notifications INTEGER NOT NULL DEFAULT 0,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP
+        )
+    ''')
+
+    # Columns shown in the dashboard lists also move the version, so cached
+    # recent activity and notifications are refetched
+    triggers = (
+        _user_stats_triggers('request', 'service_requests', _user_request_contribution,
+                             'status, user_id, department, service_type, created_at') +
+        _user_stats_triggers('payment', 'payments', _user_payment_contribution,
+                             'status, amount, user_id, request_id') +
+        _user_stats_triggers('notification', 'notifications', _user_notification_contribution,
+                             'is_read, user_id, title, message')
+    )
+    for statement in triggers:
+        cursor.execute(statement)
+
+    backfill_user_stats(cursor)
+
+
+def migration_008_storage_usage(cursor):
+    """Running file and byte counters per storage area"""
+    # Filled by upload/delete deltas and the storage reconciler, not from
+    # documents: archived document rows still have their files on disk
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS storage_usage (
+            area TEXT PRIMARY KEY NOT NULL,
+            file_count INTEGER NOT NULL DEFAULT 0,
+            byte_count INTEGER NOT NULL DEFAULT 0,
+            drift_files INTEGER NOT NULL DEFAULT 0,
+            drift_bytes INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP,
+            reconciled_at TIMESTAMP
+        )
+    ''')
+
+
+def _user_outstanding_payment_contribution(row, sign):
+    """SET clause adding or removing an unpaid (Pending or Overdue) payment's counters"""
+    outstanding = f"{row}.status IN ({', '.join(repr(status) for status in OUTSTANDING_PAYMENT_STATUSES)})"
+    return f'''
+        pending_payment_count = pending_payment_count {sign} ({outstanding}),
+        pending_payment_amount = pending_payment_amount {sign}
+            (CASE WHEN {outstanding} THEN COALESCE({row}.amount, 0) ELSE 0 END)
+    '''
+
+
+def migration_009_scheduler(cursor):
+    """Lease and run history tables for the background job scheduler"""
+    # One row per job: when it is next due and which worker holds it
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scheduler_leases (
+            job_name TEXT PRIMARY KEY NOT NULL,
+            next_run_at TIMESTAMP NOT NULL,
+            owner TEXT,
+            lease_expires_at TIMESTAMP,
+            last_run_at TIMESTAMP,
+            last_status TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scheduler_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_name TEXT NOT NULL,
+            owner TEXT,
+            triggered_by TEXT,
+            status TEXT NOT NULL,
+            started_at TIMESTAMP NOT NULL,
+            finished_at TIMESTAMP,
+            duration_ms REAL,
+            result TEXT,
+            error TEXT
+        )
+    ''')
+
+    indexes = [
+        'CREATE INDEX IF NOT EXISTS idx_scheduler_runs_job ON scheduler_runs (job_name, id)',
+        # OTP purge
+        'CREATE INDEX IF NOT EXISTS idx_otp_expires ON otp_verification (expires_at)',
+        'CREATE INDEX IF NOT EXISTS idx_otp_rate_limit_last_attempt ON otp_rate_limit (last_attempt)',
+        # overdue marking
+        'CREATE INDEX IF NOT EXISTS idx_payments_status_due ON payments (status, due_date)',
+    ]
+    for statement in indexes:
+        cursor.execute(statement)
+
+    # Bills now move from Pending to Overdue, so the dashboard's unpaid
+    # total counts both statuses
+    cursor.execute('DROP TRIGGER IF EXISTS trg_user_stats_payment_insert')
+    cursor.execute('DROP TRIGGER IF EXISTS trg_user_stats_payment_update')
+    for statement in _user_stats_triggers('payment', 'payments', _user_outstanding_payment_contribution,
+                                          'status, amount, user_id, request_id'):
+        cursor.execute(statement)
+    backfill_user_stats(cursor)
+
+
+def migration_010_document_blobs(cursor):
+    """Reference-counted, content-addressed blobs behind documents"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY NOT NULL,
+            size INTEGER NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP,
+            released_at TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+    # Only the blobs waiting for garbage collection
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced ON blobs (ref_count) WHERE ref_count <= 0')
+
+    # NULL for documents still stored as loose files under uploads/
+    _add_column_if_missing(cursor, 'documents', 'blob_sha256', 'TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_blob ON documents (blob_sha256)')
+
+
+def migration_011_data_versions(cursor):
+    """Per-table change counters that key the report cache"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            table_name TEXT PRIMARY KEY NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    # The tables reports.py reads; any write to them bumps their version
+    for table in ('service_requests', 'payments'):
+        cursor.execute('INSERT OR IGNORE INTO data_versions (table_name) VALUES (?)', (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_data_version_{table}_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            ''')
+
+
+# Most urgent first when sorted ascending
+PRIORITY_ORDER_SQL = ("CASE priority WHEN 'Emergency' THEN 0 WHEN 'High' THEN 1 "
+                      "WHEN 'Medium' THEN 2 WHEN 'Low' THEN 3 ELSE 4 END")
+
+
+def _request_count_key(row):
+    """request_counts key columns of a service_requests row"""
+    return (f"COALESCE(substr({row}.created_at, 1, 10), ''), {row}.department, "
+            f"COALESCE({row}.status, ''), COALESCE({row}.priority, '')")
+
+
+def _request_count_change(row, delta):
+    return f'''
+            INSERT INTO request_counts (created_day, department, status, priority, requests)
+            VALUES ({_request_count_key(row)}, {delta})
+            ON CONFLICT (created_day, department, status, priority)
+            DO UPDATE SET requests = requests + excluded.requests;'''
+
+
+def migration_012_request_grid(cursor):
+    """Sort indexes and per-day counters for the admin request grid"""
+    _add_column_if_missing(cursor, 'service_requests', 'priority_order',
+                           f"INTEGER GENERATED ALWAYS AS ({PRIORITY_ORDER_SQL}) VIRTUAL")
+
+    # Each index ends in the grid's sort column, so a filtered page is a
+    # bounded index range scan instead of a sort of every match
+    indexes = [
+        'CREATE INDEX IF NOT EXISTS idx_requests_created ON service_requests (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_status_created ON service_requests (status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_department_status_created '
+        'ON service_requests (department, status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_priority_created ON service_requests (priority_order, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_status_priority_created '
+        'ON service_requests (status, priority_order, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_pincode_created ON service_requests (pincode, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_requests_pincode_priority_created '
+        'ON service_requests (pincode, priority_order, created_at)',
+    ]
+    for statement in indexes:
+        cursor.execute(statement)
+
+    # Requests in the hot table per day, department, status and priority.
+    # Unlike daily_rollups, deletes (archiving) are subtracted: the grid
+    # only lists the hot table.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS request_counts (
+            created_day TEXT NOT NULL,
+            department TEXT NOT NULL,
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            requests INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (created_day, department, status, priority)
+        ) WITHOUT ROWID
+    ''')
+    triggers = [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_request_counts_insert
+        AFTER INSERT ON service_requests
+        BEGIN{_request_count_change('NEW', 1)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_request_counts_update
+        AFTER UPDATE OF created_at, department, status, priority ON service_requests
+        BEGIN{_request_count_change('OLD', -1)}{_request_count_change('NEW', 1)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_request_counts_delete
+        AFTER DELETE ON service_requests
+        BEGIN{_request_count_change('OLD', -1)}
+        END
+        ''',
+    ]
+    for statement in triggers:
+        cursor.execute(statement)
+
+    cursor.execute('DELETE FROM request_counts')
+    cursor.execute(f'''
+        INSERT INTO request_counts (created_day, department, status, priority, requests)
+        SELECT {_request_count_key('r')}, COUNT(*)
+        FROM service_requests AS r
+        GROUP BY 1, 2, 3, 4
+    ''')
+
+
+def _staff_load_change(row, delta):
+    """UPDATE moving a field staff member's open request count by delta for row"""
+    return f'''
+            UPDATE field_staff SET open_requests = open_requests + ({delta})
+            WHERE staff_id = {row}.assigned_to AND {row}.status IN ('Pending', 'In Progress');'''
+
+
+def migration_013_field_staff(cursor):
+    """Field staff, request zones and the indexes behind auto-assignment"""
+    # The zone picked on the new request form; NULL for older requests
+    _add_column_if_missing(cursor, 'service_requests', 'zone', 'TEXT')
+
+    # zone NULL: the member covers every zone of their department.
+    # open_requests counts the open requests assigned_to them, kept by triggers.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS field_staff (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            staff_id TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            phone TEXT,
+            department TEXT NOT NULL,
+            zone TEXT,
+            is_online BOOLEAN NOT NULL DEFAULT TRUE,
+            max_open_requests INTEGER NOT NULL DEFAULT 20,
+            open_requests INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+    ''')
+
+    indexes = [
+        'CREATE INDEX IF NOT EXISTS idx_field_staff_department ON field_staff (department, zone)',
+        # The assignment queue: unassigned Pending requests, newest id last
+        "CREATE INDEX IF NOT EXISTS idx_requests_unassigned ON service_requests (status, id) "
+        "WHERE status = 'Pending' AND assigned_to IS NULL",
+        # A staff member's requests, for rebalancing when they go offline
+        'CREATE INDEX IF NOT EXISTS idx_requests_assigned_status ON service_requests (assigned_to, status) '
+        'WHERE assigned_to IS NOT NULL',
+    ]
+    for statement in indexes:
+        cursor.execute(statement)
+
+    triggers = [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_staff_load_request_insert
+        AFTER INSERT ON service_requests
+        BEGIN{_staff_load_change('NEW', 1)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_staff_load_request_update
+        AFTER UPDATE OF assigned_to, status ON service_requests
+        BEGIN{_staff_load_change('OLD', -1)}{_staff_load_change('NEW', 1)}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_staff_load_request_delete
+        AFTER DELETE ON service_requests
+        BEGIN{_staff_load_change('OLD', -1)}
+        END
+        ''',
+    ]
+    for statement in triggers:
+        cursor.execute(statement)
+
+    cursor.execute('''
+        UPDATE field_staff SET open_requests = (
+            SELECT COUNT(*) FROM service_requests
+            WHERE assigned_to = field_staff.staff_id AND status IN ('Pending', 'In Progress'))
+    ''')
+
+
+def migration_014_node_leases(cursor):
+    """Leases on the node ids id_generator stamps into every ID"""
+    # One row per live process; renewed_at (Unix time) is bumped while it
+    # runs, and a lease not renewed for NODE_LEASE_SECONDS may be taken over
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS node_leases (
+            node_id INTEGER PRIMARY KEY,
+            owner TEXT NOT NULL,
+            leased_at REAL NOT NULL,
+            renewed_at REAL NOT NULL
+        )
+    ''')
+
+
+# Column defaults and trigger bumps that wrote UTC, and their local time
+# replacements. Everything else stores local time (connection_manager).
+LOCAL_TIME_DEFAULTS = [
+    ("DEFAULT CURRENT_TIMESTAMP", "DEFAULT (datetime('now', 'localtime'))"),
+    ("DEFAULT (datetime('now', '+5 minutes'))", "DEFAULT (datetime('now', 'localtime', '+5 minutes'))"),
+]
+
+
+def _rebuild_table(cursor, name, create_sql):
+    """Replace a table's definition the way SQLite documents for schema
+    changes ALTER TABLE cannot make: create, copy, drop, rename, then
+    recreate the indexes, triggers and views that belong to or mention it.
+    Rowids are kept, so external-content FTS indexes stay valid."""
+    cursor.execute('''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE sql IS NOT NULL AND (
+            (type IN ('index', 'trigger') AND tbl_name = ?)
+            OR (type IN ('trigger', 'view') AND sql LIKE '%' || ? || '%'))
+    ''', (name, name))
+    dependents = cursor.fetchall()
+    cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (name,))
+    sequence = cursor.fetchone()
+    cursor.execute(f'PRAGMA table_info({name})')
+    columns = ', '.join(row[1] for row in cursor.fetchall())
+
+    # Those on other tables would stop the rename for naming a missing table
+    cursor.execute('''
+        SELECT type, name FROM sqlite_master
+        WHERE type IN ('trigger', 'view') AND tbl_name != ? AND sql LIKE '%' || ? || '%'
+    ''', (name, name))
+    for kind, dependent in cursor.fetchall():
+        cursor.execute(f'DROP {kind.upper()} {dependent}')
+    staging = f'{name}_rebuild'
+    cursor.execute(re.sub(rf'^CREATE TABLE {name}\b', f'CREATE TABLE {staging}', create_sql))
+    cursor.execute(f'INSERT INTO {staging} ({columns}) SELECT {columns} FROM {name}')
+    cursor.execute(f'DROP TABLE {name}')
+    cursor.execute(f'ALTER TABLE {staging} RENAME TO {name}')
+    if sequence is None:
+        cursor.execute('DELETE FROM sqlite_sequence WHERE name = ?', (name,))
+    else:
+        cursor.execute('UPDATE sqlite_sequence SET seq = ? WHERE name = ?', (sequence[0], name))
+    for _, _, sql in dependents:
+        cursor.execute(sql)
+
+
+def migration_015_local_timestamps(cursor):
+    '''Store local time in column defaults and triggers, like every other write'''
+    # Triggers are simply recreated
+    cursor.execute('''
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'trigger' AND sql LIKE '%CURRENT_TIMESTAMP%'
+    ''')
+    for name, sql in cursor.fetchall():
+        cursor.execute(f'DROP TRIGGER {name}')
+        cursor.execute(sql.replace('CURRENT_TIMESTAMP', "datetime('now', 'localtime')"))
+
+    # A column default can only be changed by rebuilding its table
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'")
+    for name, sql in cursor.fetchall():
+        rewritten = sql
+        for utc_default, local_default in LOCAL_TIME_DEFAULTS:
+            rewritten = rewritten.replace(utc_default, local_default)
+        if rewritten != sql:
+            _rebuild_table(cursor, name, rewritten)
+
+    # user_stats.updated_at only ever came from the trigger bump, so every
+    # existing value is UTC. Rows other tables got from a UTC default cannot
+    # be told apart from the ones written with local time and are left alone.
+    cursor.execute("UPDATE user_stats SET updated_at = datetime(updated_at, 'localtime') WHERE updated_at IS NOT NULL")
+
+
+def migration_016_preview_status(cursor):
+    """Per-blob preview outcome, so the preview backfill visits each blob once"""
+    # NULL until rendered, found to have no preview, or failed (previews.py)
+    _add_column_if_missing(cursor, 'blobs', 'preview_status', 'TEXT')
+    # Only the referenced blobs still waiting for the render_previews job
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_blobs_preview_pending ON blobs (sha256)
+        WHERE preview_status IS NULL AND ref_count > 0
+    ''')
+
+
+# Numbered migrations, applied in order. Never edit a migration that has
+# shipped; add a new one with the next version number instead.
+MIGRATIONS = [
+    (1, 'Baseline schema and seed data', migration_001_baseline),
+    (2, 'Indexes for per-user hot queries', migration_002_hot_query_indexes),
+    (3, 'Trigger-maintained daily rollups', migration_003_daily_rollups),
+    (4, 'Normalized timestamps and day/hour buckets', migration_004_time_buckets),
+    (5, 'Full-text search over requests and documents', migration_005_full_text_search),
+    (6, 'Indexes for archiving closed requests', migration_006_archival_indexes),
+    (7, 'Trigger-maintained per-user dashboard counters', migration_007_user_stats),
+    (8, 'Storage usage counters', migration_008_storage_usage),
+    (9, 'Background job scheduler', migration_009_scheduler),
+    (10, 'Content-addressed document blobs', migration_010_document_blobs),
+    (11, 'Data version counters for cached reports', migration_011_data_versions),
+    (12, 'Indexes and counters for the admin request grid', migration_012_request_grid),
+    (13, 'Field staff and request auto-assignment', migration_013_field_staff),
+    (14, 'Node id leases for the ID allocator', migration_014_node_leases),
+    (15, 'Local time in column defaults and triggers', migration_015_local_timestamps),
+    (16, 'Preview status per document blob', migration_016_preview_status),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Read the schema version stored in the database header"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """Apply every pending migration, each in its own transaction"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+    for version, description, apply in MIGRATIONS:
+        if version <= get_schema_version(conn):
+            continue
+
+        with conn.transaction() as tx:
+            # Another process may have applied it while we waited for the lock
+            if version <= get_schema_version(tx):
+                continue
+            cursor = tx.cursor()
+            apply(cursor)
+            cursor.execute('''
+                INSERT OR REPLACE INTO schema_version (version, description, applied_at)
+                VALUES (?, ?, ?)
+            ''', (version, description, datetime.now()))
+            cursor.execute(f'PRAGMA user_version={int(version)}')
+
+    return get_schema_version(conn)
+
+
+def ensure_schema(conn):
+    """Migrate a database to the latest schema at most once per process.
+
+    conn is a ConnectionManager. After the first call for a database file,
+    later calls (e.g. on every Streamlit rerun) are a single dict lookup.
+    """
+    key = os.path.abspath(conn.db_name)
+    if _migrated.get(key) == LATEST_VERSION:
+        return LATEST_VERSION
+
+    with _migrate_lock:
+        if _migrated.get(key) != LATEST_VERSION:
+            if get_schema_version(conn) < LATEST_VERSION:
+                migrate(conn)
+            _migrated[key] = LATEST_VERSION
+    return LATEST_VERSION
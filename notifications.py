@@ -2,6 +2,7 @@
 import streamlit as st
 from datetime import datetime
 from translations import t
+from connection_manager import TIMESTAMP_FORMAT
 
 class IntegratedNotificationSystem:
     def __init__(self, db_connection):
@@ -11,7 +12,8 @@ class IntegratedNotificationSystem:
         """Add notification to database"""
         cursor = self.db.cursor()
         
-        # Ensure notifications table exists
+        # Ensure notifications table exists (migrations create it for the app;
+        # standalone callers may pass a fresh connection)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS notifications (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -26,9 +28,9 @@ class IntegratedNotificationSystem:
         ''')
         
         cursor.execute('''
-            INSERT INTO notifications (user_id, notification_type, title, message)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, notification_type, title, message))
+            INSERT INTO notifications (user_id, notification_type, title, message, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, notification_type, title, message, datetime.now().strftime(TIMESTAMP_FORMAT)))
         
         self.db.commit()
         return cursor.lastrowid
@@ -3,10 +3,13 @@ import streamlit as st
 from datetime import datetime
 import qrcode
 from translations import t
+from id_generator import new_id, init_node_id
+from database import UnitOfWork, get_pending_bills
 
 class IntegratedPaymentGateway:
     def __init__(self, db_connection):
         self.db = db_connection
+        init_node_id(db_connection)
         
     def show_payment_page(self, current_lang='en'):
         """Show payment page with live data"""
@@ -53,14 +56,8 @@ class IntegratedPaymentGateway:
     
     def get_pending_bills(self, user_id):
         """Get pending bills from database"""
-        cursor = self.db.cursor()
-        cursor.execute('''
-            SELECT payment_id, bill_type, bill_number, amount, due_date, status
-            FROM payments 
-            WHERE user_id=? AND status IN ('Pending', 'Overdue')
-            ORDER BY due_date ASC
-        ''', (user_id,))
-        return cursor.fetchall()
+        return get_pending_bills(self.db, user_id,
+                                 columns='payment_id, bill_type, bill_number, amount, due_date, status')
     
     def show_payment_history(self, user_id, current_lang='en'):
         """Show payment history"""
@@ -166,7 +163,7 @@ class IntegratedPaymentGateway:
             
             if st.button(t('confirm_payment', current_lang), type="primary"):
                 # Process payment
-                transaction_id = f"TXN{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                transaction_id = new_id('TXN')
                 self.process_payment(bill['payment_id'], 'UPI', transaction_id, bill['amount'])
                 
                 st.success(f"✅ {t('payment_successful', current_lang)}")
@@ -183,27 +180,20 @@ class IntegratedPaymentGateway:
     
     def process_payment(self, payment_id, method, transaction_id, amount):
         """Process payment and update database"""
-        cursor = self.db.cursor()
-        
-        cursor.execute('''
-            UPDATE payments 
-            SET status=?, payment_method=?, transaction_id=?, completed_at=?
-            WHERE payment_id=?
-        ''', ('Completed', method, transaction_id, datetime.now(), payment_id))
-        
-        self.db.commit()
-        
-        # Add notification
         user_id = st.session_state.get('user', {}).get('id')
-        if user_id:
-            from notifications_updated import IntegratedNotificationSystem
-            notif_system = IntegratedNotificationSystem(self.db)
-            notif_system.add_notification(
-                user_id,
-                'payment_completed',
-                'Payment Successful',
-                f'Payment of ₹{amount:,.2f} completed successfully'
-            )
+        
+        # Payment update and notification commit together
+        with UnitOfWork(self.db) as uow:
+            uow.complete_payment(payment_id, method, transaction_id)
+            
+            # Add notification
+            if user_id:
+                uow.add_notification({
+                    'user_id': user_id,
+                    'notification_type': 'payment_completed',
+                    'title': 'Payment Successful',
+                    'message': f'Payment of ₹{amount:,.2f} completed successfully'
+                })
     
     def show_payment_receipt(self, payment_data, current_lang='en'):
         """Show payment receipt"""
@@ -0,0 +1,265 @@
+# previews.py
+import os
+import sys
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+from storage import record_usage, UPLOADS_AREA
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+# Small renditions of uploaded documents, so lists and the View button never
+# send a full-resolution phone photo to the browser. Each blob gets a
+# thumbnail for lists and a larger preview for View, stored next to it as
+# <sha256>.thumb.webp and <sha256>.preview.webp. PDFs get a render of their
+# first page when pypdfium2 is installed; other files get none.
+#
+# Rendering runs in a small process pool started with 'spawn' (the server
+# process is multi-threaded, so forking it is unsafe), queued right after the
+# upload commits. The renditions are added to the storage counters when they
+# land, and deleted with their blob by DocumentStore.collect_garbage().
+# The render_previews scheduler job covers blobs that never got any.
+# blobs.preview_status records each blob's outcome, so the job only ever
+# visits blobs nobody has tried yet.
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL = 'thumb'
+PREVIEW = 'preview'
+# Largest first: the thumbnail is scaled down from the preview
+RENDITION_SIZES = ((PREVIEW, (960, 960)), (THUMBNAIL, (192, 192)))
+
+PREVIEW_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+PREVIEW_EXTENSION = '.webp' if PREVIEW_FORMAT == 'WEBP' else '.jpg'
+PREVIEW_QUALITY = 75
+PREVIEW_WORKERS = 2
+# Blobs rendered per scheduler run, inline in the scheduler thread
+PREVIEW_BACKFILL_BATCH = 200
+
+# blobs.preview_status values; NULL means not tried yet
+PREVIEW_RENDERED = 'rendered'
+PREVIEW_NONE = 'none'  # not an image or PDF, or the file is gone
+PREVIEW_FAILED = 'failed'
+
+
+def rendition_path(blob_path, name):
+    return f"{blob_path}.{name}{PREVIEW_EXTENSION}"
+
+
+def rendition_paths(blob_path):
+    return [rendition_path(blob_path, name) for name, size in RENDITION_SIZES]
+
+
+def existing_rendition(blob_path, name):
+    """The rendition's path if it has been rendered, else None"""
+    if not blob_path:
+        return None
+    path = rendition_path(blob_path, name)
+    return path if os.path.exists(path) else None
+
+
+def _open_source(source_path):
+    """The first page of source_path as a PIL image, or None if it has no preview"""
+    with open(source_path, 'rb') as f:
+        is_pdf = f.read(5) == b'%PDF-'
+    if is_pdf:
+        if pypdfium2 is None:
+            return None
+        pdf = pypdfium2.PdfDocument(source_path)
+        try:
+            page = pdf[0]
+            width, height = page.get_size()
+            largest = max(RENDITION_SIZES[0][1])
+            return page.render(scale=largest / max(width, height)).to_pil()
+        finally:
+            pdf.close()
+    
+    try:
+        opened = Image.open(source_path)
+    except UnidentifiedImageError:
+        return None
+    with opened:
+        # JPEG can decode straight to a fraction of its size, which is most
+        # of the work saved on a 12 MB photo
+        opened.draft('RGB', RENDITION_SIZES[0][1])
+        image = ImageOps.exif_transpose(opened)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    if image.mode == 'RGBA' and PREVIEW_FORMAT == 'JPEG':
+        image = image.convert('RGB')
+    return image
+
+
+def render_renditions(source_path):
+    """Write every rendition of source_path; returns [(path, bytes)] written.
+    
+    Runs in a pool worker. Each file is written under a temporary name and
+    renamed, so readers never see half a rendition.
+    """
+    image = _open_source(source_path)
+    if image is None:
+        return []
+    written = []
+    for name, size in RENDITION_SIZES:
+        image.thumbnail(size)
+        path = rendition_path(source_path, name)
+        temp_path = path + '.tmp'
+        image.save(temp_path, PREVIEW_FORMAT, quality=PREVIEW_QUALITY)
+        os.replace(temp_path, path)
+        written.append((path, os.path.getsize(path)))
+    return written
+
+
+def _mark_preview(conn, blob_path, status):
+    """Record a blob's preview outcome"""
+    with conn.transaction() as tx:
+        tx.execute('UPDATE blobs SET preview_status = ? WHERE sha256 = ?',
+                   (status, os.path.basename(blob_path)))
+
+
+def _record_renditions(conn, blob_path, written):
+    """Add freshly written renditions to the storage counters and mark the blob.
+    
+    A blob collected while its renditions were rendering leaves them behind;
+    those are deleted instead of counted.
+    """
+    if not written:
+        _mark_preview(conn, blob_path, PREVIEW_NONE)
+        return
+    if not os.path.exists(blob_path):
+        for path, size in written:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return
+    with conn.transaction() as tx:
+        record_usage(tx.cursor(), UPLOADS_AREA, len(written), sum(size for path, size in written))
+        tx.execute('UPDATE blobs SET preview_status = ? WHERE sha256 = ?',
+                   (PREVIEW_RENDERED, os.path.basename(blob_path)))
+
+
+class PreviewGenerator:
+    """Renders document previews in a process pool as uploads come in"""
+    
+    def __init__(self, conn, workers=PREVIEW_WORKERS):
+        self.conn = conn
+        self.workers = workers
+        self._executor = None
+        self._pending = {}  # blob path -> Future
+        self._lock = threading.Lock()
+    
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+    
+    def submit(self, blob_path):
+        """Queue renditions for a stored blob; returns its Future, or None if already rendered"""
+        with self._lock:
+            future = self._pending.get(blob_path)
+            if future is not None:
+                return future
+            if existing_rendition(blob_path, THUMBNAIL):
+                return None
+            try:
+                future = self._pool().submit(render_renditions, blob_path)
+            except BrokenProcessPool:
+                # A worker died (out of memory on a hostile image, say);
+                # start a fresh pool
+                self._executor = None
+                future = self._pool().submit(render_renditions, blob_path)
+            self._pending[blob_path] = future
+        future.add_done_callback(lambda done: self._finished(blob_path, done))
+        return future
+    
+    def _finished(self, blob_path, future):
+        with self._lock:
+            self._pending.pop(blob_path, None)
+        if future.cancelled():
+            return
+        try:
+            written = future.result()
+        except Exception:
+            logger.exception("Rendering previews for %s failed", blob_path)
+            written = None
+        try:
+            if written is None:
+                _mark_preview(self.conn, blob_path, PREVIEW_FAILED)
+            else:
+                _record_renditions(self.conn, blob_path, written)
+        except Exception:
+            logger.exception("Recording previews for %s failed", blob_path)
+    
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+    
+    def shutdown(self, wait=False):
+        """Stop the workers, dropping renders that have not started;
+        wait=True also waits for the ones in progress"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def render_missing_previews(conn, store, batch_size=PREVIEW_BACKFILL_BATCH):
+    """Render previews for up to batch_size referenced blobs not tried yet.
+    
+    Used by the scheduler for blobs imported from loose files or whose
+    upload-time render was lost to a restart. Every blob visited gets a
+    preview_status, so the next run picks up where this one stopped and
+    blobs without a preview are opened only once.
+    """
+    rendered = 0
+    failed = 0
+    visited = 0
+    last_sha256 = ''
+    while visited < batch_size:
+        rows = conn.execute('''
+            SELECT sha256 FROM blobs
+            WHERE preview_status IS NULL AND ref_count > 0 AND sha256 > ?
+            ORDER BY sha256 LIMIT ?
+        ''', (last_sha256, min(PREVIEW_BACKFILL_BATCH, batch_size - visited))).fetchall()
+        if not rows:
+            break
+        last_sha256 = rows[-1][0]
+        for (sha256,) in rows:
+            visited += 1
+            blob_path = store.blob_path(sha256)
+            if not os.path.exists(blob_path):
+                _mark_preview(conn, blob_path, PREVIEW_NONE)
+                continue
+            if existing_rendition(blob_path, THUMBNAIL):
+                _mark_preview(conn, blob_path, PREVIEW_RENDERED)
+                continue
+            try:
+                written = render_renditions(blob_path)
+            except Exception as e:
+                logger.warning("Rendering previews for %s failed: %s", blob_path, e)
+                _mark_preview(conn, blob_path, PREVIEW_FAILED)
+                failed += 1
+                continue
+            _record_renditions(conn, blob_path, written)
+            rendered += bool(written)
+    return {'rendered': rendered, 'failed': failed, 'visited': visited}
+
+
+if __name__ == "__main__":
+    # Usage: python previews.py [db_path] - render every missing preview
+    from connection_manager import ConnectionManager
+    from migrations import ensure_schema
+    from document_store import DocumentStore
+    
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'suvidha_live.db'
+    manager = ConnectionManager(db_path)
+    ensure_schema(manager)
+    print(render_missing_previews(manager, DocumentStore(), batch_size=sys.maxsize))
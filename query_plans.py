@@ -0,0 +1,185 @@
+# query_plans.py
+import sys
+import sqlite3
+import tempfile
+import os
+from datetime import date
+from query_stats import capture, explain_query_plan
+from database import (ComprehensiveDatabase, get_user_requests_page, get_user_payments_page,
+                      get_user_documents_page, get_user_notifications_page, get_request_history,
+                      get_pending_bills, get_latest_otp, count_active_users)
+from user_stats import get_recent_activity
+from request_grid import fetch_grid_page
+from assignment import AssignmentEngine, set_staff_online
+from analytics import LiveAnalyticsDashboard
+from maintenance_jobs import purge_expired_otps, mark_overdue_bills
+from previews import render_missing_previews
+from document_store import DocumentStore
+
+# Hot queries are checked as their code paths really issue them: each path
+# runs against the database while query_stats captures its statements, and
+# every statement made by the named caller ('module:function', as in
+# query_stats) is explained. Paths are run on a scratch copy, never in place.
+AFTER = ('2026-01-01 00:00:00', 1)
+JANUARY = (date(2026, 1, 1), date(2026, 1, 31))
+
+
+def _assignment_cycles(db):
+    """Two assignment cycles; the second picks up requests put back since the first"""
+    engine = AssignmentEngine(db.conn)
+    engine.run_once()
+    engine.run_once()
+
+
+# (name, run(db), caller, index); db is a ComprehensiveDatabase
+HOT_QUERIES = [
+    ('get_user_requests', lambda db: db.get_user_requests(1),
+     'database:ComprehensiveDatabase.get_user_requests', 'idx_requests_user_created'),
+
+    # Dashboard counters come from user_stats; only the recent lists hit the tables
+    ('dashboard_recent_activity', lambda db: get_recent_activity(db.conn, 1),
+     'user_stats:get_recent_activity', 'idx_requests_user_created'),
+
+    ('pending_bills', lambda db: get_pending_bills(db.conn, 1),
+     'database:get_pending_bills', 'idx_payments_user_status_due'),
+
+    ('get_user_payments', lambda db: db.get_user_payments(1),
+     'database:ComprehensiveDatabase.get_user_payments', 'idx_payments_user_created'),
+
+    ('get_user_notifications_unread', lambda db: db.get_user_notifications(1, unread_only=True),
+     'database:ComprehensiveDatabase.get_user_notifications', 'idx_notifications_user_read_created'),
+
+    ('get_user_notifications', lambda db: db.get_user_notifications(1),
+     'database:ComprehensiveDatabase.get_user_notifications', 'idx_notifications_user_created'),
+
+    ('track_status_history', lambda db: get_request_history(db.conn, 'SR1'),
+     'database:get_requests_history', 'idx_history_request_created'),
+
+    ('verify_otp', lambda db: get_latest_otp(db.conn, '123456789012', '9999999999'),
+     'database:get_latest_otp', 'idx_otp_lookup'),
+
+    ('get_user_documents', lambda db: db.get_user_documents(1),
+     'database:ComprehensiveDatabase.get_user_documents', 'idx_documents_user_uploaded'),
+
+    # Keyset pagination: every page after the first is a bounded range scan
+    ('requests_next_page', lambda db: get_user_requests_page(db.conn, 1, AFTER),
+     'database:fetch_page', 'idx_requests_user_created'),
+
+    ('payments_next_page',
+     lambda db: get_user_payments_page(db.conn, 1, AFTER, start='2026-01-01', end='2026-02-01'),
+     'database:fetch_page', 'idx_payments_user_created'),
+
+    ('documents_next_page', lambda db: get_user_documents_page(db.conn, 1, AFTER),
+     'database:fetch_page', 'idx_documents_user_uploaded'),
+
+    ('notifications_next_page', lambda db: get_user_notifications_page(db.conn, 1, AFTER),
+     'database:fetch_page', 'idx_notifications_user_created'),
+
+    # Admin request grid (request_grid.py): one equality query per filter value
+    ('grid_newest_page', lambda db: fetch_grid_page(db.conn, after=AFTER),
+     'request_grid:fetch_grid_page', 'idx_requests_created'),
+
+    ('grid_status_page', lambda db: fetch_grid_page(db.conn, {'status': ['Pending']}, after=AFTER),
+     'request_grid:fetch_grid_page', 'idx_requests_status_created'),
+
+    ('grid_department_status_page',
+     lambda db: fetch_grid_page(db.conn, {'department': ['Water'], 'status': ['Pending']},
+                                *JANUARY, sort='oldest'),
+     'request_grid:fetch_grid_page', 'idx_requests_department_status_created'),
+
+    ('grid_priority_page', lambda db: fetch_grid_page(db.conn, sort='priority', after=(0,) + AFTER),
+     'request_grid:fetch_grid_page', 'idx_requests_priority_created'),
+
+    ('grid_status_priority_page',
+     lambda db: fetch_grid_page(db.conn, {'status': ['Pending'], 'priority': ['High']}, sort='priority'),
+     'request_grid:fetch_grid_page', 'idx_requests_status_priority_created'),
+
+    ('grid_pincode_page', lambda db: fetch_grid_page(db.conn, {'pincode': ['110001']}, after=AFTER),
+     'request_grid:fetch_grid_page', 'idx_requests_pincode_created'),
+
+    # Auto-assignment queue and rebalancing (partial indexes)
+    ('assignment_queue', lambda db: AssignmentEngine(db.conn).run_once(),
+     'assignment:AssignmentEngine._load_requests', 'idx_requests_unassigned'),
+
+    ('assignment_requeued', _assignment_cycles,
+     'assignment:AssignmentEngine._load_requests', 'idx_requests_status_updated'),
+
+    ('staff_pending_requests', lambda db: set_staff_online(db.conn, 'STAFF1', False),
+     'assignment:set_staff_online', 'idx_requests_assigned_status'),
+
+    # Date ranges go through the generated day bucket columns
+    ('department_analytics', lambda db: LiveAnalyticsDashboard(db.conn).get_department_performance(*JANUARY),
+     'analytics:LiveAnalyticsDashboard.get_department_performance', 'idx_requests_created_day'),
+
+    ('citizen_languages', lambda db: LiveAnalyticsDashboard(db.conn).get_language_usage(*JANUARY),
+     'analytics:LiveAnalyticsDashboard.get_language_usage', 'idx_users_created_day'),
+
+    ('registered_users_requests', lambda db: LiveAnalyticsDashboard(db.conn).get_live_metrics(*JANUARY),
+     'analytics:LiveAnalyticsDashboard.get_live_metrics', 'idx_users_created_day'),
+
+    ('active_users_today', lambda db: LiveAnalyticsDashboard(db.conn).get_live_metrics(*JANUARY),
+     'analytics:LiveAnalyticsDashboard.get_live_metrics', 'idx_users_last_login'),
+
+    ('active_sessions', lambda db: count_active_users(db.conn, '2026-01-01 00:00:00'),
+     'database:count_active_users', 'idx_users_last_login'),
+
+    # Scheduled maintenance jobs
+    ('purge_expired_otps', lambda db: purge_expired_otps(db.conn),
+     'maintenance_jobs:_delete_in_batches', 'idx_otp_expires'),
+
+    ('mark_overdue_bills', lambda db: mark_overdue_bills(db.conn),
+     'maintenance_jobs:mark_overdue_bills', 'idx_payments_status_due'),
+
+    ('blobs_missing_previews', lambda db: render_missing_previews(db.conn, DocumentStore(tempfile.mkdtemp())),
+     'previews:render_missing_previews', 'idx_blobs_preview_pending'),
+]
+
+
+def captured_statements(db, run, caller):
+    """(sql, parameters) of every statement caller issued while run(db) ran,
+    leaving out executemany() calls given no rows, which run nothing"""
+    with capture() as captured:
+        run(db)
+    return [(sql, parameters) for who, sql, parameters in captured.statements
+            if who == caller and parameters != []]
+
+
+def check_query_plans(db, queries=HOT_QUERIES):
+    """Assert that every hot query is answered through its index.
+
+    Raises AssertionError listing each code path that issued no statement
+    from its caller, or whose statements scan a table or never use the
+    expected index.
+    """
+    failures = []
+    for name, run, caller, index in queries:
+        statements = captured_statements(db, run, caller)
+        if not statements:
+            failures.append(f"{name}: {caller} issued no statements")
+            continue
+        plan = [line for sql, parameters in statements
+                for line in explain_query_plan(db.conn.connection, sql, parameters)]
+        uses_index = any(f'INDEX {index}' in line for line in plan)
+        scans = [line for line in plan if line.startswith('SCAN ') and 'INDEX' not in line]
+        if not uses_index or scans:
+            failures.append(f"{name}: expected {index}, got {' | '.join(plan)}")
+
+    if failures:
+        raise AssertionError('Queries not using their index:\n' + '\n'.join(failures))
+    return True
+
+
+def scratch_database(source=None):
+    """A ComprehensiveDatabase in a temporary directory, copied from source if given"""
+    path = os.path.join(tempfile.mkdtemp(), 'query_plans.db')
+    if source is not None:
+        with sqlite3.connect(source) as src, sqlite3.connect(path) as dst:
+            src.backup(dst)
+    return ComprehensiveDatabase(path)
+
+
+if __name__ == "__main__":
+    # Check against a copy of the given database, or a freshly migrated one
+    db = scratch_database(sys.argv[1] if len(sys.argv) > 1 else None)
+    check_query_plans(db)
+    print(f"All {len(HOT_QUERIES)} hot queries use their indexes")
@@ -0,0 +1,304 @@
+# query_stats.py
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from time import perf_counter
+
+# Statement instrumentation for every RetryingCursor handed out by
+# ConnectionManager. While disabled, recorder is None and the cursor pays a
+# single module attribute check per statement. While enabled, each statement
+# is timed and filed under its normalized SQL and the function that issued it.
+#
+# Times cover execute()/executemany() only: for a SELECT that is the work up
+# to the first row, which is where a missing index shows up.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_MS = 100.0
+DEFAULT_SLOW_LOG_SIZE = 200
+DEFAULT_DUMP_PATH = 'query_stats.json'
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open
+BUCKET_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+# Frames in these files belong to the cursor plumbing, not the caller
+_PLUMBING_FILES = {'connection_manager.py', 'query_stats.py', 'contextlib.py'}
+
+# Only these statements have a useful EXPLAIN QUERY PLAN
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+# The active QueryRecorder, or None while instrumentation is off
+recorder = None
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """Collapse whitespace, literals and IN lists so equivalent statements share a key"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return _PLACEHOLDER_LIST.sub('(?+)', sql)
+
+
+def calling_function():
+    """'module:qualified.name' of the first frame outside the cursor plumbing"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        if filename not in _PLUMBING_FILES:
+            module = os.path.splitext(filename)[0]
+            return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+        frame = frame.f_back
+    return '?'
+
+
+class StatementStats:
+    """Latency histogram for one (normalized SQL, caller) pair"""
+    
+    __slots__ = ('sql', 'caller', 'count', 'errors', 'total_ms', 'max_ms', 'buckets')
+    
+    def __init__(self, sql, caller):
+        self.sql = sql
+        self.caller = caller
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * len(BUCKET_BOUNDS_MS)
+    
+    def add(self, elapsed_ms, failed):
+        self.count += 1
+        self.errors += failed
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        for index, bound in enumerate(BUCKET_BOUNDS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[index] += 1
+                break
+    
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls, capped at the max"""
+        target = fraction * self.count
+        seen = 0
+        for bound, hits in zip(BUCKET_BOUNDS_MS, self.buckets):
+            seen += hits
+            if hits and seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+    
+    def as_dict(self):
+        return {
+            'sql': self.sql,
+            'caller': self.caller,
+            'count': self.count,
+            'errors': self.errors,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.5), 3),
+            'p95_ms': round(self.percentile(0.95), 3),
+            'max_ms': round(self.max_ms, 3),
+            'histogram': {
+                ('inf' if bound == float('inf') else str(bound)): hits
+                for bound, hits in zip(BUCKET_BOUNDS_MS, self.buckets) if hits
+            }
+        }
+
+
+class _Measurement:
+    """Context manager timing one statement on a cursor"""
+    
+    __slots__ = ('recorder', 'cursor', 'sql', 'parameters', 'started')
+    
+    def __init__(self, recorder, cursor, sql, parameters):
+        self.recorder = recorder
+        self.cursor = cursor
+        self.sql = sql
+        self.parameters = parameters
+    
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (perf_counter() - self.started) * 1000
+        self.recorder.record(self.cursor, self.sql, self.parameters, elapsed_ms, exc_type is not None)
+        return False
+
+
+class QueryRecorder:
+    """Collects per-statement latency histograms and a log of slow statements"""
+    
+    def __init__(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS, slow_log_size=DEFAULT_SLOW_LOG_SIZE):
+        self.slow_query_ms = slow_query_ms
+        self.started_at = datetime.now()
+        self.statements = {}  # (normalized sql, caller) -> StatementStats
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+    
+    def measure(self, cursor, sql, parameters=()):
+        return _Measurement(self, cursor, sql, parameters)
+    
+    def record(self, cursor, sql, parameters, elapsed_ms, failed=False):
+        normalized = normalize_sql(sql)
+        caller = calling_function()
+        key = (normalized, caller)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats(normalized, caller)
+            stats.add(elapsed_ms, failed)
+        
+        if elapsed_ms >= self.slow_query_ms and not failed:
+            plan = explain_query_plan(cursor.connection, sql, parameters)
+            entry = {
+                'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'elapsed_ms': round(elapsed_ms, 3),
+                'caller': caller,
+                'sql': normalized,
+                'plan': plan
+            }
+            with self._lock:
+                self.slow_queries.append(entry)
+            logger.warning('Slow query (%.1f ms) from %s: %s\n  %s',
+                           elapsed_ms, caller, normalized, '\n  '.join(plan))
+    
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self.slow_queries.clear()
+            self.started_at = datetime.now()
+    
+    def snapshot(self):
+        """Stats for every statement, slowest total first, plus the slow query log"""
+        with self._lock:
+            statements = [stats.as_dict() for stats in self.statements.values()]
+            slow_queries = list(self.slow_queries)
+        statements.sort(key=lambda stats: stats['total_ms'], reverse=True)
+        return {
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'slow_query_ms': self.slow_query_ms,
+            'statements': statements,
+            'slow_queries': slow_queries
+        }
+
+
+class StatementCapture:
+    """Keeps every statement as issued, with its parameters and caller.
+    
+    Used by query_plans.py to explain the SQL a code path really runs.
+    """
+    
+    def __init__(self):
+        self.statements = []  # (caller, sql, parameters)
+        self._lock = threading.Lock()
+    
+    def measure(self, cursor, sql, parameters=()):
+        return _Measurement(self, cursor, sql, parameters)
+    
+    def record(self, cursor, sql, parameters, elapsed_ms, failed=False):
+        entry = (calling_function(), sql, parameters)
+        with self._lock:
+            self.statements.append(entry)
+
+
+def explain_query_plan(conn, sql, parameters=()):
+    """EXPLAIN QUERY PLAN detail lines, or [] for statements that have none.
+    
+    Runs on a plain sqlite3 cursor so the EXPLAIN itself is not recorded.
+    executemany() parameter lists are explained with their first row.
+    """
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    if isinstance(parameters, list) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        parameters = parameters[0]
+    try:
+        rows = sqlite3.Cursor(conn).execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+    except sqlite3.Error as e:
+        return [f'(no plan: {e})']
+    return [row[3] for row in rows]
+
+
+def enable(slow_query_ms=None):
+    """Start recording statements; returns the active recorder"""
+    global recorder
+    if recorder is None:
+        recorder = QueryRecorder(DEFAULT_SLOW_QUERY_MS if slow_query_ms is None else slow_query_ms)
+    elif slow_query_ms is not None:
+        recorder.slow_query_ms = slow_query_ms
+    return recorder
+
+
+def disable():
+    """Stop recording; statements go straight to SQLite again"""
+    global recorder
+    recorder = None
+
+
+@contextmanager
+def capture():
+    """Capture the statements issued inside the block instead of timing them"""
+    global recorder
+    previous, recorder = recorder, StatementCapture()
+    try:
+        yield recorder
+    finally:
+        recorder = previous
+
+
+def is_enabled():
+    return recorder is not None
+
+
+def snapshot():
+    """Current stats, or None while disabled"""
+    return recorder.snapshot() if recorder is not None else None
+
+
+def dump(path=None):
+    """Write the current stats as JSON to path and return the path"""
+    path = path or os.environ.get('SUVIDHA_QUERY_STATS_FILE', DEFAULT_DUMP_PATH)
+    data = snapshot() or {'statements': [], 'slow_queries': []}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+def _dump_at_exit():
+    if recorder is not None:
+        dump()
+
+
+# SUVIDHA_QUERY_STATS=1 turns recording on for the whole process and dumps
+# the stats to SUVIDHA_QUERY_STATS_FILE (query_stats.json) at exit.
+# SUVIDHA_SLOW_QUERY_MS sets the slow query threshold.
+if os.environ.get('SUVIDHA_QUERY_STATS') == '1':
+    enable(float(os.environ.get('SUVIDHA_SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS)))
+    atexit.register(_dump_at_exit)
+
+
+if __name__ == "__main__":
+    # Usage: python query_stats.py [dump_path] - summarize a dump file
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DUMP_PATH
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    for stats in data['statements'][:20]:
+        print(f"{stats['total_ms']:>10.1f} ms  {stats['count']:>7}x  p95 {stats['p95_ms']:>8.2f} ms  "
+              f"{stats['caller']}  {stats['sql'][:80]}")
+    print(f"{len(data['slow_queries'])} slow quer{'y' if len(data['slow_queries']) == 1 else 'ies'} logged")
@@ -0,0 +1,413 @@
+# reports.py
+import sys
+import html
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from archive import union_source
+from rollups import summarize_rollups
+from user_stats import OUTSTANDING_PAYMENT_STATUSES
+from sla import SLA_TARGET_DAYS, DEFAULT_SLA_TARGET_DAYS
+
+# Operational reports for admins, computed on worker threads instead of the
+# Streamlit request thread. A run reads everything it needs inside one read
+# transaction (ConnectionManager.snapshot()), so a report never mixes rows
+# from before and after a write, and traffic carries on while it reads.
+# Grouping happens in pandas once the snapshot is closed.
+#
+# Results are cached by (report, parameters, data version). data_versions
+# (migration 011) counts writes to service_requests and payments, so a
+# cached report is served until a row it could depend on changes.
+
+logger = logging.getLogger(__name__)
+
+REPORT_WORKERS = 2
+REPORT_CACHE_SIZE = 32
+# Finished jobs remembered so a polling page can pick up its result
+REPORT_JOB_HISTORY = 50
+LOAD_CHUNK_ROWS = 50_000
+
+OPEN_STATUSES = ('Pending', 'In Progress')
+
+REQUEST_COLUMNS = ['department', 'service_type', 'pincode', 'priority', 'status',
+                   'created_at', 'actual_completion', 'feedback_rating']
+PAYMENT_COLUMNS = ['bill_type', 'amount', 'status', 'created_at']
+CATEGORY_COLUMNS = ['department', 'service_type', 'pincode', 'priority', 'status', 'bill_type']
+
+
+class Report:
+    """A named report: which table it reads and how it groups the rows"""
+    
+    def __init__(self, name, title, table, build, description):
+        self.name = name
+        self.title = title
+        self.table = table
+        self.build = build
+        self.description = description
+
+
+class ReportResult:
+    """A computed report and what it was computed from"""
+    
+    def __init__(self, report, params, version, frame, rows_read, seconds):
+        self.report = report
+        self.params = params
+        self.version = version
+        self.frame = frame
+        self.rows_read = rows_read
+        self.seconds = seconds
+        self.generated_at = datetime.now()
+    
+    def to_csv(self):
+        return self.frame.to_csv(index=False)
+    
+    def to_html(self):
+        """A standalone HTML page with the report table"""
+        title = html.escape(self.report.title)
+        period = ', '.join(f"{html.escape(str(key))}: {html.escape(str(value))}"
+                           for key, value in self.params)
+        table = self.frame.to_html(index=False, border=0, na_rep='', classes='report')
+        return f'''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>SUVIDHA - {title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2rem; }}
+table.report {{ border-collapse: collapse; }}
+table.report th, table.report td {{ padding: 4px 10px; border-bottom: 1px solid #ddd; text-align: right; }}
+table.report th {{ background: #1a2980; color: white; }}
+</style></head>
+<body>
+<h2>SUVIDHA - {title}</h2>
+<p>{period}<br>Generated {self.generated_at.strftime('%Y-%m-%d %H:%M:%S')} from {self.rows_read:,} rows</p>
+{table}
+</body></html>'''
+
+
+class ReportJob:
+    """One report run; the page polls progress and picks up result or error"""
+    
+    def __init__(self, report, params):
+        self.id = uuid.uuid4().hex
+        self.report = report
+        self.params = params
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = 'Waiting for a worker'
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+    
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+    
+    def wait(self, timeout=None):
+        """Block until the run finishes; returns whether it did"""
+        return self._done.wait(timeout)
+    
+    def update(self, progress, message):
+        self.progress = min(max(progress, 0.0), 1.0)
+        self.message = message
+
+
+def _params_key(params):
+    return tuple(sorted(params.items()))
+
+
+def _date_bounds(params):
+    """'YYYY-MM-DD' bounds for created_at in [start_date, end_date]"""
+    return (params['start_date'].strftime('%Y-%m-%d'),
+            (params['end_date'] + timedelta(days=1)).strftime('%Y-%m-%d'))
+
+
+def _read_chunks(conn, sql, params, columns, expected, job, label):
+    """Read a query into one DataFrame LOAD_CHUNK_ROWS rows at a time, reporting progress"""
+    chunks = []
+    loaded = 0
+    for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=LOAD_CHUNK_ROWS):
+        chunks.append(chunk)
+        loaded += len(chunk)
+        job.update(0.1 + 0.7 * min(loaded / expected, 1.0) if expected else 0.5,
+                   f"Loaded {loaded:,} {label}")
+    frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+    for column in frame.columns:
+        if column in CATEGORY_COLUMNS:
+            frame[column] = frame[column].fillna('Unknown').astype('category')
+        elif column in ('created_at', 'actual_completion'):
+            frame[column] = pd.to_datetime(frame[column], format='ISO8601', errors='coerce')
+    return frame
+
+
+def load_requests(conn, params, job):
+    start, end = _date_bounds(params)
+    expected = summarize_rollups(conn, params['start_date'], params['end_date'])['total_requests']
+    sql = f'''SELECT {', '.join('r.' + column for column in REQUEST_COLUMNS)}
+              FROM {union_source(conn, 'service_requests', 'r')}
+              WHERE r.created_at >= ? AND r.created_at < ?'''
+    return _read_chunks(conn, sql, (start, end), REQUEST_COLUMNS, expected, job, 'requests')
+
+
+def load_payments(conn, params, job):
+    start, end = _date_bounds(params)
+    sql = f'''SELECT {', '.join('p.' + column for column in PAYMENT_COLUMNS)}
+              FROM payments AS p
+              WHERE p.created_at >= ? AND p.created_at < ?'''
+    return _read_chunks(conn, sql, (start, end), PAYMENT_COLUMNS, None, job, 'payments')
+
+
+LOADERS = {
+    'service_requests': load_requests,
+    'payments': load_payments
+}
+
+
+def _request_flags(frame):
+    """Per-request status flags and resolution time in days"""
+    completed = frame['status'].eq('Completed').to_numpy()
+    elapsed = (frame['actual_completion'] - frame['created_at']).dt.total_seconds().to_numpy() / 86400
+    return frame.assign(
+        completed=completed,
+        open=frame['status'].isin(OPEN_STATUSES).to_numpy(),
+        rejected=frame['status'].eq('Rejected').to_numpy(),
+        resolution_days=np.where(completed, elapsed, np.nan)
+    )
+
+
+def _rate(numerator, denominator):
+    """Percentage, NaN where the denominator is 0"""
+    return np.where(denominator > 0, numerator / np.maximum(denominator, 1) * 100, np.nan)
+
+
+def department_report(frame, now):
+    grouped = _request_flags(frame).groupby('department', observed=True).agg(
+        requests=('status', 'size'),
+        open=('open', 'sum'),
+        completed=('completed', 'sum'),
+        rejected=('rejected', 'sum'),
+        avg_resolution_days=('resolution_days', 'mean'),
+        avg_rating=('feedback_rating', 'mean'))
+    grouped['completion_rate_pct'] = _rate(grouped['completed'], grouped['requests'])
+    return grouped.sort_values('requests', ascending=False).reset_index().round(2)
+
+
+def pincode_report(frame, now):
+    flagged = _request_flags(frame)
+    grouped = flagged.groupby('pincode', observed=True).agg(
+        requests=('status', 'size'),
+        open=('open', 'sum'),
+        completed=('completed', 'sum'),
+        avg_resolution_days=('resolution_days', 'mean'))
+    grouped['completion_rate_pct'] = _rate(grouped['completed'], grouped['requests'])
+    # Busiest department per pincode
+    busiest = (flagged.groupby(['pincode', 'department'], observed=True).size()
+               .reset_index(name='department_requests')
+               .sort_values('department_requests', ascending=False)
+               .drop_duplicates('pincode')
+               .set_index('pincode')['department'])
+    grouped['top_department'] = busiest.reindex(grouped.index).astype(str)
+    return grouped.sort_values('requests', ascending=False).reset_index().round(2)
+
+
+def sla_report(frame, now):
+    flagged = _request_flags(frame)
+    target_days = flagged['priority'].map(SLA_TARGET_DAYS).astype(float).fillna(DEFAULT_SLA_TARGET_DAYS).to_numpy()
+    age_days = (pd.Timestamp(now) - flagged['created_at']).dt.total_seconds().to_numpy() / 86400
+    completed = flagged['completed'].to_numpy()
+    resolution_days = flagged['resolution_days'].to_numpy()
+    # A completed request without actual_completion can be neither met nor
+    # breached; it is counted apart and left out of compliance
+    timed = completed & ~np.isnan(resolution_days)
+    met = timed & (resolution_days <= target_days)
+    flagged = flagged.assign(
+        met=met,
+        breached=timed & ~met,
+        unknown=completed & ~timed,
+        open_overdue=flagged['open'].to_numpy() & (age_days > target_days))
+    grouped = flagged.groupby(['department', 'priority'], observed=True).agg(
+        requests=('status', 'size'),
+        completed=('completed', 'sum'),
+        met_sla=('met', 'sum'),
+        breached_sla=('breached', 'sum'),
+        completion_time_unknown=('unknown', 'sum'),
+        open=('open', 'sum'),
+        open_overdue=('open_overdue', 'sum'))
+    grouped['compliance_pct'] = _rate(grouped['met_sla'],
+                                      grouped['met_sla'] + grouped['breached_sla'] + grouped['open_overdue'])
+    grouped['target_days'] = grouped.index.get_level_values('priority').map(
+        lambda priority: SLA_TARGET_DAYS.get(priority, DEFAULT_SLA_TARGET_DAYS))
+    return grouped.reset_index().round(2)
+
+
+def revenue_report(frame, now):
+    amount = frame['amount'].astype(float).to_numpy()
+    frame = frame.assign(
+        month=frame['created_at'].dt.strftime('%Y-%m'),
+        collected=np.where(frame['status'].eq('Completed').to_numpy(), amount, 0.0),
+        outstanding=np.where(frame['status'].isin(OUTSTANDING_PAYMENT_STATUSES).to_numpy(), amount, 0.0))
+    grouped = frame.groupby(['month', 'bill_type'], observed=True).agg(
+        bills=('amount', 'size'),
+        billed=('amount', 'sum'),
+        collected=('collected', 'sum'),
+        outstanding=('outstanding', 'sum'))
+    grouped['collection_rate_pct'] = _rate(grouped['collected'], grouped['billed'])
+    return grouped.reset_index().round(2)
+
+
+def satisfaction_report(frame, now):
+    rated = frame[frame['feedback_rating'].notna()]
+    ratings = rated['feedback_rating'].astype(int)
+    grouped = rated.assign(satisfied=ratings.ge(4).to_numpy()).groupby(
+        ['department', 'service_type'], observed=True).agg(
+        ratings=('feedback_rating', 'size'),
+        avg_rating=('feedback_rating', 'mean'),
+        satisfied=('satisfied', 'sum'))
+    grouped['satisfied_pct'] = _rate(grouped['satisfied'], grouped['ratings'])
+    distribution = pd.crosstab([rated['department'], rated['service_type']], ratings)
+    distribution = distribution.reindex(columns=range(1, 6), fill_value=0)
+    distribution.columns = [f'{stars}_star' for stars in distribution.columns]
+    grouped = grouped.join(distribution).drop(columns='satisfied')
+    return grouped.sort_values('ratings', ascending=False).reset_index().round(2)
+
+
+REPORTS = OrderedDict((report.name, report) for report in [
+    Report('department', 'Department performance', 'service_requests', department_report,
+           "Requests, completion rate, resolution time and rating per department"),
+    Report('pincode', 'Requests by pincode', 'service_requests', pincode_report,
+           "Request volume, backlog and busiest department per pincode"),
+    Report('sla', 'SLA compliance', 'service_requests', sla_report,
+           "Requests resolved within " +
+           ', '.join(f"{days}d ({priority})" for priority, days in SLA_TARGET_DAYS.items()) +
+           ", and open requests already past their target"),
+    Report('revenue', 'Revenue and collections', 'payments', revenue_report,
+           "Billed, collected and outstanding amounts per month and bill type"),
+    Report('satisfaction', 'Citizen satisfaction', 'service_requests', satisfaction_report,
+           "Feedback ratings per department and service"),
+])
+
+
+def data_version(conn, table):
+    """How many writes table has seen; moves whenever its rows change"""
+    row = conn.execute('SELECT version FROM data_versions WHERE table_name = ?', (table,)).fetchone()
+    return row[0] if row else 0
+
+
+class ReportEngine:
+    """Runs reports on a small thread pool and caches their results"""
+    
+    def __init__(self, conn, workers=REPORT_WORKERS, cache_size=REPORT_CACHE_SIZE):
+        self.conn = conn
+        self.cache_size = cache_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report')
+        self._cache = OrderedDict()  # (report, params, version) -> ReportResult
+        self._jobs = OrderedDict()   # job id -> ReportJob
+        self._lock = threading.Lock()
+    
+    def _cached(self, key):
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+            return result
+    
+    def cached(self, name, params):
+        """The cached result for the data as it is now, or None"""
+        report = REPORTS[name]
+        return self._cached((name, _params_key(params), data_version(self.conn, report.table)))
+    
+    def result(self, job_id, name, params):
+        """What job_id computed, if it was a finished run of name with params;
+        otherwise the cached result for the data as it is now, or None"""
+        job = self._jobs.get(job_id)
+        if job is not None and job.status == 'done' and job.report.name == name \
+                and job.params == _params_key(params):
+            return job.result
+        return self.cached(name, params)
+    
+    def is_current(self, result):
+        """Whether the data has not changed since result was computed"""
+        return result.version == data_version(self.conn, result.report.table)
+    
+    def submit(self, name, params):
+        """Start a report run, or return the run already in flight for the same report"""
+        report = REPORTS[name]
+        params = _params_key(params)
+        with self._lock:
+            for job in self._jobs.values():
+                if job.report is report and job.params == params and not job.finished:
+                    return job
+            job = ReportJob(report, params)
+            self._jobs[job.id] = job
+            while len(self._jobs) > REPORT_JOB_HISTORY:
+                oldest = next(iter(self._jobs.values()))
+                if not oldest.finished:
+                    break
+                self._jobs.popitem(last=False)
+        self._executor.submit(self._run, job)
+        return job
+    
+    def job(self, job_id):
+        return self._jobs.get(job_id)
+    
+    def _run(self, job):
+        report = job.report
+        started = perf_counter()
+        job.status = 'running'
+        try:
+            job.update(0.05, 'Taking a snapshot')
+            with self.conn.snapshot() as snapshot:
+                version = data_version(snapshot, report.table)
+                key = (report.name, job.params, version)
+                result = self._cached(key)
+                if result is None:
+                    frame = LOADERS[report.table](snapshot, dict(job.params), job)
+            if result is None:
+                job.update(0.85, f"Computing {report.title.lower()}")
+                table = report.build(frame, datetime.now())
+                result = ReportResult(report, job.params, version, table, len(frame),
+                                      perf_counter() - started)
+                with self._lock:
+                    self._cache[key] = result
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            job.result = result
+            job.status = 'done'
+            job.update(1.0, 'Done')
+        except Exception as e:
+            logger.exception("Report %s failed", report.name)
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job._done.set()
+    
+    def shutdown(self, wait=False):
+        """Drop queued reports; wait=True also waits for a running one"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    # Usage: python reports.py [db_path] [report] [days] - print a report as CSV
+    from connection_manager import ConnectionManager
+    from migrations import ensure_schema
+    from archive import ensure_archive
+    
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'suvidha_live.db'
+    name = sys.argv[2] if len(sys.argv) > 2 else 'department'
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+    
+    manager = ConnectionManager(db_path)
+    ensure_schema(manager)
+    ensure_archive(manager)
+    engine = ReportEngine(manager)
+    today = datetime.now().date()
+    job = engine.submit(name, {'start_date': today - timedelta(days=days), 'end_date': today})
+    job.wait()
+    engine.shutdown()
+    if job.error:
+        sys.exit(job.error)
+    print(job.result.to_csv(), end='')
+    print(f"# {job.result.rows_read:,} rows in {job.result.seconds:.2f}s", file=sys.stderr)
@@ -0,0 +1,251 @@
+# request_grid.py
+import sys
+import heapq
+from collections import OrderedDict
+from datetime import timedelta
+from itertools import islice, product
+
+# The admin grid over every service request in the hot table. Filtering,
+# sorting and paging all happen in SQLite, so a page costs the same at
+# 1,000 rows or 1,000,000:
+#
+# - Every sort is one direction over (sort columns..., id), so the next page
+#   starts after the previous page's last row with a row-value comparison
+#   (keyset pagination, as database.fetch_page does) instead of an OFFSET.
+# - Migration 012 adds an index for each common filter that ends in the sort
+#   column, so a page is a bounded index range scan. A filter with several
+#   values (two departments, say) would turn that range into a sort of every
+#   match; instead each combination of values is fetched as its own
+#   equality query and the sorted results are merged. Columns are split in
+#   FANOUT_COLUMNS order while the queries stay within MAX_FANOUT; the rest
+#   stay IN lists checked against the rows the index returns.
+# - Priorities are filtered through the priority_order column as well, which
+#   the indexes hold. The priority sort always splits on priority_order
+#   (there are only five), so each query is ordered by created_at alone.
+# - Totals come from the trigger-maintained request_counts table (per day,
+#   department, status and priority), so they are exact and cost a few
+#   hundred rows whatever the match count. Service type and pincode are not
+#   in the counters; with either filtered at most COUNT_CAP requests are
+#   read through the indexes, and a count past that is a lower bound.
+
+GRID_COLUMNS = ('request_id', 'user_id', 'department', 'service_type', 'status', 'priority',
+                'pincode', 'assigned_to', 'created_at', 'updated_at')
+FILTER_COLUMNS = ('department', 'service_type', 'status', 'priority', 'pincode')
+# Filters request_counts can answer
+COUNTED_COLUMNS = ('department', 'status', 'priority')
+
+REQUEST_STATUSES = ['Pending', 'In Progress', 'Completed', 'Rejected']
+OPEN_STATUSES = ['Pending', 'In Progress']
+REQUEST_PRIORITIES = ['Emergency', 'High', 'Medium', 'Low']
+# service_requests.priority_order of each priority; anything else is 4
+PRIORITY_ORDER = {priority: order for order, priority in enumerate(REQUEST_PRIORITIES)}
+OTHER_PRIORITY_ORDER = len(REQUEST_PRIORITIES)
+
+# name -> (label, key columns, direction)
+GRID_SORTS = OrderedDict([
+    ('newest', ("Newest first", ('created_at', 'id'), 'DESC')),
+    ('oldest', ("Oldest first", ('created_at', 'id'), 'ASC')),
+    ('priority', ("Most urgent first", ('priority_order', 'created_at', 'id'), 'ASC'))
+])
+
+DEFAULT_GRID_PAGE_SIZE = 50
+COUNT_CAP = 10_000
+MAX_FANOUT = 16
+# Split first on the columns the indexes lead with
+FANOUT_COLUMNS = ('priority_order', 'priority', 'status', 'department', 'pincode', 'service_type')
+
+
+def _add_condition(conditions, params, column, values):
+    if len(values) == 1:
+        conditions.append(f'{column} = ?')
+    else:
+        conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+    params.extend(values)
+
+
+def _where(filters, start_date, end_date):
+    """WHERE clause and parameters over service_requests"""
+    conditions = []
+    params = []
+    for column in FANOUT_COLUMNS:
+        values = filters.get(column)
+        if not values:
+            continue
+        if column == 'priority':
+            _add_condition(conditions, params, 'priority_order',
+                           sorted({PRIORITY_ORDER.get(value, OTHER_PRIORITY_ORDER) for value in values}))
+        _add_condition(conditions, params, column, values)
+    if start_date:
+        conditions.append('created_at >= ?')
+        params.append(start_date.strftime('%Y-%m-%d'))
+    if end_date:
+        conditions.append('created_at < ?')
+        params.append((end_date + timedelta(days=1)).strftime('%Y-%m-%d'))
+    return ' AND '.join(conditions) or '1', params
+
+
+def _fan_out(filters):
+    """Disjoint filter sets whose union is filters: one per combination of
+    values of the columns split, at most MAX_FANOUT of them"""
+    split = []
+    queries = 1
+    for column in FANOUT_COLUMNS:
+        values = filters.get(column)
+        if values and len(values) > 1 and queries * len(values) <= MAX_FANOUT:
+            split.append(column)
+            queries *= len(values)
+    return [dict(filters, **{column: [value] for column, value in zip(split, combination)})
+            for combination in product(*[filters[column] for column in split])]
+
+
+def _priority_order(filters):
+    """The priority_order every row matching filters has, or None if it varies"""
+    if filters.get('priority_order'):
+        orders = set(filters['priority_order'])
+    else:
+        orders = {PRIORITY_ORDER.get(value, OTHER_PRIORITY_ORDER) for value in filters.get('priority') or []}
+    return orders.pop() if len(orders) == 1 else None
+
+
+def _clean(filters):
+    return {column: list(dict.fromkeys(filters.get(column) or [])) for column in FILTER_COLUMNS}
+
+
+def fetch_grid_page(conn, filters=None, start_date=None, end_date=None, sort='newest', after=None,
+                    page_size=DEFAULT_GRID_PAGE_SIZE, columns=GRID_COLUMNS):
+    """One page of the request grid.
+    
+    filters maps FILTER_COLUMNS to lists of accepted values (empty or missing
+    means any); start_date and end_date bound created_at, inclusive. after is
+    the cursor returned with the previous page (None for the first page).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    label, keys, direction = GRID_SORTS[sort]
+    comparison = '<' if direction == 'DESC' else '>'
+    select = ', '.join(list(columns) + list(keys))
+    order = ', '.join(f'{key} {direction}' for key in keys)
+    
+    filters = _clean(filters or {})
+    if 'priority_order' in keys and not filters['priority']:
+        filters['priority_order'] = list(range(OTHER_PRIORITY_ORDER + 1))
+    
+    parts = []
+    for part in _fan_out(filters):
+        cursor_keys, cursor = keys, after
+        leading = _priority_order(part) if keys[0] == 'priority_order' else None
+        if after is not None and leading is not None:
+            # The part's rows share the leading key, which a row-value
+            # comparison starting with it would stop the index from using
+            if leading == after[0]:
+                cursor_keys, cursor = keys[1:], after[1:]
+            elif (leading < after[0]) == (direction == 'ASC'):
+                continue  # wholly before the cursor
+            else:
+                cursor = None
+        
+        where, params = _where(part, start_date, end_date)
+        sql = f'SELECT {select} FROM service_requests WHERE {where}'
+        if cursor is not None:
+            sql += f" AND ({', '.join(cursor_keys)}) {comparison} ({', '.join('?' * len(cursor_keys))})"
+            params.extend(cursor)
+        sql += f' ORDER BY {order} LIMIT ?'
+        # One extra row tells us whether another page exists
+        params.append(page_size + 1)
+        parts.append(conn.execute(sql, params).fetchall())
+    
+    if len(parts) <= 1:
+        rows = parts[0] if parts else []
+    else:
+        merged = heapq.merge(*parts, key=lambda row: row[-len(keys):], reverse=direction == 'DESC')
+        rows = list(islice(merged, page_size + 1))
+    
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = tuple(rows[-1][-len(keys):])
+    return [row[:len(columns)] for row in rows], next_cursor
+
+
+def count_grid_rows(conn, filters=None, start_date=None, end_date=None, cap=COUNT_CAP):
+    """Requests matching the grid's filters; returns (count, exact).
+    
+    Exact from request_counts unless a service type or pincode is filtered.
+    Then the first cap requests for the pincode (or, without one, matching
+    the counted filters) are checked against the remaining filters, and
+    when there were more the count is a lower bound with exact False.
+    """
+    filters = _clean(filters or {})
+    if not filters['pincode'] and not filters['service_type']:
+        conditions = []
+        params = []
+        for column in COUNTED_COLUMNS:
+            if filters[column]:
+                _add_condition(conditions, params, column, filters[column])
+        if start_date:
+            conditions.append('created_day >= ?')
+            params.append(start_date.strftime('%Y-%m-%d'))
+        if end_date:
+            conditions.append('created_day <= ?')
+            params.append(end_date.strftime('%Y-%m-%d'))
+        where = ' AND '.join(conditions) or '1'
+        count = conn.execute(f'SELECT COALESCE(SUM(requests), 0) FROM request_counts WHERE {where}',
+                             params).fetchone()[0]
+        return count, True
+    
+    if filters['pincode']:
+        read = {'pincode': filters['pincode']}
+    else:
+        read = {column: filters[column] for column in COUNTED_COLUMNS}
+    where, params = _where(read, start_date, end_date)
+    rest_where, rest_params = _where({column: values for column, values in filters.items()
+                                      if column not in read}, None, None)
+    checked, count = conn.execute(f'''
+        SELECT COUNT(*), COALESCE(SUM({rest_where}), 0)
+        FROM (SELECT department, service_type, status, priority, priority_order FROM service_requests
+              WHERE {where} LIMIT ?)
+    ''', rest_params + params + [cap + 1]).fetchone()
+    if checked > cap:
+        # The extra row may not have matched
+        return min(count, cap), False
+    return count, True
+
+
+def iter_matching_request_ids(conn, filters=None, start_date=None, end_date=None, batch_size=500):
+    """Every request_id matching the grid's filters, oldest first, batch_size at a time.
+    
+    Pages on created_at, which status changes leave alone, so requests the
+    caller moves out of the filter between batches are neither skipped nor
+    seen twice.
+    """
+    cursor = None
+    while True:
+        rows, cursor = fetch_grid_page(conn, filters, start_date, end_date, 'oldest', cursor,
+                                       batch_size, columns=('request_id',))
+        for (request_id,) in rows:
+            yield request_id
+        if cursor is None:
+            return
+
+
+if __name__ == "__main__":
+    # Usage: python request_grid.py [db_path] [sort] [department] - time the first pages
+    import time
+    from connection_manager import ConnectionManager
+    from migrations import ensure_schema
+    
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'suvidha_live.db'
+    sort = sys.argv[2] if len(sys.argv) > 2 else 'newest'
+    filters = {'department': sys.argv[3:]}
+    
+    manager = ConnectionManager(db_path)
+    ensure_schema(manager)
+    started = time.perf_counter()
+    count, exact = count_grid_rows(manager, filters)
+    print(f"{count:,}{'' if exact else '+'} rows ({(time.perf_counter() - started) * 1000:.1f} ms)")
+    cursor = None
+    for page in range(1, 4):
+        started = time.perf_counter()
+        rows, cursor = fetch_grid_page(manager, filters, sort=sort, after=cursor)
+        print(f"page {page}: {len(rows)} rows ({(time.perf_counter() - started) * 1000:.1f} ms)")
+        if cursor is None:
+            break
@@ -0,0 +1,169 @@
+# resources.py
+import atexit
+import threading
+import time
+
+# Streamlit re-executes the app script on every widget interaction, but
+# imported modules stay loaded. Expensive objects (database connections, SMS
+# clients, catalogs) therefore live in this process-wide registry instead of
+# on the app object, and reruns only pay for rendering.
+
+# How often a resource's health check runs, at most
+HEALTH_CHECK_INTERVAL_SECONDS = 30
+
+
+class _Entry:
+    """A registered resource: how to build, check and release it"""
+    
+    def __init__(self, factory, health_check=None, teardown=None, depends_on=()):
+        self.factory = factory
+        self.health_check = health_check
+        self.teardown = teardown
+        self.depends_on = tuple(depends_on)
+        self.value = None
+        self.built = False
+        self.built_at = None
+        self.build_seconds = None
+        self.checked_at = 0.0
+        self.last_error = None
+
+
+class ResourceRegistry:
+    """Named, lazily built, process-wide singletons.
+    
+    register(name, factory, health_check, teardown, depends_on) declares a
+    resource; registering an existing name again is a no-op, so app scripts
+    can register on every rerun. get(name) builds the resource on first use.
+    Every HEALTH_CHECK_INTERVAL_SECONDS, get() calls health_check(value);
+    a False result or an exception tears the resource down and rebuilds it.
+    Resources listing it in depends_on hold on to its value, so they are
+    torn down first and rebuilt against the new value on their next get().
+    close() tears everything down and runs at interpreter exit.
+    """
+    
+    def __init__(self, health_check_interval=HEALTH_CHECK_INTERVAL_SECONDS):
+        self.health_check_interval = health_check_interval
+        self._entries = {}
+        self._lock = threading.RLock()
+    
+    def register(self, name, factory, health_check=None, teardown=None, depends_on=()):
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(factory, health_check, teardown, depends_on)
+    
+    def is_registered(self, name):
+        return name in self._entries
+    
+    def _build(self, entry):
+        started = time.perf_counter()
+        entry.value = entry.factory()
+        entry.build_seconds = time.perf_counter() - started
+        entry.built = True
+        entry.built_at = time.time()
+        entry.checked_at = time.monotonic()
+        entry.last_error = None
+    
+    def _release(self, name):
+        entry = self._entries[name]
+        # Stop the dependents while the value they hold still works
+        for other_name, other in reversed(list(self._entries.items())):
+            if other.built and name in other.depends_on:
+                self._release(other_name)
+        value, entry.value, entry.built = entry.value, None, False
+        if entry.teardown is not None and value is not None:
+            try:
+                entry.teardown(value)
+            except Exception as e:
+                entry.last_error = f"teardown failed: {e}"
+    
+    def _healthy(self, entry):
+        try:
+            return entry.health_check(entry.value) is not False
+        except Exception as e:
+            entry.last_error = str(e)
+            return False
+    
+    def get(self, name, factory=None, health_check=None, teardown=None):
+        """The resource called name, built (or rebuilt) if needed.
+        
+        factory/health_check/teardown register the resource on first use.
+        A factory that raises leaves nothing cached, so the next get() retries.
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            if factory is None:
+                raise KeyError(f"Unknown resource '{name}'")
+            self.register(name, factory, health_check, teardown)
+            entry = self._entries[name]
+        
+        # Fast path: built and not due for a health check
+        if entry.built and (entry.health_check is None or
+                            time.monotonic() - entry.checked_at < self.health_check_interval):
+            return entry.value
+        
+        with self._lock:
+            if entry.built and entry.health_check is not None and \
+                    time.monotonic() - entry.checked_at >= self.health_check_interval:
+                if self._healthy(entry):
+                    entry.checked_at = time.monotonic()
+                else:
+                    self._release(name)
+            if not entry.built:
+                try:
+                    self._build(entry)
+                except Exception as e:
+                    entry.last_error = str(e)
+                    raise
+            return entry.value
+    
+    def check_health(self):
+        """Run every health check now; returns {name: status dict}"""
+        report = {}
+        with self._lock:
+            for name, entry in self._entries.items():
+                healthy = None
+                if entry.built and entry.health_check is not None:
+                    healthy = self._healthy(entry)
+                    entry.checked_at = time.monotonic()
+                report[name] = {
+                    'built': entry.built,
+                    'healthy': healthy,
+                    'build_seconds': entry.build_seconds,
+                    'built_at': entry.built_at,
+                    'last_error': entry.last_error
+                }
+        return report
+    
+    def release(self, name):
+        """Tear one resource down; it is rebuilt on the next get()"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry.built:
+                self._release(name)
+    
+    def close(self):
+        """Tear every built resource down, newest first"""
+        with self._lock:
+            for name, entry in reversed(list(self._entries.items())):
+                if entry.built:
+                    self._release(name)
+
+
+registry = ResourceRegistry()
+atexit.register(registry.close)
+
+
+def register(name, factory, health_check=None, teardown=None, depends_on=()):
+    """Register a resource on the process-wide registry"""
+    registry.register(name, factory, health_check, teardown, depends_on)
+
+
+def get_resource(name, factory=None, health_check=None, teardown=None):
+    """Get a resource from the process-wide registry"""
+    return registry.get(name, factory, health_check, teardown)
+
+
+def check_connection(conn):
+    """Health check for sqlite connections and ConnectionManagers"""
+    conn.execute('SELECT 1').fetchone()
+    return True
@@ -0,0 +1,191 @@
+# rollups.py
+import sys
+from datetime import datetime
+from archive import ARCHIVE_SCHEMA, is_archive_attached
+
+# daily_rollups holds one row of counters per day. Triggers created by
+# migration 003 keep it current on every insert/update of service_requests,
+# payments and users, so dashboards read O(days) rows instead of rescanning
+# the base tables. Deletes are deliberately not subtracted: archiving old
+# requests must not rewrite history. active_users likewise only grows; a
+# rebuild recomputes it exactly.
+#
+# Requests, ratings and resolution times are bucketed by the request's
+# created_at day, payments by the payment's created_at day and new users by
+# the user's created_at day, matching the old get_daily_metrics queries.
+
+ROLLUP_COLUMNS = [
+    'metric_date', 'total_requests', 'pending_requests', 'in_progress_requests',
+    'completed_requests', 'rejected_requests', 'rating_sum', 'rating_count',
+    'resolution_days_sum', 'resolution_count', 'payment_count', 'payment_amount',
+    'new_users', 'active_users'
+]
+
+
+def _date_filter(column, start, end):
+    """WHERE clause and params restricting a 'YYYY-MM-DD' column to [start, end]"""
+    clauses = []
+    params = []
+    if start is not None:
+        clauses.append(f'{column} >= ?')
+        params.append(str(start))
+    if end is not None:
+        clauses.append(f'{column} <= ?')
+        params.append(str(end))
+    return (' AND '.join(clauses) or '1'), params
+
+
+def _requests_source(cursor, day_column):
+    """service_requests plus archived requests, which the rollups still count"""
+    if day_column != 'created_day' or not is_archive_attached(cursor):
+        return 'service_requests'
+    columns = 'created_at, status, feedback_rating, actual_completion, user_id'
+    return f'''(
+        SELECT {columns}, created_day FROM main.service_requests
+        UNION ALL
+        SELECT {columns}, substr(created_at, 1, 10) FROM {ARCHIVE_SCHEMA}.service_requests
+    )'''
+
+
+def backfill_daily_rollups(cursor, start=None, end=None, day_column=None):
+    """Recompute daily_rollups from the base tables for days in [start, end].
+
+    Runs on the caller's cursor so it can be part of a migration or a larger
+    transaction. With no bounds every day is rebuilt. day_column is the day
+    bucket of service_requests, payments and users: the indexed created_day
+    columns once migration 004 has added them, DATE(created_at) before.
+    """
+    if day_column is None:
+        cursor.execute('PRAGMA table_xinfo(service_requests)')
+        has_day = any(row[1] == 'created_day' for row in cursor.fetchall())
+        day_column = 'created_day' if has_day else 'DATE(created_at)'
+    where, params = _date_filter('metric_date', start, end)
+    cursor.execute(f'DELETE FROM daily_rollups WHERE {where}', params)
+    cursor.execute(f'DELETE FROM daily_active_users WHERE {where}', params)
+
+    where, params = _date_filter(day_column, start, end)
+    requests = _requests_source(cursor, day_column)
+    cursor.execute(f'''
+        INSERT INTO daily_rollups
+        (metric_date, total_requests, pending_requests, in_progress_requests,
+         completed_requests, rejected_requests, rating_sum, rating_count,
+         resolution_days_sum, resolution_count)
+        SELECT {day_column},
+               COUNT(*),
+               SUM(status IS 'Pending'),
+               SUM(status IS 'In Progress'),
+               SUM(status IS 'Completed'),
+               SUM(status IS 'Rejected'),
+               COALESCE(SUM(feedback_rating), 0),
+               COUNT(feedback_rating),
+               COALESCE(SUM(julianday(actual_completion) - julianday(created_at)), 0),
+               COUNT(julianday(actual_completion) - julianday(created_at))
+        FROM {requests}
+        WHERE created_at IS NOT NULL AND {where}
+        GROUP BY {day_column}
+    ''', params)
+
+    # Each new (day, user) pair bumps active_users through its trigger
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO daily_active_users (metric_date, user_id)
+        SELECT DISTINCT {day_column}, user_id
+        FROM {requests}
+        WHERE created_at IS NOT NULL AND user_id IS NOT NULL AND {where}
+    ''', params)
+
+    cursor.execute(f'''
+        INSERT INTO daily_rollups (metric_date, payment_count, payment_amount)
+        SELECT {day_column}, COUNT(*), COALESCE(SUM(amount), 0)
+        FROM payments
+        WHERE created_at IS NOT NULL AND status = 'Completed' AND {where}
+        GROUP BY {day_column}
+        ON CONFLICT(metric_date) DO UPDATE SET
+            payment_count = excluded.payment_count,
+            payment_amount = excluded.payment_amount
+    ''', params)
+
+    cursor.execute(f'''
+        INSERT INTO daily_rollups (metric_date, new_users)
+        SELECT {day_column}, COUNT(*)
+        FROM users
+        WHERE created_at IS NOT NULL AND {where}
+        GROUP BY {day_column}
+        ON CONFLICT(metric_date) DO UPDATE SET
+            new_users = excluded.new_users
+    ''', params)
+
+
+def rebuild_daily_rollups(conn, start=None, end=None):
+    """Rebuild daily_rollups for [start, end] in one transaction"""
+    with conn.transaction() as tx:
+        backfill_daily_rollups(tx.cursor(), start, end)
+
+
+def get_daily_rollups(conn, start=None, end=None):
+    """Rollup rows (as dicts) for each day in [start, end] that has activity"""
+    where, params = _date_filter('metric_date', start, end)
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT {', '.join(ROLLUP_COLUMNS)}
+        FROM daily_rollups
+        WHERE {where}
+        ORDER BY metric_date
+    ''', params)
+    return [dict(zip(ROLLUP_COLUMNS, row)) for row in cursor.fetchall()]
+
+
+def summarize_rollups(conn, start=None, end=None):
+    """Totals and averages across the days in [start, end]"""
+    where, params = _date_filter('metric_date', start, end)
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT COALESCE(SUM(total_requests), 0),
+               COALESCE(SUM(pending_requests), 0),
+               COALESCE(SUM(in_progress_requests), 0),
+               COALESCE(SUM(completed_requests), 0),
+               COALESCE(SUM(rejected_requests), 0),
+               COALESCE(SUM(rating_sum), 0),
+               COALESCE(SUM(rating_count), 0),
+               COALESCE(SUM(resolution_days_sum), 0),
+               COALESCE(SUM(resolution_count), 0),
+               COALESCE(SUM(payment_count), 0),
+               COALESCE(SUM(payment_amount), 0),
+               COALESCE(SUM(new_users), 0)
+        FROM daily_rollups
+        WHERE {where}
+    ''', params)
+    (total, pending, in_progress, completed, rejected, rating_sum, rating_count,
+     resolution_sum, resolution_count, payment_count, payment_amount,
+     new_users) = cursor.fetchone()
+
+    return {
+        'total_requests': total,
+        'pending_requests': pending,
+        'in_progress_requests': in_progress,
+        'completed_requests': completed,
+        'rejected_requests': rejected,
+        'avg_rating': rating_sum / rating_count if rating_count else None,
+        'rating_count': rating_count,
+        'avg_resolution_days': resolution_sum / resolution_count if resolution_count else None,
+        'payment_count': payment_count,
+        'payment_amount': payment_amount,
+        'avg_payment_amount': payment_amount / payment_count if payment_count else None,
+        'new_users': new_users
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python rollups.py [db_path] [start_date] [end_date]
+    from connection_manager import ConnectionManager
+    from migrations import ensure_schema
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'suvidha_live.db'
+    start = sys.argv[2] if len(sys.argv) > 2 else None
+    end = sys.argv[3] if len(sys.argv) > 3 else None
+
+    manager = ConnectionManager(db_path)
+    ensure_schema(manager)
+    started = datetime.now()
+    rebuild_daily_rollups(manager, start, end)
+    days = len(get_daily_rollups(manager, start, end))
+    print(f"Rebuilt {days} day(s) of rollups in {(datetime.now() - started).total_seconds():.2f}s")
@@ -0,0 +1,277 @@
+# scheduler.py
+import os
+import sys
+import json
+import math
+import uuid
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta, time
+from time import perf_counter
+
+# A small in-process job scheduler. Each server process runs one Scheduler
+# thread (it lives in the resource registry). Jobs are due on aligned slots,
+# like cron's */N: a job every 15 minutes runs at :00, :15, :30 and :45,
+# whichever process gets there first.
+#
+# scheduler_leases holds one row per job with its next due time. A worker
+# claims a due job by taking its lease in a write transaction, so only one
+# worker runs it even when several processes share the database. A worker
+# that dies mid-run leaves a lease that simply expires. Every run is logged
+# in scheduler_runs.
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# How often the scheduler thread looks for due jobs
+DEFAULT_TICK_SECONDS = 30
+DEFAULT_LEASE_SECONDS = 10 * MINUTE
+# Runs kept in scheduler_runs per job
+RUN_HISTORY_PER_JOB = 100
+
+RUN_COLUMNS = ['id', 'job_name', 'owner', 'triggered_by', 'status', 'started_at', 'finished_at',
+               'duration_ms', 'result', 'error']
+
+
+class Job:
+    """A named maintenance task: func(conn) -> JSON-serializable result.
+    
+    every is the period in seconds; it must divide a day or be a whole
+    number of days. Slots are aligned to local midnight (to day numbers for
+    multi-day periods) and shifted by offset seconds. run_on_start makes a
+    job that has never run due immediately instead of at its next slot.
+    """
+    
+    def __init__(self, name, func, every, offset=0, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 run_on_start=False, description=None):
+        if every <= 0 or (every < DAY and DAY % every) or (every > DAY and every % DAY):
+            raise ValueError(f"Job '{name}': every must divide a day or be a whole number of days")
+        self.name = name
+        self.func = func
+        self.every = every
+        self.offset = offset
+        self.lease_seconds = lease_seconds
+        self.run_on_start = run_on_start
+        self.description = description or (func.__doc__ or '').strip().split('\n')[0]
+    
+    def next_run_after(self, moment):
+        """The first slot strictly after moment"""
+        anchor = datetime.combine(moment.date(), time())
+        if self.every > DAY:
+            anchor -= timedelta(days=moment.toordinal() % (self.every // DAY))
+        anchor += timedelta(seconds=self.offset)
+        slots = math.floor((moment - anchor).total_seconds() / self.every) + 1
+        return anchor + timedelta(seconds=slots * self.every)
+
+
+def default_owner():
+    """Identifies this process in leases and run history"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class Scheduler:
+    """Runs registered Jobs on a daemon thread, one worker per job at a time"""
+    
+    def __init__(self, conn, jobs=(), tick_seconds=DEFAULT_TICK_SECONDS, owner=None):
+        self.conn = conn
+        self.jobs = {}
+        self.tick_seconds = tick_seconds
+        self.owner = owner or default_owner()
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+        for job in jobs:
+            self.add(job)
+    
+    def add(self, job):
+        self.jobs[job.name] = job
+        return job
+    
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+    
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception('Scheduler tick failed')
+            self._stop.wait(self.tick_seconds)
+    
+    def _ensure_leases(self, cursor, now):
+        """Give jobs that have never been scheduled their first due time"""
+        cursor.executemany('''
+            INSERT OR IGNORE INTO scheduler_leases (job_name, next_run_at)
+            VALUES (?, ?)
+        ''', [(job.name, now if job.run_on_start else job.next_run_after(now))
+              for job in self.jobs.values()])
+    
+    def run_pending(self):
+        """Run every due job whose lease this worker can take; returns their names"""
+        now = datetime.now()
+        with self.conn.transaction() as tx:
+            self._ensure_leases(tx.cursor(), now)
+        
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT job_name FROM scheduler_leases
+            WHERE next_run_at <= ? AND (lease_expires_at IS NULL OR lease_expires_at <= ?)
+        ''', (now, now))
+        ran = []
+        for (name,) in cursor.fetchall():
+            job = self.jobs.get(name)
+            if job is not None and self._acquire(job, force=False):
+                self._run(job, 'schedule')
+                ran.append(name)
+        return ran
+    
+    def run_now(self, name):
+        """Run a job on the calling thread, ahead of schedule.
+        
+        Returns the run's history row, or None if another worker holds the lease.
+        """
+        job = self.jobs[name]
+        with self.conn.transaction() as tx:
+            self._ensure_leases(tx.cursor(), datetime.now())
+        if not self._acquire(job, force=True):
+            return None
+        return self._run(job, 'manual')
+    
+    def _acquire(self, job, force):
+        now = datetime.now()
+        with self.conn.transaction() as tx:
+            cursor = tx.cursor()
+            cursor.execute(f'''
+                UPDATE scheduler_leases
+                SET owner = ?, lease_expires_at = ?
+                WHERE job_name = ?
+                AND (lease_expires_at IS NULL OR lease_expires_at <= ?)
+                {'' if force else 'AND next_run_at <= ?'}
+            ''', (self.owner, now + timedelta(seconds=job.lease_seconds), job.name, now)
+                 + (() if force else (now,)))
+            return cursor.rowcount == 1
+    
+    def _run(self, job, trigger):
+        started_at = datetime.now()
+        with self.conn.transaction() as tx:
+            cursor = tx.cursor()
+            cursor.execute('''
+                INSERT INTO scheduler_runs (job_name, owner, triggered_by, status, started_at)
+                VALUES (?, ?, ?, 'running', ?)
+            ''', (job.name, self.owner, trigger, started_at))
+            run_id = cursor.lastrowid
+        
+        started = perf_counter()
+        result = error = None
+        try:
+            result = job.func(self.conn)
+            status = 'success'
+        except Exception as e:
+            status = 'failed'
+            error = f"{type(e).__name__}: {e}"
+            logger.exception("Scheduled job '%s' failed", job.name)
+        duration_ms = (perf_counter() - started) * 1000
+        finished_at = datetime.now()
+        
+        with self.conn.transaction() as tx:
+            cursor = tx.cursor()
+            cursor.execute('''
+                UPDATE scheduler_runs
+                SET status = ?, finished_at = ?, duration_ms = ?, result = ?, error = ?
+                WHERE id = ?
+            ''', (status, finished_at, duration_ms,
+                  json.dumps(result, default=str) if result is not None else None, error, run_id))
+            # A manual run does not move the schedule
+            next_run_at = job.next_run_after(finished_at) if trigger == 'schedule' else None
+            cursor.execute('''
+                UPDATE scheduler_leases
+                SET owner = NULL, lease_expires_at = NULL, last_run_at = ?, last_status = ?,
+                    next_run_at = COALESCE(?, next_run_at)
+                WHERE job_name = ? AND owner = ?
+            ''', (finished_at, status, next_run_at, job.name, self.owner))
+            cursor.execute('''
+                DELETE FROM scheduler_runs
+                WHERE job_name = ? AND id <= (
+                    SELECT id FROM scheduler_runs WHERE job_name = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+            ''', (job.name, job.name, RUN_HISTORY_PER_JOB))
+        
+        return {
+            'id': run_id, 'job_name': job.name, 'owner': self.owner, 'triggered_by': trigger,
+            'status': status, 'started_at': started_at, 'finished_at': finished_at,
+            'duration_ms': duration_ms, 'result': result, 'error': error
+        }
+    
+    def job_status(self):
+        """One dict per registered job: schedule, lease and last run"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT job_name, next_run_at, owner, lease_expires_at, last_run_at, last_status
+            FROM scheduler_leases
+        ''')
+        leases = {row[0]: row[1:] for row in cursor.fetchall()}
+        status = []
+        for job in self.jobs.values():
+            next_run_at, owner, lease_expires_at, last_run_at, last_status = \
+                leases.get(job.name, (None, None, None, None, None))
+            status.append({
+                'job': job.name,
+                'description': job.description,
+                'every_minutes': job.every / MINUTE,
+                'next_run_at': next_run_at,
+                'running_on': owner,
+                'last_run_at': last_run_at,
+                'last_status': last_status
+            })
+        return status
+    
+    def recent_runs(self, limit=20, job_name=None):
+        """Latest scheduler_runs rows as dicts, newest first"""
+        where = 'WHERE job_name = ?' if job_name else ''
+        params = ([job_name] if job_name else []) + [limit]
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+            SELECT {', '.join(RUN_COLUMNS)} FROM scheduler_runs
+            {where}
+            ORDER BY id DESC LIMIT ?
+        ''', params)
+        return [dict(zip(RUN_COLUMNS, row)) for row in cursor.fetchall()]
+
+
+if __name__ == "__main__":
+    # Usage: python scheduler.py [db_path] [job_name] - run one job now, or list jobs
+    from connection_manager import ConnectionManager
+    from migrations import ensure_schema
+    from maintenance_jobs import default_jobs
+    
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'suvidha_live.db'
+    manager = ConnectionManager(db_path)
+    ensure_schema(manager)
+    scheduler = Scheduler(manager, default_jobs())
+    
+    if len(sys.argv) > 2:
+        run = scheduler.run_now(sys.argv[2])
+        if run is None:
+            print(f"{sys.argv[2]} is running on another worker")
+        else:
+            print(f"{run['job_name']}: {run['status']} in {run['duration_ms']:.0f} ms "
+                  f"{run['error'] or json.dumps(run['result'], default=str)}")
+    else:
+        for job in scheduler.job_status():
+            print(f"{job['job']:<24} every {job['every_minutes']:>6.0f} min  next {job['next_run_at']}  "
+                  f"last {job['last_run_at']} ({job['last_status']})")
@@ -0,0 +1,6 @@
+# sla.py
+
+# Days allowed to resolve a request, by priority. Kept apart from reports.py
+# so auto-assignment can date its estimates without loading pandas.
+SLA_TARGET_DAYS = {'Emergency': 1, 'High': 3, 'Medium': 5, 'Low': 10}
+DEFAULT_SLA_TARGET_DAYS = SLA_TARGET_DAYS['Medium']
@@ -0,0 +1,165 @@
+# status_transitions.py
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+
+# Status changes for many service requests at once, e.g. closing every
+# "Power Outage" request for an area once the outage is fixed. Requests are
+# handled TRANSITION_CHUNK_SIZE at a time, each chunk in one write
+# transaction: the current statuses are read and checked against
+# ALLOWED_TRANSITIONS, then the updates, history rows and citizen
+# notifications are written with one executemany() each. A request that
+# cannot move is reported with its reason and does not hold up the rest.
+# Archived requests are closed and are not touched.
+
+# status -> statuses a request may move to from it
+ALLOWED_TRANSITIONS = {
+    'Pending': ('In Progress', 'Completed', 'Rejected'),
+    'In Progress': ('Pending', 'Completed', 'Rejected'),
+    'Completed': (),
+    'Rejected': ()
+}
+
+# Requests per transaction. Bigger chunks spread each WAL checkpoint over
+# more rows but hold the write lock for longer (about 0.3s at this size).
+TRANSITION_CHUNK_SIZE = 1000
+# Requests looked up per IN list, under SQLite's 999-parameter limit on
+# older builds
+LOOKUP_BATCH_SIZE = 500
+# Failed requests listed by summarize_failures(); the rest are only counted
+FAILURE_SAMPLE_SIZE = 100
+
+
+def _batches(items, size):
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def can_transition(current, status):
+    return status in ALLOWED_TRANSITIONS.get(current, ())
+
+
+def status_notification(request_id, status, comments=""):
+    """Title and message telling a citizen their request changed status"""
+    message = f"Your service request {request_id} is now {status}"
+    if comments:
+        message += f": {comments}"
+    return 'Request Status Updated', message
+
+
+def _transition_chunk(cursor, request_ids, status, comments, updated_by, notify, failures):
+    """Move one chunk of requests to status; returns how many moved"""
+    found = {}
+    for batch in _batches(request_ids, LOOKUP_BATCH_SIZE):
+        cursor.execute(f'''
+            SELECT request_id, status, user_id FROM service_requests
+            WHERE request_id IN ({', '.join('?' * len(batch))})
+        ''', batch)
+        found.update((request_id, (current, user_id)) for request_id, current, user_id in cursor.fetchall())
+    
+    moved = []
+    for request_id in request_ids:
+        if request_id not in found:
+            failures[request_id] = "Not found (or archived)"
+            continue
+        current, user_id = found[request_id]
+        if current == status:
+            failures[request_id] = f"Already {status}"
+        elif not can_transition(current, status):
+            failures[request_id] = f"Cannot move from {current} to {status}"
+        else:
+            moved.append((request_id, user_id))
+    if not moved:
+        return 0
+    
+    now = datetime.now()
+    completed_at = now if status == 'Completed' else None
+    cursor.executemany('''
+        UPDATE service_requests
+        SET status=?, updated_at=?, actual_completion=COALESCE(?, actual_completion)
+        WHERE request_id=?
+    ''', [(status, now, completed_at, request_id) for request_id, user_id in moved])
+    cursor.executemany('''
+        INSERT INTO request_status_history
+        (request_id, status, comments, updated_by, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(request_id, status, comments, updated_by, now) for request_id, user_id in moved])
+    if notify:
+        cursor.executemany('''
+            INSERT INTO notifications (user_id, notification_type, title, message, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(user_id, 'status_update', *status_notification(request_id, status, comments), now)
+              for request_id, user_id in moved if user_id is not None])
+    return len(moved)
+
+
+def transition_requests(conn, request_ids, status, comments="", updated_by="System", notify=True,
+                        chunk_size=TRANSITION_CHUNK_SIZE, progress=None):
+    """Move every request in request_ids (any iterable, even a generator) to status.
+    
+    Returns throughput stats like the bulk ingestion methods (rows, chunks,
+    seconds, rows_per_second) plus updated, the number moved, and failures,
+    request_id -> reason for each one that was not. progress(rows, updated)
+    is called after each chunk commits.
+    """
+    if status not in ALLOWED_TRANSITIONS:
+        raise ValueError(f"Unknown status '{status}'")
+    
+    total_rows = 0
+    chunks = 0
+    updated = 0
+    failures = {}
+    seen = set()
+    started = time.perf_counter()
+    
+    unique_ids = (request_id for request_id in request_ids
+                  if not (request_id in seen or seen.add(request_id)))
+    for chunk in _batches(unique_ids, chunk_size):
+        with conn.transaction() as tx:
+            updated += _transition_chunk(tx.cursor(), chunk, status, comments, updated_by, notify, failures)
+        total_rows += len(chunk)
+        chunks += 1
+        if progress:
+            progress(total_rows, updated)
+    
+    seconds = time.perf_counter() - started
+    return {
+        'rows': total_rows,
+        'chunks': chunks,
+        'seconds': seconds,
+        'rows_per_second': total_rows / seconds if seconds > 0 else 0.0,
+        'updated': updated,
+        'failures': failures
+    }
+
+
+def summarize_failures(failures, sample_size=FAILURE_SAMPLE_SIZE):
+    """[(reason, requests)], most common first, and up to sample_size
+    [(request_id, reason)] from transition_requests()' failures"""
+    by_reason = Counter(failures.values()).most_common()
+    return by_reason, list(islice(failures.items(), sample_size))
+
+
+if __name__ == "__main__":
+    # Usage: python status_transitions.py db_path status department [service_type [pincode]]
+    # - move matching open requests to status
+    from connection_manager import ConnectionManager
+    from migrations import ensure_schema
+    from request_grid import iter_matching_request_ids, OPEN_STATUSES
+    
+    db_path, status, department = sys.argv[1:4]
+    filters = {'department': [department], 'service_type': sys.argv[4:5], 'pincode': sys.argv[5:6],
+               'status': OPEN_STATUSES}
+    
+    manager = ConnectionManager(db_path)
+    ensure_schema(manager)
+    request_ids = iter_matching_request_ids(manager, filters, batch_size=LOOKUP_BATCH_SIZE)
+    result = transition_requests(manager, request_ids, status, "Bulk update", "Admin")
+    print(f"{result['updated']:,} of {result['rows']:,} moved to {status} in {result['seconds']:.2f}s "
+          f"({result['rows_per_second']:,.0f} rows/s), {len(result['failures']):,} failed")
@@ -0,0 +1,142 @@
+# storage.py
+import os
+import sys
+import logging
+from datetime import datetime
+
+# storage_usage keeps running file and byte counts per storage area, so the
+# admin dashboard reads them with one query instead of walking the uploads
+# folder. Writers record deltas in the same transaction as the documents rows
+# they add or remove (UnitOfWork.add_document / remove_document), so the
+# counters move exactly when the rows commit.
+#
+# Files written or removed behind the app's back show up as drift, which the
+# reconcile_storage scheduler job (maintenance_jobs.py) fixes by walking the
+# folder periodically. Archiving
+# moves document rows, not files, so it leaves the counters alone.
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_AREA = 'uploads'
+DATABASE_AREA = 'database'
+DEFAULT_UPLOADS_DIR = 'uploads'
+
+STORAGE_COLUMNS = ['area', 'file_count', 'byte_count', 'drift_files', 'drift_bytes',
+                   'updated_at', 'reconciled_at']
+
+
+def record_usage(cursor, area, files, size):
+    """Add files and size bytes (negative to remove) to an area's counters"""
+    cursor.execute('''
+        INSERT INTO storage_usage (area, file_count, byte_count, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(area) DO UPDATE SET
+            file_count = file_count + excluded.file_count,
+            byte_count = byte_count + excluded.byte_count,
+            updated_at = excluded.updated_at
+    ''', (area, files, size, datetime.now()))
+
+
+def get_storage_usage(conn):
+    """{area: counters dict} for every area that has been recorded or reconciled"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(STORAGE_COLUMNS)} FROM storage_usage")
+    return {row[0]: dict(zip(STORAGE_COLUMNS, row)) for row in cursor.fetchall()}
+
+
+def scan_directory(path):
+    """(file count, total bytes) of every regular file under path"""
+    files = 0
+    size = 0
+    pending = [path]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        files += 1
+                        size += entry.stat(follow_symlinks=False).st_size
+                except FileNotFoundError:
+                    # Deleted while we were walking
+                    continue
+    return files, size
+
+
+def database_size(db_path):
+    """Bytes on disk for a SQLite database, including its WAL"""
+    size = 0
+    for path in (db_path, db_path + '-wal'):
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            pass
+    return size
+
+
+def _area_counts(cursor, area):
+    cursor.execute('SELECT file_count, byte_count FROM storage_usage WHERE area = ?', (area,))
+    return cursor.fetchone() or (0, 0)
+
+
+def reconcile_storage(conn, uploads_dir=DEFAULT_UPLOADS_DIR):
+    """Reset the counters from disk and record how far they had drifted.
+    
+    The walk runs outside any transaction. Deltas that writers record while
+    it runs are carried over, so an upload committed mid-walk is not lost;
+    one that lands on disk mid-walk may be counted twice until the next run.
+    """
+    started_files, started_bytes = _area_counts(conn.cursor(), UPLOADS_AREA)
+    files, size = scan_directory(uploads_dir)
+    db_bytes = database_size(conn.db_name)
+    now = datetime.now()
+    
+    with conn.transaction() as tx:
+        cursor = tx.cursor()
+        current_files, current_bytes = _area_counts(cursor, UPLOADS_AREA)
+        files += current_files - started_files
+        size += current_bytes - started_bytes
+        drift_files = current_files - files
+        drift_bytes = current_bytes - size
+        for area, area_files, area_bytes, area_drift_files, area_drift_bytes in (
+                (UPLOADS_AREA, files, size, drift_files, drift_bytes),
+                (DATABASE_AREA, 1, db_bytes, 0, 0)):
+            cursor.execute('''
+                INSERT INTO storage_usage
+                (area, file_count, byte_count, drift_files, drift_bytes, updated_at, reconciled_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(area) DO UPDATE SET
+                    file_count = excluded.file_count,
+                    byte_count = excluded.byte_count,
+                    drift_files = excluded.drift_files,
+                    drift_bytes = excluded.drift_bytes,
+                    updated_at = excluded.updated_at,
+                    reconciled_at = excluded.reconciled_at
+            ''', (area, area_files, area_bytes, area_drift_files, area_drift_bytes, now, now))
+    
+    if drift_files or drift_bytes:
+        logger.info('Storage counters for %s were off by %d file(s), %d byte(s)',
+                    uploads_dir, drift_files, drift_bytes)
+    return {'files': files, 'bytes': size, 'drift_files': drift_files,
+            'drift_bytes': drift_bytes, 'database_bytes': db_bytes}
+
+
+if __name__ == "__main__":
+    # Usage: python storage.py [db_path] [uploads_dir] - reconcile once
+    from connection_manager import ConnectionManager
+    from migrations import ensure_schema
+    
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'suvidha_live.db'
+    uploads_dir = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_UPLOADS_DIR
+    
+    manager = ConnectionManager(db_path)
+    ensure_schema(manager)
+    result = reconcile_storage(manager, uploads_dir)
+    print(f"{result['files']} file(s), {result['bytes'] / (1024 * 1024):.2f} MB in {uploads_dir} "
+          f"(drift {result['drift_files']} file(s), {result['drift_bytes']} byte(s)); "
+          f"database {result['database_bytes'] / (1024 * 1024):.2f} MB")
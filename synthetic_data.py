@@ -0,0 +1,306 @@
+# synthetic_data.py
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from database import ComprehensiveDatabase, DEFAULT_BULK_CHUNK_SIZE
+from id_generator import new_id
+
+# Named scales: number of service requests. Citizens are a tenth of that, so
+# '10M' means 10M requests from 1M citizens.
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1M': 1_000_000,
+    '10M': 10_000_000,
+}
+REQUESTS_PER_USER = 10
+PAYMENTS_PER_USER = 3
+DOCUMENT_RATE = 0.3  # share of requests with a supporting document
+
+# Same department and service names the kiosk stores
+DEPARTMENTS = {
+    "⚡ Electricity Department": ["Power Outage", "New Connection", "Bill Issue", "Meter Complaint", "Safety Inspection"],
+    "💧 Water Department": ["No Water Supply", "Water Quality Issue", "New Connection", "Pipeline Leakage", "Bill Payment"],
+    "🔥 Gas Department": ["Gas Leak Complaint", "New Connection", "Safety Inspection", "Appliance Service", "Bill Payment"],
+    "🗑️ Waste Management": ["Garbage Not Collected", "Sanitation Complaint", "Recycling Information", "Illegal Dumping", "Composting Request"]
+}
+DEPARTMENT_NAMES = list(DEPARTMENTS)
+DEPARTMENT_WEIGHTS = [35, 30, 15, 20]
+BILL_TYPES = ['Electricity', 'Water', 'Gas', 'Property Tax']
+PAYMENT_METHODS = ['UPI', 'Card', 'Net Banking', 'Cash']
+PRIORITIES = ['Low', 'Medium', 'High', 'Emergency']
+PRIORITY_WEIGHTS = [25, 50, 20, 5]
+LANGUAGES = ['en', 'hi', 'mr', 'ta']
+LANGUAGE_WEIGHTS = [45, 30, 15, 10]
+DOCUMENT_TYPES = ['Supporting Document', 'ID Proof', 'Address Proof', 'Photo', 'Bill Copy']
+OFFICERS = ['Ward Officer', 'Field Team A', 'Field Team B', 'Junior Engineer', 'Sanitation Inspector']
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Arjun', 'Sai', 'Reyansh', 'Ishaan', 'Kabir', 'Ananya', 'Diya',
+               'Priya', 'Kavya', 'Meera', 'Lakshmi', 'Pooja', 'Sneha', 'Rahul', 'Suresh', 'Ramesh', 'Fatima',
+               'Imran', 'Ayesha', 'Gurpreet', 'Harpreet', 'Joseph', 'Mary', 'Karthik', 'Divya', 'Nikhil', 'Neha']
+LAST_NAMES = ['Sharma', 'Verma', 'Patel', 'Iyer', 'Nair', 'Reddy', 'Rao', 'Khan', 'Singh', 'Gupta',
+              'Joshi', 'Kulkarni', 'Deshmukh', 'Pillai', 'Menon', 'Das', 'Banerjee', 'Mehta', 'Shah', 'Yadav']
+AREAS = [('Shivaji Nagar', '411005'), ('Kothrud', '411038'), ('Andheri East', '400069'), ('Dadar', '400014'),
+         ('T Nagar', '600017'), ('Adyar', '600020'), ('Karol Bagh', '110005'), ('Lajpat Nagar', '110024'),
+         ('Indiranagar', '560038'), ('Whitefield', '560066'), ('Salt Lake', '700091'), ('Gomti Nagar', '226010')]
+STREETS = ['MG Road', 'Station Road', 'Main Road', 'Temple Street', 'Market Lane', 'Gandhi Chowk',
+           'Nehru Marg', 'Lake View Road', 'Church Street', 'Ring Road']
+DETAILS = ['since yesterday', 'for three days', 'again this week', 'near the school', 'affecting the whole lane',
+           'after the rain', 'at night', 'every morning', 'reported by neighbours', 'urgent attention needed']
+
+
+class SyntheticDataGenerator:
+    """Writes realistic citizens, requests, history, payments, documents and
+    notifications through the ComprehensiveDatabase bulk APIs.
+    
+    Rows are generated block by block, so memory stays flat at any scale.
+    Timestamps are spread over the last `days` days; request status, history
+    and feedback follow from each request's age. Rollups and search indexes
+    are kept current by the database triggers as rows arrive.
+    """
+    
+    def __init__(self, db, seed=42, days=365, now=None, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+        self.db = db
+        self.rng = random.Random(seed)
+        self.days = days
+        self.now = now or datetime.now().replace(microsecond=0)
+        self.chunk_size = chunk_size
+    
+    def _timestamp(self, not_before=None):
+        """Random time in the window, no earlier than not_before"""
+        start = self.now - timedelta(days=self.days)
+        if not_before is not None and not_before > start:
+            start = not_before
+        span = max(int((self.now - start).total_seconds()), 1)
+        return start + timedelta(seconds=self.rng.randrange(span))
+    
+    def _address(self):
+        area, pincode = self.rng.choice(AREAS)
+        return f"{self.rng.randint(1, 999)}, {self.rng.choice(STREETS)}, {area}", pincode
+    
+    def generate_users(self, count, first_index):
+        """Citizen dicts; first_index keeps Aadhaar numbers unique across runs"""
+        rng = self.rng
+        for index in range(first_index, first_index + count):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            address, pincode = self._address()
+            created_at = self._timestamp()
+            yield {
+                'aadhaar': f"{700000000000 + index}",
+                'name': name,
+                'phone': f"{rng.randint(6, 9)}{rng.randrange(10 ** 9):09d}",
+                'email': f"{name.lower().replace(' ', '.')}{index}@example.in" if rng.random() < 0.6 else None,
+                'address': address,
+                'pincode': pincode,
+                'language': rng.choices(LANGUAGES, LANGUAGE_WEIGHTS)[0],
+                'user_type': 'citizen',
+                'created_at': created_at,
+                'last_login': self._timestamp(created_at) if rng.random() < 0.8 else None
+            }
+    
+    def _request_lifecycle(self, created_at):
+        """(status, history, actual_completion, feedback_rating) for a request of this age"""
+        rng = self.rng
+        age_days = (self.now - created_at).days
+        if age_days < 2:
+            weights = [70, 25, 5, 0]
+        elif age_days < 14:
+            weights = [25, 35, 32, 8]
+        else:
+            weights = [5, 10, 72, 13]
+        status = rng.choices(['Pending', 'In Progress', 'Completed', 'Rejected'], weights)[0]
+        
+        history = [{'status': 'Pending', 'comments': 'Request submitted', 'updated_by': 'Citizen',
+                    'created_at': created_at}]
+        actual_completion = None
+        feedback_rating = None
+        moment = created_at
+        if status != 'Pending':
+            moment = min(moment + timedelta(hours=rng.randint(1, 72)), self.now)
+            history.append({'status': 'In Progress', 'comments': 'Assigned for inspection',
+                            'updated_by': rng.choice(OFFICERS), 'created_at': moment})
+        if status == 'Completed':
+            moment = min(moment + timedelta(hours=rng.randint(2, 14 * 24)), self.now)
+            history.append({'status': 'Completed', 'comments': 'Issue resolved',
+                            'updated_by': history[-1]['updated_by'], 'created_at': moment})
+            actual_completion = moment.date()
+            if rng.random() < 0.6:
+                feedback_rating = rng.choices([1, 2, 3, 4, 5], [5, 8, 17, 35, 35])[0]
+        elif status == 'Rejected':
+            moment = min(moment + timedelta(hours=rng.randint(2, 5 * 24)), self.now)
+            history.append({'status': 'Rejected', 'comments': 'Duplicate or out of jurisdiction',
+                            'updated_by': history[-1]['updated_by'], 'created_at': moment})
+        return status, history, actual_completion, feedback_rating
+    
+    def generate_request_block(self, count, first_user_id, user_count):
+        """(requests, documents, notifications) for count new service requests"""
+        rng = self.rng
+        requests = []
+        documents = []
+        notifications = []
+        for _ in range(count):
+            user_id = first_user_id + rng.randrange(user_count)
+            department = rng.choices(DEPARTMENT_NAMES, DEPARTMENT_WEIGHTS)[0]
+            service_type = rng.choice(DEPARTMENTS[department])
+            created_at = self._timestamp()
+            status, history, actual_completion, feedback_rating = self._request_lifecycle(created_at)
+            address, pincode = self._address()
+            request_id = new_id('SR')
+            requests.append({
+                'request_id': request_id,
+                'user_id': user_id,
+                'department': department,
+                'service_type': service_type,
+                'description': f"{service_type} on {address.split(', ', 1)[1]} {rng.choice(DETAILS)}",
+                'address': address,
+                'pincode': pincode,
+                'language': rng.choices(LANGUAGES, LANGUAGE_WEIGHTS)[0],
+                'priority': rng.choices(PRIORITIES, PRIORITY_WEIGHTS)[0],
+                'status': status,
+                'assigned_to': history[1]['updated_by'] if len(history) > 1 else None,
+                'estimated_completion': (created_at + timedelta(days=7)).date(),
+                'actual_completion': actual_completion,
+                'feedback_rating': feedback_rating,
+                'created_at': created_at,
+                'updated_at': history[-1]['created_at'],
+                'history': history
+            })
+            
+            old = (self.now - created_at).days > 7
+            notifications.append({
+                'user_id': user_id,
+                'notification_type': 'request_submitted',
+                'title': 'Request Submitted',
+                'message': f'Your {service_type} request {request_id} has been submitted',
+                'is_read': old or rng.random() < 0.3,
+                'created_at': created_at
+            })
+            if status in ('Completed', 'Rejected'):
+                notifications.append({
+                    'user_id': user_id,
+                    'notification_type': 'status_update',
+                    'title': f'Request {status}',
+                    'message': f'Your request {request_id} is now {status}',
+                    'is_read': old and rng.random() < 0.8,
+                    'created_at': history[-1]['created_at']
+                })
+            
+            if rng.random() < DOCUMENT_RATE:
+                document_type = rng.choice(DOCUMENT_TYPES)
+                doc_id = new_id('DOC')
+                documents.append({
+                    'doc_id': doc_id,
+                    'user_id': user_id,
+                    'request_id': request_id,
+                    'document_type': document_type,
+                    'document_name': f"{document_type.lower().replace(' ', '_')}_{rng.randint(1, 99)}.pdf",
+                    'file_path': f"uploads/synthetic/{doc_id}.pdf",
+                    'file_size': rng.randint(50_000, 5_000_000),
+                    'uploaded_at': created_at,
+                    'verified': status == 'Completed'
+                })
+        return requests, documents, notifications
+    
+    def generate_payments(self, first_user_id, user_count, per_user=PAYMENTS_PER_USER):
+        """Monthly utility bills; older ones are paid, the latest may be pending or overdue"""
+        rng = self.rng
+        for user_id in range(first_user_id, first_user_id + user_count):
+            for month in range(per_user):
+                created_at = self.now - timedelta(days=30 * month + rng.randint(0, 29))
+                due_date = (created_at + timedelta(days=15)).date()
+                if month == 0 and rng.random() < 0.5:
+                    status = 'Overdue' if due_date < self.now.date() else 'Pending'
+                else:
+                    status = 'Completed'
+                paid = status == 'Completed'
+                yield {
+                    'user_id': user_id,
+                    'bill_type': rng.choice(BILL_TYPES),
+                    'bill_number': f"BILL{user_id:08d}{month:02d}",
+                    'amount': round(rng.uniform(150, 4500), 2),
+                    'due_date': due_date,
+                    'payment_method': rng.choice(PAYMENT_METHODS) if paid else None,
+                    'transaction_id': new_id('TXN') if paid else None,
+                    'status': status,
+                    'created_at': created_at,
+                    'completed_at': min(created_at + timedelta(days=rng.randint(0, 14)), self.now) if paid else None
+                }
+    
+    def generate(self, request_count, user_count=None, progress=None):
+        """Generate user_count citizens and request_count requests with related rows.
+        
+        Returns per-table {rows, seconds, rows_per_second} plus total seconds.
+        """
+        user_count = user_count or max(1, request_count // REQUESTS_PER_USER)
+        totals = {}
+        started = time.perf_counter()
+        
+        def add(table, stats):
+            entry = totals.setdefault(table, {'rows': 0, 'seconds': 0.0})
+            entry['rows'] += stats['rows']
+            entry['seconds'] += stats['seconds']
+        
+        cursor = self.db.conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM users')
+        first_user_id = cursor.fetchone()[0] + 1
+        add('users', self.db.create_users_bulk(self.generate_users(user_count, first_user_id), self.chunk_size))
+        cursor.execute('SELECT COUNT(*) FROM users WHERE id >= ?', (first_user_id,))
+        if cursor.fetchone()[0] != user_count:
+            raise RuntimeError("Synthetic users did not get consecutive ids; generate into a fresh database")
+        if progress:
+            progress(f"users: {user_count:,}")
+        
+        written = 0
+        while written < request_count:
+            block = min(self.chunk_size, request_count - written)
+            requests, documents, notifications = self.generate_request_block(block, first_user_id, user_count)
+            history_rows = sum(len(request['history']) for request in requests)
+            stats = self.db.create_service_requests_bulk(requests, self.chunk_size)
+            add('service_requests', stats)
+            add('request_status_history', dict(stats, rows=history_rows, seconds=0.0))
+            add('documents', self.db.create_documents_bulk(documents, self.chunk_size))
+            add('notifications', self.db.create_notifications_bulk(notifications, self.chunk_size))
+            written += block
+            if progress and (written % (self.chunk_size * 20) == 0 or written == request_count):
+                elapsed = time.perf_counter() - started
+                progress(f"requests: {written:,}/{request_count:,} ({written / elapsed:,.0f}/s)")
+        
+        add('payments', self.db.create_payments_bulk(
+            self.generate_payments(first_user_id, user_count), self.chunk_size))
+        if progress:
+            progress(f"payments: {totals['payments']['rows']:,}")
+        
+        # Fresh statistics for the planner after a large load
+        self.db.conn.execute('PRAGMA optimize')
+        
+        for entry in totals.values():
+            entry['rows_per_second'] = entry['rows'] / entry['seconds'] if entry['seconds'] > 0 else None
+        totals['seconds'] = time.perf_counter() - started
+        return totals
+
+
+def parse_scale(value):
+    """'100k' or a plain number of requests"""
+    if value in SCALES:
+        return SCALES[value]
+    return int(value.replace('_', ''))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill a SUVIDHA database with synthetic data")
+    parser.add_argument('db_path', help="database file to write (created if missing)")
+    parser.add_argument('--scale', default='10k', help=f"requests to generate: {', '.join(SCALES)} or a number")
+    parser.add_argument('--users', type=int, help="citizens to generate (default: requests / 10)")
+    parser.add_argument('--days', type=int, default=365, help="spread timestamps over this many days")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_BULK_CHUNK_SIZE)
+    args = parser.parse_args()
+    
+    db = ComprehensiveDatabase(args.db_path)
+    generator = SyntheticDataGenerator(db, seed=args.seed, days=args.days, chunk_size=args.chunk_size)
+    totals = generator.generate(parse_scale(args.scale), args.users, progress=print)
+    for table, entry in totals.items():
+        if table != 'seconds':
+            print(f"{table:24s} {entry['rows']:>12,} rows")
+    print(f"Done in {totals['seconds']:.1f}s")
@@ -0,0 +1,18 @@
+# tests/conftest.py
+import os
+import sys
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# A fixed node id, so IDs are allocated without leasing one
+os.environ.setdefault('SUVIDHA_NODE_ID', '1')
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A migrated ComprehensiveDatabase in a temporary directory"""
+    from database import ComprehensiveDatabase
+    database = ComprehensiveDatabase(str(tmp_path / 'suvidha_test.db'))
+    yield database
+    database.conn.close()
@@ -0,0 +1,78 @@
+# tests/test_migrations.py
+import pytest
+import migrations
+from connection_manager import ConnectionManager
+from migrations import migrate, ensure_schema, get_schema_version, LATEST_VERSION
+from database import search_requests
+
+
+@pytest.fixture
+def conn(tmp_path):
+    manager = ConnectionManager(str(tmp_path / 'migrations_test.db'))
+    yield manager
+    manager.close()
+
+
+def _schema(conn):
+    return sorted(conn.execute("SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'").fetchall())
+
+
+def test_fresh_database_reaches_latest_version(conn):
+    assert migrate(conn) == LATEST_VERSION
+    assert get_schema_version(conn) == LATEST_VERSION
+    versions = [version for (version,) in conn.execute('SELECT version FROM schema_version ORDER BY version')]
+    assert versions == [version for version, description, apply in migrations.MIGRATIONS]
+    assert conn.execute('PRAGMA integrity_check').fetchone() == ('ok',)
+
+
+def test_migrating_again_changes_nothing(conn):
+    migrate(conn)
+    schema = _schema(conn)
+    assert migrate(conn) == LATEST_VERSION
+    assert ensure_schema(conn) == LATEST_VERSION
+    assert _schema(conn) == schema
+
+
+def test_local_time_defaults_keep_rows_triggers_and_search(conn, monkeypatch):
+    # Stop just before migration 015 and write some data the old way
+    monkeypatch.setattr(migrations, 'MIGRATIONS', [m for m in migrations.MIGRATIONS if m[0] < 15])
+    assert migrate(conn) == 14
+    with conn.transaction() as tx:
+        tx.execute("INSERT INTO users (user_id, name, aadhaar, phone) VALUES ('U2', 'Asha', '1', '2')")
+        user_id = tx.execute("SELECT id FROM users WHERE user_id='U2'").fetchone()[0]
+        for n in range(3):
+            tx.execute('''
+                INSERT INTO service_requests (request_id, user_id, department, service_type,
+                                              description, created_at, updated_at)
+                VALUES (?, ?, 'Water', 'Leak', 'burst pipe near the market', ?, ?)
+            ''', (f'SR{n}', user_id, '2026-01-05 10:00:00', '2026-01-05 10:00:00'))
+        tx.execute("DELETE FROM service_requests WHERE request_id='SR2'")
+    total_requests = conn.execute('SELECT total_requests FROM user_stats WHERE user_id=?', (user_id,)).fetchone()[0]
+    schema = _schema(conn)
+    sequences = dict(conn.execute('SELECT name, seq FROM sqlite_sequence').fetchall())
+    monkeypatch.undo()
+    
+    assert migrate(conn) == LATEST_VERSION
+    # Only the preview status index is new; the rebuilt tables keep their rows,
+    # indexes, triggers and AUTOINCREMENT counters
+    assert set(_schema(conn)) - set(schema) == {('index', 'idx_blobs_preview_pending')}
+    assert set(schema) - set(_schema(conn)) == set()
+    assert dict(conn.execute('SELECT name, seq FROM sqlite_sequence').fetchall()) == sequences
+    assert conn.execute('SELECT request_id FROM service_requests ORDER BY id').fetchall() == [('SR0',), ('SR1',)]
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE sql LIKE '%CURRENT_TIMESTAMP%'").fetchone() == (0,)
+    assert conn.execute('PRAGMA integrity_check').fetchone() == ('ok',)
+    
+    # Triggers still maintain the counters, and the FTS index still matches rowids
+    with conn.transaction() as tx:
+        tx.execute('''
+            INSERT INTO service_requests (request_id, user_id, department, service_type, description)
+            VALUES ('SR9', ?, 'Roads', 'Pothole', 'deep pothole on the ring road')
+        ''', (user_id,))
+    assert conn.execute('SELECT total_requests FROM user_stats WHERE user_id=?',
+                        (user_id,)).fetchone() == (total_requests + 1,)
+    assert [row[0] for row in search_requests(conn, 'pipe', columns='request_id')] == ['SR0', 'SR1']
+    assert [row[0] for row in search_requests(conn, 'pothole', columns='request_id')] == ['SR9']
+    # The default now writes local time, like every other write
+    created_at = conn.execute("SELECT created_at, datetime('now', 'localtime') FROM service_requests "
+                              "WHERE request_id='SR9'").fetchone()
+    assert created_at[0][:16] == created_at[1][:16]
@@ -0,0 +1,25 @@
+# tests/test_query_plans.py
+import pytest
+from query_plans import HOT_QUERIES, check_query_plans, captured_statements, scratch_database
+
+
+def test_hot_queries_use_their_indexes(db):
+    assert check_query_plans(db)
+
+
+def test_every_hot_query_comes_from_its_code_path(db):
+    for name, run, caller, index in HOT_QUERIES:
+        assert captured_statements(db, run, caller), name
+
+
+def test_a_missing_index_is_reported(db):
+    db.conn.execute('DROP INDEX idx_users_last_login')
+    db.conn.commit()
+    with pytest.raises(AssertionError, match='active_sessions: expected idx_users_last_login'):
+        check_query_plans(db)
+
+
+def test_checks_a_copy_of_the_given_database(db):
+    copy = scratch_database(db.conn.db_name)
+    assert copy.conn.db_name != db.conn.db_name
+    assert check_query_plans(copy)
@@ -0,0 +1,112 @@
+# tests/test_request_grid.py
+from datetime import date, datetime, timedelta
+import pytest
+from request_grid import fetch_grid_page, count_grid_rows, iter_matching_request_ids, PRIORITY_ORDER
+
+DEPARTMENTS = ['Water', 'Electricity', 'Roads']
+STATUSES = ['Pending', 'In Progress', 'Completed', 'Rejected']
+PRIORITIES = ['Emergency', 'High', 'Medium', 'Low']
+PINCODES = ['110001', '110002']
+START = datetime(2026, 1, 1, 9, 0, 0)
+
+
+@pytest.fixture
+def requests(db):
+    """137 requests over two weeks; every third shares its created_at with the one before"""
+    rows = []
+    for n in range(137):
+        rows.append({
+            'request_id': f'SR{n:04d}',
+            'user_id': n % 5 + 1,
+            'department': DEPARTMENTS[n % 3],
+            'service_type': 'Repair',
+            'description': f'Request {n}',
+            'status': STATUSES[n % 4],
+            'priority': PRIORITIES[n % 4 if n % 7 else 0],
+            'pincode': PINCODES[n % 2],
+            'created_at': START + timedelta(hours=(n - n % 3 // 2) * 2)
+        })
+    db.create_service_requests_bulk(rows)
+    return rows
+
+
+def _expected(rows, filters, sort, start_date=None, end_date=None):
+    matching = [row for row in rows
+                if all(not values or row[column] in values for column, values in filters.items())
+                and (start_date is None or row['created_at'].date() >= start_date)
+                and (end_date is None or row['created_at'].date() <= end_date)]
+    # Bulk inserts keep the list order, so the list index orders like id
+    position = {row['request_id']: index for index, row in enumerate(rows)}
+    if sort == 'priority':
+        key = lambda row: (PRIORITY_ORDER[row['priority']], row['created_at'], position[row['request_id']])
+    else:
+        key = lambda row: (row['created_at'], position[row['request_id']])
+    return [row['request_id'] for row in sorted(matching, key=key, reverse=sort == 'newest')]
+
+
+def _all_pages(conn, filters, sort, page_size, start_date=None, end_date=None):
+    request_ids = []
+    pages = 0
+    after = None
+    while True:
+        rows, after = fetch_grid_page(conn, filters, start_date, end_date, sort, after, page_size,
+                                      columns=('request_id',))
+        request_ids.extend(request_id for (request_id,) in rows)
+        pages += 1
+        if after is None:
+            return request_ids, pages
+
+
+@pytest.mark.parametrize('sort', ['newest', 'oldest', 'priority'])
+@pytest.mark.parametrize('filters', [
+    {},
+    {'status': ['Pending']},
+    {'status': ['Pending', 'In Progress'], 'department': ['Water', 'Roads']},
+    {'priority': ['High', 'Low']},
+    {'pincode': ['110002'], 'service_type': ['Repair']},
+])
+def test_pages_cover_every_match_once_in_order(db, requests, filters, sort):
+    expected = _expected(requests, filters, sort)
+    request_ids, pages = _all_pages(db.conn, filters, sort, page_size=10)
+    assert request_ids == expected
+    assert pages == max(1, -(-len(expected) // 10))
+
+
+def test_date_range_is_inclusive(db, requests):
+    start_date, end_date = date(2026, 1, 3), date(2026, 1, 6)
+    filters = {'department': ['Electricity']}
+    request_ids, pages = _all_pages(db.conn, filters, 'oldest', 7, start_date, end_date)
+    assert request_ids == _expected(requests, filters, 'oldest', start_date, end_date)
+
+
+def test_last_page_has_no_cursor(db, requests):
+    rows, after = fetch_grid_page(db.conn, {'status': ['Rejected']}, page_size=1000)
+    assert len(rows) == len(_expected(requests, {'status': ['Rejected']}, 'newest'))
+    assert after is None
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'department': ['Water'], 'status': ['Pending', 'Completed']},
+    {'priority': ['Emergency']},
+    {'pincode': ['110001']},
+])
+def test_counts_match_pages(db, requests, filters):
+    count, exact = count_grid_rows(db.conn, filters)
+    assert exact
+    assert count == len(_expected(requests, filters, 'newest'))
+
+
+def test_count_past_cap_is_a_lower_bound(db, requests):
+    count, exact = count_grid_rows(db.conn, {'pincode': ['110001']}, cap=10)
+    assert (count, exact) == (10, False)
+
+
+def test_matching_ids_survive_status_changes(db, requests):
+    filters = {'status': ['Pending']}
+    seen = []
+    for request_id in iter_matching_request_ids(db.conn, filters, batch_size=5):
+        seen.append(request_id)
+        # Moving a request out of the filter must not shift the next batch
+        db.update_request_status(request_id, 'In Progress')
+    assert seen == _expected(requests, filters, 'oldest')
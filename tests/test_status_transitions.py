@@ -0,0 +1,67 @@
+# tests/test_status_transitions.py
+import pytest
+from status_transitions import transition_requests, summarize_failures
+
+
+@pytest.fixture
+def requests(db):
+    rows = ([(f'SR{n:03d}', 7, 'Pending') for n in range(25)]
+            + [('WORKING', 7, 'In Progress'), ('DONE', 7, 'Completed'), ('ORPHAN', None, 'Pending')])
+    db.create_service_requests_bulk(
+        [{'request_id': request_id, 'user_id': user_id, 'status': status, 'department': 'Water',
+          'service_type': 'Leak', 'description': 'Burst pipe'} for request_id, user_id, status in rows])
+
+
+def _count(db, sql, params=()):
+    return db.conn.execute(sql, params).fetchone()[0]
+
+
+def test_moves_allowed_requests_and_reports_the_rest(db, requests):
+    request_ids = [f'SR{n:03d}' for n in range(25)] + ['WORKING', 'DONE', 'MISSING', 'SR000']
+    result = transition_requests(db.conn, request_ids, 'Completed', 'Fixed', 'Admin', chunk_size=10)
+    
+    assert result['rows'] == 28  # the repeated SR000 is handled once
+    assert result['chunks'] == 3
+    assert result['updated'] == 26
+    assert result['failures'] == {'DONE': 'Already Completed', 'MISSING': 'Not found (or archived)'}
+    assert _count(db, "SELECT COUNT(*) FROM service_requests WHERE status='Completed'") == 27
+    assert _count(db, "SELECT COUNT(*) FROM service_requests WHERE status='Completed' "
+                      "AND actual_completion IS NULL") == 1  # DONE was completed before
+
+
+def test_writes_history_and_notifications(db, requests):
+    transition_requests(db.conn, ['SR001', 'WORKING', 'ORPHAN'], 'Rejected', 'Duplicate', 'Admin')
+    
+    history = db.get_request_history('SR001')
+    assert history[0][:3] == ('Rejected', 'Duplicate', 'Admin')
+    assert _count(db, "SELECT COUNT(*) FROM request_status_history WHERE status='Rejected'") == 3
+    # Only requests with a user are notified
+    assert _count(db, "SELECT COUNT(*) FROM notifications WHERE user_id=7 "
+                      "AND notification_type='status_update'") == 2
+
+
+def test_closed_requests_cannot_reopen(db, requests):
+    result = transition_requests(db.conn, ['DONE', 'SR002'], 'Pending')
+    assert result['updated'] == 0
+    assert result['failures'] == {'DONE': 'Cannot move from Completed to Pending',
+                                  'SR002': 'Already Pending'}
+
+
+def test_accepts_a_generator_and_reports_progress(db, requests):
+    progress = []
+    result = transition_requests(db.conn, (f'SR{n:03d}' for n in range(25)), 'In Progress',
+                                 chunk_size=10, progress=lambda rows, updated: progress.append((rows, updated)))
+    assert result['updated'] == 25
+    assert progress == [(10, 10), (20, 20), (25, 25)]
+
+
+def test_unknown_status_is_rejected(db, requests):
+    with pytest.raises(ValueError):
+        transition_requests(db.conn, ['SR001'], 'Closed')
+
+
+def test_summarize_failures():
+    failures = {'A': 'Already Completed', 'B': 'Not found (or archived)', 'C': 'Already Completed'}
+    by_reason, sample = summarize_failures(failures, sample_size=2)
+    assert by_reason == [('Already Completed', 2), ('Not found (or archived)', 1)]
+    assert sample == [('A', 'Already Completed'), ('B', 'Not found (or archived)')]
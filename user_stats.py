@@ -0,0 +1,206 @@
+# user_stats.py
+import sys
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from archive import union_source
+
+# user_stats holds one row of dashboard counters per user. Triggers created
+# by migration 007 keep it current on every insert/update of the user's
+# service_requests, payments and notifications, and bump the row's version
+# on every change (deletes included). Like the daily rollups, deletes are not
+# subtracted, so archived requests still count towards a citizen's totals;
+# a rebuild recomputes the counters exactly.
+#
+# A user without a row reads as all zeros at version 0. Rows that exist are
+# always at version 1 or above, so a version never repeats for a user.
+
+USER_STATS_COLUMNS = [
+    'user_id', 'total_requests', 'pending_requests', 'in_progress_requests',
+    'completed_requests', 'rejected_requests', 'pending_payment_count',
+    'pending_payment_amount', 'unread_notifications', 'version'
+]
+
+# Payment statuses counted in pending_payment_count/amount (unpaid bills)
+OUTSTANDING_PAYMENT_STATUSES = ('Pending', 'Overdue')
+
+# Rows shown in the dashboard's recent activity and notification lists
+RECENT_ACTIVITY_LIMIT = 10
+RECENT_NOTIFICATION_LIMIT = 5
+
+DEFAULT_SUMMARY_CACHE_SIZE = 1024
+
+
+def backfill_user_stats(cursor, user_id=None):
+    """Recompute user_stats from the base tables for one user, or for everyone.
+    
+    Runs on the caller's cursor so it can be part of a migration or a larger
+    transaction. Existing rows are zeroed and their version bumped rather
+    than deleted, so cached summaries never see a version twice.
+    """
+    where = 'user_id = ?' if user_id is not None else 'user_id IS NOT NULL'
+    params = [user_id] if user_id is not None else []
+    
+    cursor.execute(f'''
+        UPDATE user_stats
+        SET total_requests = 0, pending_requests = 0, in_progress_requests = 0,
+            completed_requests = 0, rejected_requests = 0, pending_payment_count = 0,
+            pending_payment_amount = 0, unread_notifications = 0,
+            version = version + 1, updated_at = datetime('now', 'localtime')
+        WHERE {where}
+    ''', params)
+    
+    requests = union_source(cursor, 'service_requests')
+    cursor.execute(f'''
+        INSERT INTO user_stats
+        (user_id, total_requests, pending_requests, in_progress_requests,
+         completed_requests, rejected_requests, version)
+        SELECT user_id,
+               COUNT(*),
+               SUM(status IS 'Pending'),
+               SUM(status IS 'In Progress'),
+               SUM(status IS 'Completed'),
+               SUM(status IS 'Rejected'),
+               1
+        FROM {requests}
+        WHERE {where}
+        GROUP BY user_id
+        ON CONFLICT(user_id) DO UPDATE SET
+            total_requests = excluded.total_requests,
+            pending_requests = excluded.pending_requests,
+            in_progress_requests = excluded.in_progress_requests,
+            completed_requests = excluded.completed_requests,
+            rejected_requests = excluded.rejected_requests
+    ''', params)
+    
+    cursor.execute(f'''
+        INSERT INTO user_stats (user_id, pending_payment_count, pending_payment_amount, version)
+        SELECT user_id, COUNT(*), COALESCE(SUM(amount), 0), 1
+        FROM payments
+        WHERE status IN ({', '.join('?' * len(OUTSTANDING_PAYMENT_STATUSES))}) AND {where}
+        GROUP BY user_id
+        ON CONFLICT(user_id) DO UPDATE SET
+            pending_payment_count = excluded.pending_payment_count,
+            pending_payment_amount = excluded.pending_payment_amount
+    ''', list(OUTSTANDING_PAYMENT_STATUSES) + params)
+    
+    cursor.execute(f'''
+        INSERT INTO user_stats (user_id, unread_notifications, version)
+        SELECT user_id, COUNT(*), 1
+        FROM notifications
+        WHERE COALESCE(is_read, 0) = 0 AND {where}
+        GROUP BY user_id
+        ON CONFLICT(user_id) DO UPDATE SET
+            unread_notifications = excluded.unread_notifications
+    ''', params)
+
+
+def rebuild_user_stats(conn, user_id=None):
+    """Rebuild user_stats for one user, or for everyone, in one transaction"""
+    with conn.transaction() as tx:
+        backfill_user_stats(tx.cursor(), user_id)
+
+
+def get_user_stats(conn, user_id):
+    """The user's counters as a dict; all zeros at version 0 if they have no row"""
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT {', '.join(USER_STATS_COLUMNS)}
+        FROM user_stats
+        WHERE user_id = ?
+    ''', (user_id,))
+    row = cursor.fetchone()
+    if row is None:
+        stats = dict.fromkeys(USER_STATS_COLUMNS, 0)
+        stats.update(user_id=user_id, pending_payment_amount=0.0)
+        return stats
+    return dict(zip(USER_STATS_COLUMNS, row))
+
+
+def get_recent_activity(conn, user_id, limit=RECENT_ACTIVITY_LIMIT):
+    """The user's latest requests with their payment, newest first"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT sr.request_id, sr.department, sr.service_type, sr.status, sr.created_at,
+               p.amount, p.status as payment_status
+        FROM service_requests sr
+        LEFT JOIN payments p ON sr.request_id = p.request_id
+        WHERE sr.user_id=?
+        ORDER BY sr.created_at DESC
+        LIMIT ?
+    ''', (user_id, limit))
+    return cursor.fetchall()
+
+
+def get_recent_notifications(conn, user_id, limit=RECENT_NOTIFICATION_LIMIT):
+    """The user's latest notifications, newest first"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT title, message, created_at, is_read
+        FROM notifications
+        WHERE user_id=?
+        ORDER BY created_at DESC
+        LIMIT ?
+    ''', (user_id, limit))
+    return cursor.fetchall()
+
+
+class UserSummaryCache:
+    """Per-user dashboard summaries, reused until the user's stats version moves.
+    
+    get() costs one primary-key read of user_stats. Only when the version
+    differs from the cached one are the recent activity and notification
+    lists queried again. The least recently used users are evicted first.
+    """
+    
+    def __init__(self, max_users=DEFAULT_SUMMARY_CACHE_SIZE):
+        self.max_users = max_users
+        self._summaries = OrderedDict()  # user_id -> summary dict
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, conn, user_id):
+        """Counters plus 'recent_activity' and 'recent_notifications' for user_id"""
+        stats = get_user_stats(conn, user_id)
+        with self._lock:
+            cached = self._summaries.get(user_id)
+            if cached is not None and cached['version'] == stats['version']:
+                self._summaries.move_to_end(user_id)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        
+        summary = dict(stats)
+        summary['recent_activity'] = get_recent_activity(conn, user_id)
+        summary['recent_notifications'] = get_recent_notifications(conn, user_id)
+        with self._lock:
+            self._summaries[user_id] = summary
+            self._summaries.move_to_end(user_id)
+            while len(self._summaries) > self.max_users:
+                self._summaries.popitem(last=False)
+        return summary
+    
+    def invalidate(self, user_id=None):
+        """Drop one user's cached summary, or everyone's"""
+        with self._lock:
+            if user_id is None:
+                self._summaries.clear()
+            else:
+                self._summaries.pop(user_id, None)
+
+
+if __name__ == "__main__":
+    # Usage: python user_stats.py [db_path] [user_id] - rebuild the counters
+    from connection_manager import ConnectionManager
+    from migrations import ensure_schema
+    
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'suvidha_live.db'
+    user_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    
+    manager = ConnectionManager(db_path)
+    ensure_schema(manager)
+    started = datetime.now()
+    rebuild_user_stats(manager, user_id)
+    users = manager.execute('SELECT COUNT(*) FROM user_stats').fetchone()[0]
+    print(f"Rebuilt stats for {users} user(s) in {(datetime.now() - started).total_seconds():.2f}s")